@@ -0,0 +1,347 @@
+""" Synthetic raw data and resources for benchmarks.
+
+Resources are written with the file names and formats that ``Resources`` expects, so that no
+resources are downloaded when they're in the resources directory.
+
+"""
+
+"""
+Copyright (C) 2019 Andrew Riha
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+import gzip
+import io
+import itertools
+import json
+import os
+import tarfile
+
+import numpy as np
+import pandas as pd
+
+# GRCh37 chromosome lengths
+CHROM_LENGTHS = {
+    "1": 249250621,
+    "2": 243199373,
+    "3": 198022430,
+    "4": 191154276,
+    "5": 180915260,
+    "6": 171115067,
+    "7": 159138663,
+    "8": 146364022,
+    "9": 141213431,
+    "10": 135534747,
+    "11": 135006516,
+    "12": 133851895,
+    "13": 115169878,
+    "14": 107349540,
+    "15": 102531392,
+    "16": 90354753,
+    "17": 81195210,
+    "18": 78077248,
+    "19": 59128983,
+    "20": 63025520,
+    "21": 48129895,
+    "22": 51304566,
+    "X": 155270560,
+    "Y": 59373566,
+    "MT": 16569,
+}
+
+ASSEMBLIES = ["NCBI36", "GRCh37", "GRCh38"]
+
+# offset of positions in each assembly relative to NCBI36, for synthetic assembly mapping data
+_ASSEMBLY_OFFSETS = {"NCBI36": 0, "GRCh37": 10000, "GRCh38": 65000}
+
+_ALLELES = np.array(list("ACGT"))
+
+
+def create_resources(resources_dir, seed=0):
+    """ Create synthetic resources.
+
+    Parameters
+    ----------
+    resources_dir : str
+        path of resources directory
+    seed : int
+        seed of random number generator
+    """
+    rng = np.random.RandomState(seed)
+
+    if not os.path.exists(resources_dir):
+        os.makedirs(resources_dir)
+
+    _create_genetic_map(resources_dir, rng)
+    _create_cytoBand(resources_dir)
+    _create_genes(resources_dir, rng)
+
+    for source, target in itertools.permutations(ASSEMBLIES, 2):
+        _create_assembly_mapping_data(resources_dir, source, target)
+
+
+def create_snps(snps_per_chrom, seed=0):
+    """ Create synthetic SNPs.
+
+    Parameters
+    ----------
+    snps_per_chrom : int
+        number of SNPs of each autosome and the X chromosome; the Y chromosome and MT have
+        fewer SNPs
+    seed : int
+        seed of random number generator
+
+    Returns
+    -------
+    pandas.DataFrame
+        SNPs, with ~1% null genotypes
+    """
+    rng = np.random.RandomState(seed)
+    dfs = []
+
+    for chrom, length in CHROM_LENGTHS.items():
+        n = snps_per_chrom
+        if chrom == "Y":
+            n = snps_per_chrom // 20
+        elif chrom == "MT":
+            n = min(snps_per_chrom // 100, length // 2)
+
+        pos = np.sort(rng.choice(np.arange(1000, length, 7), n, replace=False))
+        dfs.append(pd.DataFrame({"chrom": chrom, "pos": pos}, columns=["chrom", "pos"]))
+
+    df = pd.concat(dfs, ignore_index=True)
+    df.index = pd.Index(["rs" + str(i + 1) for i in range(len(df))], name="rsid")
+    df["genotype"] = _create_genotypes(df["chrom"], rng)
+    return df
+
+
+def create_relative(snps, shared, seed=0):
+    """ Create synthetic SNPs of a relative.
+
+    Parameters
+    ----------
+    snps : pandas.DataFrame
+        SNPs of an individual (see :func:`create_snps`)
+    shared : float
+        fraction of each chromosome with genotypes identical to the individual's
+    seed : int
+        seed of random number generator
+
+    Returns
+    -------
+    pandas.DataFrame
+        SNPs of the relative
+    """
+    relative = snps.copy()
+    genotypes = relative["genotype"].values.copy()
+    other = _create_genotypes(relative["chrom"], np.random.RandomState(seed))
+
+    for chrom, rows in relative.groupby("chrom", sort=False).indices.items():
+        # the relative's genotypes differ outside of one segment of each chromosome
+        n_shared = int(len(rows) * shared)
+        start = (len(rows) - n_shared) // 2
+        differ = np.r_[rows[:start], rows[start + n_shared :]]
+        genotypes[differ] = other[differ]
+
+    relative["genotype"] = genotypes
+    return relative
+
+
+def _create_genotypes(chroms, rng):
+    allele1 = _ALLELES[rng.randint(0, 4, len(chroms))]
+    allele2 = _ALLELES[rng.randint(0, 4, len(chroms))]
+    genotypes = np.core.defchararray.add(allele1, allele2).astype(object)
+
+    haploid = chroms.isin(["Y", "MT"]).values
+    genotypes[haploid] = allele1[haploid]
+    genotypes[rng.rand(len(chroms)) < 0.01] = np.nan
+
+    return genotypes
+
+
+def write_snps(snps, path, data_format, build=37):
+    """ Write SNPs as a raw data file.
+
+    Parameters
+    ----------
+    snps : pandas.DataFrame
+    path : str
+        path of file
+    data_format : {'23andme', 'ancestry', 'ftdna', 'ftdna_famfinder', 'generic'}
+        format of file
+    build : int
+        build declared in the header comments of formats with comments
+    """
+    genotypes = snps["genotype"].fillna("--")
+
+    if data_format in ["ancestry", "ftdna_famfinder"]:
+        null = "0" if data_format == "ancestry" else "-"
+        allele1 = genotypes.str[0].where(genotypes != "--", null)
+        allele2 = genotypes.str[-1].where(genotypes != "--", null)
+
+    with open(path, "w") as f:
+        if data_format == "23andme":
+            f.write("# This data file generated by 23andMe\n")
+            f.write("# build {}\n".format(build))
+            f.write("# rsid\tchromosome\tposition\tgenotype\n")
+            _write_rows(f, snps, [genotypes], "\t")
+        elif data_format == "ancestry":
+            f.write("#AncestryDNA raw data download\n")
+            f.write("#build {}\n".format(build))
+            f.write("rsid\tchromosome\tposition\tallele1\tallele2\n")
+            chroms = snps["chrom"].replace({"X": "23", "Y": "24", "MT": "26"})
+            _write_rows(f, snps.assign(chrom=chroms), [allele1, allele2], "\t")
+        elif data_format == "ftdna":
+            f.write("RSID,CHROMOSOME,POSITION,RESULT\n")
+            _write_rows(f, snps, [genotypes], ",", quote=True)
+        elif data_format == "ftdna_famfinder":
+            f.write("# famfinder, https://www.familytreedna.com\n")
+            f.write("# build {}\n".format(build))
+            f.write("# name,chromosome,position,allele1,allele2\n")
+            _write_rows(f, snps, [allele1, allele2], ",")
+        elif data_format == "generic":
+            f.write("rsid,chromosome,position,genotype\n")
+            _write_rows(f, snps, [genotypes], ",")
+        else:
+            raise ValueError("unsupported data format: " + str(data_format))
+
+
+def _write_rows(f, snps, columns, sep, quote=False):
+    fields = [snps.index, snps["chrom"], snps["pos"].astype(str)] + list(columns)
+
+    for row in zip(*fields):
+        if quote:
+            row = ['"' + str(value) + '"' for value in row]
+        f.write(sep.join(row) + "\n")
+
+
+def _add_to_tar(tar, name, data):
+    info = tarfile.TarInfo(name)
+    info.size = len(data)
+    tar.addfile(info, io.BytesIO(data))
+
+
+def _create_genetic_map(resources_dir, rng, points_per_chrom=2000):
+    par1 = 2699520
+    par2 = 154931044
+
+    regions = [(chrom, 1000, CHROM_LENGTHS[chrom]) for chrom in map(str, range(1, 23))]
+    regions += [
+        ("X", par1 + 1, par2 - 1),
+        ("X_par1", 1000, par1),
+        ("X_par2", par2, CHROM_LENGTHS["X"]),
+    ]
+
+    path = os.path.join(resources_dir, "genetic_map_HapMapII_GRCh37.tar.gz")
+    with tarfile.open(path, "w:gz") as tar:
+        for chrom, start, end in regions:
+            pos = np.unique(rng.randint(start, end, points_per_chrom))
+            rate = rng.exponential(1.2, len(pos))
+            cMs = np.r_[0, np.cumsum(rate[:-1] * np.diff(pos) / 1e6)]
+
+            s = "Chromosome\tPosition(bp)\tRate(cM/Mb)\tMap(cM)\n" + "".join(
+                "chr{}\t{}\t{:.6f}\t{:.6f}\n".format(chrom, p, r, m)
+                for p, r, m in zip(pos, rate, cMs)
+            )
+            _add_to_tar(tar, "genetic_map_GRCh37_chr{}.txt".format(chrom), s.encode())
+
+
+def _create_cytoBand(resources_dir):
+    stains = ["gneg", "gpos50", "acen", "gvar"]
+
+    with gzip.open(os.path.join(resources_dir, "cytoBand_hg19.txt.gz"), "wt") as f:
+        for chrom, length in CHROM_LENGTHS.items():
+            if chrom == "MT":
+                continue
+
+            for i, stain in enumerate(stains):
+                f.write(
+                    "chr{}\t{}\t{}\tp{}\t{}\n".format(
+                        chrom, i * length // 4, (i + 1) * length // 4, i, stain
+                    )
+                )
+
+
+def _create_genes(resources_dir, rng, genes_per_chrom=500):
+    knownGene = []
+    kgXref = []
+
+    for chrom, length in CHROM_LENGTHS.items():
+        if chrom == "MT":
+            continue
+
+        for i in range(genes_per_chrom):
+            start = int(rng.randint(0, length - 100000))
+            end = start + int(rng.randint(1000, 90000))
+            name = "uc{}_{}".format(chrom, i)
+
+            knownGene.append(
+                "{}\tchr{}\t+\t{}\t{}\t{}\t{}\t1\t{},\t{},\tP{}\tA{}\n".format(
+                    name, chrom, start, end, start, end, start, end, i, i
+                )
+            )
+            kgXref.append(
+                "{}\tmRNA{}\tsp{}\tspd{}\tGENE{}_{}\tNM_{}\tNP_{}\tgene {}\t\t\n".format(
+                    name, i, i, i, chrom, i, i, i, i
+                )
+            )
+
+    with gzip.open(os.path.join(resources_dir, "knownGene_hg19.txt.gz"), "wt") as f:
+        f.writelines(knownGene)
+
+    with gzip.open(os.path.join(resources_dir, "kgXref_hg19.txt.gz"), "wt") as f:
+        f.writelines(kgXref)
+
+
+def _create_assembly_mapping_data(resources_dir, source, target, regions_per_chrom=10):
+    path = os.path.join(resources_dir, source + "_" + target + ".tar.gz")
+
+    with tarfile.open(path, "w:gz") as tar:
+        for chrom, length in CHROM_LENGTHS.items():
+            step = length // regions_per_chrom
+            mappings = []
+
+            for i in range(regions_per_chrom):
+                start = i * step + 1
+                offset = _ASSEMBLY_OFFSETS[target] - _ASSEMBLY_OFFSETS[source] + i * 7
+
+                # one region of each chromosome maps to the reverse strand
+                strand = -1 if i == regions_per_chrom // 2 else 1
+
+                mappings.append(
+                    {
+                        "original": {
+                            "seq_region_name": chrom,
+                            "start": start,
+                            "end": start + step - 1,
+                            "strand": 1,
+                            "coord_system": "chromosome",
+                            "assembly": source,
+                        },
+                        "mapped": {
+                            "seq_region_name": chrom,
+                            "start": start + offset,
+                            "end": start + step - 1 + offset,
+                            "strand": strand,
+                            "coord_system": "chromosome",
+                            "assembly": target,
+                        },
+                    }
+                )
+
+            _add_to_tar(
+                tar, chrom + ".json", json.dumps({"mappings": mappings}).encode("utf-8")
+            )
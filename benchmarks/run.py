@@ -0,0 +1,401 @@
+""" Run benchmarks of the hot paths of `lineage`.
+
+Each benchmark is timed over several repeats (reporting the median time), then run once more
+with ``tracemalloc`` to measure peak memory. Results are saved as JSON in ``benchmarks/results``,
+named by the current commit and the time they were saved (``<commit>_<YYYYmmddHHMMSS>.json``,
+or ``results_<YYYYmmddHHMMSS>.json`` outside of a git checkout), so that results of different
+commits (and of repeated runs of a commit) can be compared::
+
+    python -m benchmarks.run --snps-per-chrom 10000
+    python -m benchmarks.run --compare benchmarks/results/<commit>_<YYYYmmddHHMMSS>.json
+
+"""
+
+"""
+Copyright (C) 2019 Andrew Riha
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+import argparse
+from collections import OrderedDict
+import contextlib
+import datetime
+import fnmatch
+import gzip
+import io
+import itertools
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+
+from benchmarks import data
+from lineage import Lineage
+from lineage.resources import Resources
+from lineage.snps import SNPs
+
+FORMATS = ["23andme", "ancestry", "ftdna", "ftdna_famfinder", "generic"]
+
+BENCHMARKS = OrderedDict()
+
+
+def benchmark(name):
+    """ Register a benchmark.
+
+    The decorated function is called with a :class:`Context` before each repeat to set up the
+    benchmark; it returns the function that is timed.
+
+    Parameters
+    ----------
+    name : str
+        name of benchmark
+    """
+
+    def decorator(setup):
+        BENCHMARKS[name] = setup
+        return setup
+
+    return decorator
+
+
+class Context(object):
+    """ Synthetic data shared by benchmarks. """
+
+    def __init__(self, work_dir, snps_per_chrom, seed=0):
+        self.work_dir = work_dir
+        self.resources_dir = os.path.join(work_dir, "resources")
+        self.output_dir = os.path.join(work_dir, "output")
+
+        data.create_resources(self.resources_dir, seed)
+
+        self.snps = data.create_snps(snps_per_chrom, seed)
+        self.files = {}
+
+        for data_format in FORMATS:
+            self.files[data_format] = self._write(self.snps, data_format + ".txt", data_format)
+
+        with open(self.files["23andme"], "rb") as f_in:
+            self.files["23andme_gz"] = self.files["23andme"] + ".gz"
+            with gzip.open(self.files["23andme_gz"], "wb") as f_out:
+                shutil.copyfileobj(f_in, f_out)
+
+        # data to merge has half of the SNPs, plus as many new SNPs
+        other = data.create_snps(snps_per_chrom // 2, seed + 1)
+        other.index = "rs" + (other.index.str[2:].astype(int) + len(self.snps)).astype(str)
+        self.files["merge"] = self._write(
+            pd.concat([self.snps.iloc[::2], other]), "merge.txt", "23andme"
+        )
+
+        self.files["relative"] = self._write(
+            data.create_relative(self.snps, 0.3, seed + 2), "relative.txt", "23andme"
+        )
+        self.files["parent"] = self._write(
+            data.create_relative(self.snps, 0.5, seed + 3), "parent.txt", "23andme"
+        )
+
+    def _write(self, snps, filename, data_format):
+        path = os.path.join(self.work_dir, filename)
+        data.write_snps(snps, path, data_format)
+        return path
+
+    def create_lineage(self):
+        """ Create a ``Lineage`` that doesn't cache results, using the synthetic resources. """
+        return Lineage(
+            output_dir=self.output_dir, resources_dir=self.resources_dir, cache_size=0
+        )
+
+    def create_individual(self, l, name, file, build=37):
+        ind = l.create_individual(name, file)
+        if build != 37:
+            ind._set_snps(ind.snps, build)
+        return ind
+
+
+for data_format in FORMATS + ["23andme_gz"]:
+
+    def setup(ctx, data_format=data_format):
+        return lambda: SNPs(ctx.files[data_format])
+
+    benchmark("read_" + data_format)(setup)
+
+
+@benchmark("merge")
+def setup_merge(ctx):
+    ind = ctx.create_individual(ctx.create_lineage(), "ind", ctx.files["23andme"])
+    return lambda: ind.load_snps(ctx.files["merge"])
+
+
+for source, target in itertools.permutations(data.ASSEMBLIES, 2):
+
+    def setup(ctx, source=source, target=target):
+        l = ctx.create_lineage()
+        ind = ctx.create_individual(l, "ind", ctx.files["23andme"], int(source[-2:]))
+        # load the assembly mapping data before timing, like the other resources
+        l._resources.get_assembly_mapping_data(source, target)
+        return lambda: l.remap_snps(ind, target)
+
+    benchmark("remap_" + source + "_" + target)(setup)
+
+
+def _setup_shared_dna(ctx, shared_genes, save_output):
+    l = ctx.create_lineage()
+    ind1 = ctx.create_individual(l, "ind1", ctx.files["23andme"])
+    ind2 = ctx.create_individual(l, "ind2", ctx.files["relative"])
+    return lambda: l.find_shared_dna(
+        ind1, ind2, shared_genes=shared_genes, save_output=save_output
+    )
+
+
+@benchmark("find_shared_dna")
+def setup_find_shared_dna(ctx):
+    return _setup_shared_dna(ctx, False, False)
+
+
+@benchmark("find_shared_dna_genes")
+def setup_find_shared_dna_genes(ctx):
+    return _setup_shared_dna(ctx, True, False)
+
+
+@benchmark("find_shared_dna_plots")
+def setup_find_shared_dna_plots(ctx):
+    return _setup_shared_dna(ctx, False, True)
+
+
+@benchmark("find_discordant_snps_duo")
+def setup_find_discordant_snps_duo(ctx):
+    l = ctx.create_lineage()
+    child = ctx.create_individual(l, "child", ctx.files["23andme"])
+    parent = ctx.create_individual(l, "parent", ctx.files["parent"])
+    return lambda: l.find_discordant_snps(child, parent)
+
+
+@benchmark("find_discordant_snps_trio")
+def setup_find_discordant_snps_trio(ctx):
+    l = ctx.create_lineage()
+    child = ctx.create_individual(l, "child", ctx.files["23andme"])
+    parent1 = ctx.create_individual(l, "parent1", ctx.files["parent"])
+    parent2 = ctx.create_individual(l, "parent2", ctx.files["relative"])
+    return lambda: l.find_discordant_snps(child, parent1, parent2)
+
+
+@benchmark("load_genetic_map")
+def setup_load_genetic_map(ctx):
+    r = Resources(resources_dir=ctx.resources_dir)
+    return r.get_genetic_map_HapMapII_GRCh37
+
+
+@benchmark("load_genes")
+def setup_load_genes(ctx):
+    r = Resources(resources_dir=ctx.resources_dir)
+    return lambda: (r.get_knownGene_hg19(), r.get_kgXref_hg19())
+
+
+@benchmark("load_cytoBand")
+def setup_load_cytoBand(ctx):
+    r = Resources(resources_dir=ctx.resources_dir)
+    return r.get_cytoBand_hg19
+
+
+@benchmark("load_assembly_mapping_data")
+def setup_load_assembly_mapping_data(ctx):
+    r = Resources(resources_dir=ctx.resources_dir)
+    return lambda: r.get_assembly_mapping_data("NCBI36", "GRCh37")
+
+
+def run_benchmark(ctx, setup, repeat):
+    """ Run a benchmark.
+
+    Parameters
+    ----------
+    ctx : Context
+    setup : function
+        function that sets up the benchmark and returns the function to time
+    repeat : int
+        number of times to time the benchmark
+
+    Returns
+    -------
+    dict
+        median `time` (s) and `peak_memory` (bytes) of the benchmark
+    """
+    times = []
+
+    # discard output of `lineage` (e.g., "Loading ...")
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(repeat):
+            func = setup(ctx)
+            start = time.perf_counter()
+            func()
+            times.append(time.perf_counter() - start)
+
+        func = setup(ctx)
+        tracemalloc.start()
+        try:
+            func()
+            _, peak_memory = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+    return {"time": statistics.median(times), "peak_memory": peak_memory}
+
+
+def get_commit():
+    """ Get the current commit of the repository, if any. """
+    try:
+        return (
+            subprocess.check_output(
+                ["git", "rev-parse", "--short", "HEAD"],
+                cwd=os.path.dirname(os.path.abspath(__file__)),
+                stderr=subprocess.DEVNULL,
+            )
+            .decode()
+            .strip()
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, previous):
+    """ Print the ratios of results to previous results.
+
+    Parameters
+    ----------
+    results : dict
+        results of benchmarks, keyed by name
+    previous : dict
+        previous results of benchmarks, keyed by name
+    """
+    print(
+        "{:<32}{:>12}{:>12}{:>8}{:>12}{:>12}{:>8}".format(
+            "benchmark", "time (s)", "previous", "ratio", "peak (MB)", "previous", "ratio"
+        )
+    )
+
+    for name, result in results.items():
+        if name not in previous:
+            continue
+
+        row = [name]
+        for key, scale in [("time", 1), ("peak_memory", 1e6)]:
+            value = result[key]
+            prev = previous[name][key]
+            ratio = value / prev if prev else float("nan")
+            row.extend([value / scale, prev / scale, ratio])
+
+        print("{:<32}{:>12.4f}{:>12.4f}{:>8.2f}{:>12.1f}{:>12.1f}{:>8.2f}".format(*row))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.run", description="Run benchmarks of `lineage`."
+    )
+    parser.add_argument(
+        "-n",
+        "--snps-per-chrom",
+        type=int,
+        default=10000,
+        help="number of synthetic SNPs of each chromosome (default: %(default)s)",
+    )
+    parser.add_argument(
+        "-r",
+        "--repeat",
+        type=int,
+        default=3,
+        help="number of times to time each benchmark (default: %(default)s)",
+    )
+    parser.add_argument(
+        "-k",
+        "--filter",
+        default="*",
+        help="only run benchmarks with names matching this pattern (e.g., 'read_*')",
+    )
+    parser.add_argument(
+        "-o",
+        "--output-dir",
+        default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "results"),
+        help="directory to save results to (default: %(default)s)",
+    )
+    parser.add_argument(
+        "-c", "--compare", help="path of previous results to compare results with"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="seed of synthetic data")
+    args = parser.parse_args(argv)
+
+    names = [name for name in BENCHMARKS if fnmatch.fnmatch(name, args.filter)]
+    if not names:
+        parser.error("no benchmarks match " + args.filter)
+
+    work_dir = tempfile.mkdtemp(prefix="lineage_benchmarks_")
+    results = OrderedDict()
+
+    try:
+        print("Creating synthetic data in " + work_dir)
+        ctx = Context(work_dir, args.snps_per_chrom, args.seed)
+
+        for name in names:
+            results[name] = run_benchmark(ctx, BENCHMARKS[name], args.repeat)
+            print(
+                "{:<32}{:>10.4f} s{:>10.1f} MB".format(
+                    name, results[name]["time"], results[name]["peak_memory"] / 1e6
+                )
+            )
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    commit = get_commit()
+    output = OrderedDict(
+        [
+            ("commit", commit),
+            ("date", datetime.datetime.now().isoformat()),
+            ("python", platform.python_version()),
+            ("snps_per_chrom", args.snps_per_chrom),
+            ("repeat", args.repeat),
+            ("results", results),
+        ]
+    )
+
+    if not os.path.exists(args.output_dir):
+        os.makedirs(args.output_dir)
+
+    timestamp = datetime.datetime.now().strftime("%Y%m%d%H%M%S")
+    path = os.path.join(
+        args.output_dir, "{}_{}.json".format(commit or "results", timestamp)
+    )
+    with open(path, "w") as f:
+        json.dump(output, f, indent=2)
+    print("Saved results to " + path)
+
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)
+
+        if previous.get("snps_per_chrom") != args.snps_per_chrom:
+            print("warning: previous results are for a different number of SNPs")
+
+        print()
+        compare(results, previous["results"])
+
+
+if __name__ == "__main__":
+    sys.exit(main())
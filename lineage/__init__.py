@@ -22,16 +22,36 @@ along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 """
 
+from collections import OrderedDict
 import datetime
+import logging
 import os
 import numpy as np
 import pandas as pd
 
 # http://mikegrouchy.com/blog/2012/05/be-pythonic-__init__py.html
+from lineage import bgzf, instrumentation, progress
+from lineage.cache import ResultCache
+from lineage.cohort import (
+    X_NON_PAR,
+    Cohort,
+    compute_cMs,
+    find_segments,
+    find_segments_thresholds,
+)
 from lineage.ensembl import EnsemblRestClient
+from lineage.genotypes import (
+    NULL,
+    discordant_duo,
+    discordant_trio,
+    one_chrom_match,
+    two_chrom_match,
+)
 from lineage.individual import Individual
 from lineage.resources import Resources
-from lineage.snps import sort_snps
+from lineage.simulation import Simulator
+from lineage.snps import join_rsid_keys, sort_snps
+from lineage.store import CohortStore
 from lineage.visualization import plot_chromosomes
 
 # set version string with Versioneer
@@ -40,11 +60,18 @@ from lineage._version import get_versions
 __version__ = get_versions()["version"]
 del get_versions
 
+logger = logging.getLogger(__name__)
+
+# `lineage` is silent unless logging is configured by the application
+logger.addHandler(logging.NullHandler())
+
 
 class Lineage(object):
     """ Object used to interact with the `lineage` framework. """
 
-    def __init__(self, output_dir="output", resources_dir="resources"):
+    def __init__(
+        self, output_dir="output", resources_dir="resources", cache_size=1024, cache_dir=None
+    ):
         """ Initialize a ``Lineage`` object.
 
         Parameters
@@ -53,12 +80,21 @@ class Lineage(object):
             name / path of output directory
         resources_dir
             name / path of resources directory
+        cache_size : int
+            maximum number of pairwise results to cache in memory; results are reused while the
+            SNPs of both individuals, the parameters, and the resources are unchanged; shared
+            DNA is cached per chromosome (i.e., about 25 results per pair of individuals and
+            thresholds), so the default holds the shared DNA of about 40 pairs
+        cache_dir : str
+            if specified, also cache pairwise results in this directory, so results are reused
+            across processes
         """
         self._output_dir = os.path.abspath(output_dir)
         self._ensembl_rest_client = EnsemblRestClient()
         self._resources = Resources(
             resources_dir=resources_dir, ensembl_rest_client=self._ensembl_rest_client
         )
+        self._result_cache = ResultCache(cache_size, cache_dir)
 
     def create_individual(self, name, raw_data=None):
         """ Initialize an individual in the context of the `lineage` framework.
@@ -77,6 +113,84 @@ class Lineage(object):
         """
         return Individual(name, raw_data, self._output_dir)
 
+    def create_cohort(self, individuals, panel="union", filename=None):
+        """ Create a cohort of individuals in the context of the `lineage` framework.
+
+        The SNPs of the individuals are remapped to Build 37 (if necessary), and the genetic
+        position (cM) of each SNP of the cohort's panel is computed from the HapMap Phase II
+        genetic map.
+
+        Parameters
+        ----------
+        individuals : list of Individual
+            individuals of the cohort
+        panel : {'union', 'intersection'}
+            panel of SNPs; the SNPs of any individual, or only the SNPs common to all
+            individuals
+        filename : str
+            if specified, store the genotypes in a memory-mapped file at this path
+
+        Returns
+        -------
+        Cohort
+            ``Cohort`` initialized in the context of the `lineage` framework
+        """
+        self._remap_snps_to_GRCh37(individuals)
+
+        chroms = set()
+        for individual in individuals:
+            chroms.update(individual.chromosomes)
+
+        genetic_map = self._resources.get_genetic_map_HapMapII_GRCh37(sorted(chroms))
+
+        return Cohort(individuals, panel, genetic_map, filename)
+
+    def create_cohort_store(self, path, individuals, panel="union"):
+        """ Create a cohort of individuals stored on disk.
+
+        The panel of SNPs of the store is determined by `individuals` (see
+        :meth:`create_cohort`); more individuals can be added to the store one at a time with
+        :meth:`~lineage.store.CohortStore.add_individual`, so cohorts larger than memory can be
+        created and matched.
+
+        Parameters
+        ----------
+        path : str
+            path of store directory
+        individuals : list of Individual
+            individuals that determine the panel of the store, and the initial individuals of
+            the store
+        panel : {'union', 'intersection'}
+            panel of SNPs; the SNPs of any individual, or only the SNPs common to all
+            individuals
+
+        Returns
+        -------
+        CohortStore
+        """
+        return CohortStore.create(path, self.create_cohort(individuals, panel))
+
+    def create_simulator(self, snps=None, snp_count=700000, seed=None):
+        """ Create a simulator of individuals and raw data files in the context of the `lineage`
+        framework.
+
+        Parameters
+        ----------
+        snps : pandas.DataFrame
+            SNPs of the simulator's panel (e.g., the SNPs of an ``Individual`` with Build 37
+            positions); if None, a random panel is created
+        snp_count : int
+            number of SNPs of the random panel
+        seed : int
+            seed of the random number generator
+
+        Returns
+        -------
+        Simulator
+            ``Simulator`` initialized in the context of the `lineage` framework
+        """
+        return Simulator(self._resources, snps, snp_count, seed)
+
     def download_example_datasets(self):
         """ Download example datasets from `openSNP <https://opensnp.org>`_.
 
@@ -97,10 +211,42 @@ class Lineage(object):
         paths = self._resources.download_example_datasets()
 
         if None in paths:
-            print("Example dataset(s) not currently available")
+            logger.warning("Example dataset(s) not currently available")
 
         return paths
 
+    def get_memory_usage(self):
+        """ Get the memory used by the resources and cached results of this ``Lineage`` object.
+
+        The memory used by each ``Individual`` is reported by
+        :meth:`Individual.get_memory_usage`.
+
+        Returns
+        -------
+        pandas.Series
+            memory usage in bytes of each resource (e.g., 'resources.cytoBand_hg19'), and of
+            the cached pairwise results ('result_cache')
+        """
+        usage = self._resources.get_memory_usage()
+        usage.index = ["resources." + key for key in usage.index]
+        usage["result_cache"] = self._result_cache.get_memory_usage()
+        return usage
+
+    def clear_cache(self, resources=None):
+        """ Clear loaded resources and cached results in memory, to free memory.
+
+        Parameters
+        ----------
+        resources : list of str
+            resources to clear (see :meth:`Resources.clear_cache`); if None, clear all
+            resources and cached results
+        """
+        self._resources.clear_cache(resources)
+
+        if resources is None:
+            self._result_cache.clear()
+
+    @instrumentation.instrumented("lineage.remap_snps")
     def remap_snps(self, individual, target_assembly, complement_bases=True):
         """ Remap the SNP coordinates of an individual from one assembly to another.
 
@@ -145,18 +291,20 @@ class Lineage(object):
         chromosomes_remapped = []
         chromosomes_not_remapped = []
 
-        snps = individual.snps
+        snps = individual.get_snps(copy=False)
 
         if snps is None:
-            print("No SNPs to remap")
+            logger.warning("No SNPs to remap")
             return chromosomes_remapped, chromosomes_not_remapped
         else:
             chromosomes_not_remapped = list(snps["chrom"].unique())
 
+        instrumentation.count(len(snps))
+
         valid_assemblies = ["NCBI36", "GRCh37", "GRCh38", 36, 37, 38]
 
         if target_assembly not in valid_assemblies:
-            print("Invalid target assembly")
+            logger.warning("Invalid target assembly")
             return chromosomes_remapped, chromosomes_not_remapped
 
         if isinstance(target_assembly, int):
@@ -174,13 +322,18 @@ class Lineage(object):
             return chromosomes_remapped, chromosomes_not_remapped
 
         assembly_mapping_data = self._resources.get_assembly_mapping_data(
-            source_assembly, target_assembly
+            source_assembly, target_assembly, chromosomes_not_remapped
         )
 
         if assembly_mapping_data is None:
             return chromosomes_remapped, chromosomes_not_remapped
 
-        for chrom in snps["chrom"].unique():
+        # remapping modifies the SNPs, so copy them
+        snps = snps.copy()
+
+        chroms = snps["chrom"].unique()
+
+        for i, chrom in enumerate(chroms, 1):
             # extract SNPs for this chrom for faster remapping
             temp = pd.DataFrame(snps.loc[snps["chrom"] == chrom])
 
@@ -191,11 +344,13 @@ class Lineage(object):
                 chromosomes_not_remapped.remove(chrom)
                 mappings = assembly_mapping_data[chrom]
             else:
-                print(
-                    "Chromosome " + chrom + " not remapped; "
-                    "removing chromosome from SNPs for consistency"
+                logger.warning(
+                    "Chromosome %s not remapped; removing chromosome from SNPs for "
+                    "consistency",
+                    chrom,
                 )
                 snps = snps.drop(snps.loc[snps["chrom"] == chrom].index)
+                progress.report("lineage.remap_snps", i, len(chroms), chrom)
                 continue
 
             pos_start = int(temp["pos"].describe()["min"])
@@ -218,11 +373,12 @@ class Lineage(object):
                 mapped_region = mapping["mapped"]["seq_region_name"]
 
                 if orig_region != mapped_region:
-                    print("discrepant chroms")
+                    logger.debug("discrepant chroms")
                     continue
 
                 if orig_range_len != mapped_range_len:
-                    print("discrepant coords")  # observed when mapping NCBI36 -> GRCh38
+                    # observed when mapping NCBI36 -> GRCh38
+                    logger.debug("discrepant coords")
                     continue
 
                 # find the SNPs that are being remapped for this mapping
@@ -259,6 +415,7 @@ class Lineage(object):
 
             # update SNP positions for this chrom
             snps.loc[temp.index, "pos"] = temp["pos"]
+            progress.report("lineage.remap_snps", i, len(chroms), chrom)
 
         individual._set_snps(sort_snps(snps), int(target_assembly[-2:]))
 
@@ -284,6 +441,7 @@ class Lineage(object):
 
         return complement
 
+    @instrumentation.instrumented("lineage.find_discordant_snps")
     def find_discordant_snps(
         self, individual1, individual2, individual3=None, save_output=False
     ):
@@ -316,38 +474,36 @@ class Lineage(object):
         """
         self._remap_snps_to_GRCh37([individual1, individual2, individual3])
 
-        df = individual1.snps
-
-        # remove nulls for reference individual
-        df = df.loc[df["genotype"].notnull()]
-
-        # add SNPs shared with `individual2`
-        df = df.join(individual2.snps["genotype"], rsuffix="2")
+        # SNPs are only read, so get them without copying; columns added to `df` are not
+        # added to `individual1`
+        df = individual1.get_snps(copy=False)
 
         genotype1 = "genotype_" + individual1.get_var_name()
         genotype2 = "genotype_" + individual2.get_var_name()
 
-        if individual3 is None:
-            df = df.rename(columns={"genotype": genotype1, "genotype2": genotype2})
+        # add SNPs shared with `individual2`
+        df[genotype2], _ = self._get_genotypes(individual2, individual1)
+        codes1 = individual1._get_genotype_codes()
+        codes2, _ = self._get_genotypes(individual2, individual1, encoded=True)
 
+        if individual3 is None:
             # find discordant SNPs between reference and comparison individuals
-            df = df.loc[
-                df[genotype2].notnull()
-                & (
-                    (df[genotype1].str.len() == 1)
-                    & (df[genotype2].str.len() == 1)
-                    & (df[genotype1] != df[genotype2])
-                )
-                | (
-                    (df[genotype1].str.len() == 2)
-                    & (df[genotype2].str.len() == 2)
-                    & (df[genotype1].str[0] != df[genotype2].str[0])
-                    & (df[genotype1].str[0] != df[genotype2].str[1])
-                    & (df[genotype1].str[1] != df[genotype2].str[0])
-                    & (df[genotype1].str[1] != df[genotype2].str[1])
-                )
-            ]
-            if save_output:
+            discordant = discordant_duo(codes1, codes2)
+        else:
+            genotype3 = "genotype_" + individual3.get_var_name()
+
+            # add SNPs shared with `individual3`
+            df[genotype3], _ = self._get_genotypes(individual3, individual1)
+            codes3, _ = self._get_genotypes(individual3, individual1, encoded=True)
+
+            # find discordant SNPs between child and two parents
+            discordant = discordant_trio(codes1, codes2, codes3)
+
+        # discordant SNPs exclude nulls for reference individual
+        df = df.loc[discordant].rename(columns={"genotype": genotype1})
+
+        if save_output:
+            if individual3 is None:
                 save_df_as_csv(
                     df,
                     self._output_dir,
@@ -357,65 +513,7 @@ class Lineage(object):
                     + individual2.get_var_name()
                     + "_GRCh37.csv",
                 )
-        else:
-            # add SNPs shared with `individual3`
-            df = df.join(individual3.snps["genotype"], rsuffix="3")
-
-            genotype3 = "genotype_" + individual3.get_var_name()
-
-            df = df.rename(
-                columns={
-                    "genotype": genotype1,
-                    "genotype2": genotype2,
-                    "genotype3": genotype3,
-                }
-            )
-
-            # find discordant SNPs between child and two parents
-            df = df.loc[
-                (
-                    df[genotype2].notnull()
-                    & (
-                        (df[genotype1].str.len() == 1)
-                        & (df[genotype2].str.len() == 1)
-                        & (df[genotype1] != df[genotype2])
-                    )
-                    | (
-                        (df[genotype1].str.len() == 2)
-                        & (df[genotype2].str.len() == 2)
-                        & (df[genotype1].str[0] != df[genotype2].str[0])
-                        & (df[genotype1].str[0] != df[genotype2].str[1])
-                        & (df[genotype1].str[1] != df[genotype2].str[0])
-                        & (df[genotype1].str[1] != df[genotype2].str[1])
-                    )
-                )
-                | (
-                    df[genotype3].notnull()
-                    & (
-                        (df[genotype1].str.len() == 1)
-                        & (df[genotype3].str.len() == 1)
-                        & (df[genotype1] != df[genotype3])
-                    )
-                    | (
-                        (df[genotype1].str.len() == 2)
-                        & (df[genotype3].str.len() == 2)
-                        & (df[genotype1].str[0] != df[genotype3].str[0])
-                        & (df[genotype1].str[0] != df[genotype3].str[1])
-                        & (df[genotype1].str[1] != df[genotype3].str[0])
-                        & (df[genotype1].str[1] != df[genotype3].str[1])
-                    )
-                )
-                | (
-                    df[genotype2].notnull()
-                    & df[genotype3].notnull()
-                    & (df[genotype2].str.len() == 2)
-                    & (df[genotype2].str[0] == df[genotype2].str[1])
-                    & (df[genotype2] == df[genotype3])
-                    & (df[genotype1] != df[genotype2])
-                )
-            ]
-
-            if save_output:
+            else:
                 save_df_as_csv(
                     df,
                     self._output_dir,
@@ -430,6 +528,132 @@ class Lineage(object):
 
         return df
 
+    @instrumentation.instrumented("lineage.find_mendelian_errors")
+    def find_mendelian_errors(self, pedigree, save_output=False):
+        """ Find Mendelian errors between the children and parents of a pedigree.
+
+        The SNPs of all individuals in the pedigree are remapped (if necessary) and aligned on a
+        panel of all of their SNPs once (see :class:`~lineage.cohort.Cohort`), and the Mendelian
+        errors of every family (i.e., a child and its parents) and every parent-child edge are
+        found in one vectorized pass (see :func:`~lineage.genotypes.discordant_trio` and
+        :func:`~lineage.genotypes.discordant_duo`).
+
+        Parameters
+        ----------
+        pedigree : dict
+            map of each child (Individual) to its parents (tuple of one or two Individuals;
+            a parent can be None if unknown); use a `collections.OrderedDict` to specify the
+            order of the output
+        save_output : bool
+            specifies whether to save output to CSV files in the output directory
+
+        Returns
+        -------
+        snp_errors : pandas.DataFrame
+            SNPs with Mendelian errors, and the number of families with an error at each SNP
+        edge_errors : pandas.DataFrame
+            number of SNPs genotyped for both the child and parent, and the number of Mendelian
+            errors, for each parent-child edge
+        individual_errors : pandas.DataFrame
+            for each individual, the number of SNPs genotyped for the individual and at least
+            one parent, the number of Mendelian errors as a child (considering both parents, if
+            known), and the number of Mendelian errors of all edges with the individual
+        """
+        families = []
+        individuals = []
+        indices = {}
+
+        for child, parents in pedigree.items():
+            parents = [parent for parent in parents if parent is not None]
+            families.append([child] + parents)
+
+            for individual in [child] + parents:
+                if id(individual) not in indices:
+                    indices[id(individual)] = len(individuals)
+                    individuals.append(individual)
+
+        self._remap_snps_to_GRCh37(individuals)
+
+        cohort = Cohort(individuals)
+        codes = cohort.genotypes
+
+        # Mendelian errors of each family
+        errors = np.zeros((len(families), cohort.snp_count), dtype=bool)
+        genotyped = np.zeros((len(families), cohort.snp_count), dtype=bool)
+
+        for n_parents, discordant in [(1, discordant_duo), (2, discordant_trio)]:
+            rows = [i for i, family in enumerate(families) if len(family) == n_parents + 1]
+
+            if len(rows) == 0:
+                continue
+
+            members = [
+                [indices[id(families[row][j])] for row in rows]
+                for j in range(n_parents + 1)
+            ]
+
+            errors[rows] = discordant(*[codes[member] for member in members])
+            genotyped[rows] = (codes[members[0]] != NULL) & np.any(
+                [codes[member] != NULL for member in members[1:]], axis=0
+            )
+
+        # Mendelian errors of each parent-child edge
+        edges = [(family[0], parent) for family in families for parent in family[1:]]
+        children = [indices[id(child)] for child, _ in edges]
+        parents = [indices[id(parent)] for _, parent in edges]
+
+        edge_errors = pd.DataFrame(
+            {
+                "child": [child.get_var_name() for child, _ in edges],
+                "parent": [parent.get_var_name() for _, parent in edges],
+                "snps": np.sum(
+                    (codes[children] != NULL) & (codes[parents] != NULL), axis=1
+                ),
+                "errors": np.sum(
+                    discordant_duo(codes[children], codes[parents]), axis=1
+                ),
+            },
+            columns=["child", "parent", "snps", "errors"],
+        )
+
+        individual_errors = pd.DataFrame(
+            0,
+            index=pd.Index(
+                [individual.get_var_name() for individual in individuals], name="name"
+            ),
+            columns=["snps", "errors", "edge_errors"],
+        )
+
+        for i, family in enumerate(families):
+            individual_errors.iloc[indices[id(family[0])], 0] = np.sum(genotyped[i])
+            individual_errors.iloc[indices[id(family[0])], 1] = np.sum(errors[i])
+
+        for (child, parent), count in zip(edges, edge_errors["errors"].values):
+            individual_errors.iloc[indices[id(child)], 2] += count
+            individual_errors.iloc[indices[id(parent)], 2] += count
+
+        # SNPs with Mendelian errors
+        snp_counts = np.sum(errors, axis=0)
+        snp_errors = cohort.get_snps().loc[snp_counts > 0, ["chrom", "pos"]]
+        snp_errors["errors"] = snp_counts[snp_counts > 0]
+
+        if save_output:
+            save_df_as_csv(
+                snp_errors, self._output_dir, "mendelian_errors_snps_GRCh37.csv"
+            )
+            save_df_as_csv(
+                edge_errors,
+                self._output_dir,
+                "mendelian_errors_edges.csv",
+                index=False,
+            )
+            save_df_as_csv(
+                individual_errors, self._output_dir, "mendelian_errors_individuals.csv"
+            )
+
+        return snp_errors, edge_errors, individual_errors
+
+    @instrumentation.instrumented("lineage.find_shared_dna")
     def find_shared_dna(
         self,
         individual1,
@@ -476,59 +700,9 @@ class Lineage(object):
 
         self._remap_snps_to_GRCh37([individual1, individual2])
 
-        df = individual1.snps
-
-        df = df.join(individual2.snps["genotype"], rsuffix="2", how="inner")
-
-        genotype1 = "genotype_" + individual1.get_var_name()
-        genotype2 = "genotype_" + individual2.get_var_name()
-
-        df = df.rename(columns={"genotype": genotype1, "genotype2": genotype2})
-
-        one_x_chrom = self._is_one_individual_male([individual1, individual2])
-
-        # determine the genetic distance between each SNP using the HapMap Phase II genetic map
-        genetic_map, df = self._compute_snp_distances(df)
-
-        # determine where individuals share an allele on one chromosome
-        df["one_chrom_match"] = np.where(
-            df[genotype1].isnull()
-            | df[genotype2].isnull()
-            | (df[genotype1].str[0] == df[genotype2].str[0])
-            | (df[genotype1].str[0] == df[genotype2].str[1])
-            | (df[genotype1].str[1] == df[genotype2].str[0])
-            | (df[genotype1].str[1] == df[genotype2].str[1]),
-            True,
-            False,
-        )
-
-        # determine where individuals share alleles on both chromosomes
-        df["two_chrom_match"] = np.where(
-            df[genotype1].isnull()
-            | df[genotype2].isnull()
-            | (
-                (df[genotype1].str.len() == 2)
-                & (df[genotype2].str.len() == 2)
-                & (
-                    (df[genotype1] == df[genotype2])
-                    | (
-                        (df[genotype1].str[0] == df[genotype2].str[1])
-                        & (df[genotype1].str[1] == df[genotype2].str[0])
-                    )
-                )
-            ),
-            True,
-            False,
-        )
-
-        # compute shared DNA between individuals
-        one_chrom_shared_dna = self._compute_shared_dna(
-            df, genetic_map, "one_chrom_match", cM_threshold, snp_threshold, one_x_chrom
-        )
-
-        two_chrom_shared_dna = self._compute_shared_dna(
-            df, genetic_map, "two_chrom_match", cM_threshold, snp_threshold, one_x_chrom
-        )
+        one_chrom_shared_dna, two_chrom_shared_dna = self._find_shared_dna_segments(
+            individual1, individual2, [(cM_threshold, snp_threshold)]
+        )[0]
 
         cytobands = self._resources.get_cytoBand_hg19()
 
@@ -596,17 +770,459 @@ class Lineage(object):
             two_chrom_shared_genes,
         )
 
+    @instrumentation.instrumented("lineage.find_shared_dna_summary")
+    def find_shared_dna_summary(
+        self, individual1, individual2, cM_threshold=0.75, snp_threshold=1100
+    ):
+        """ Summarize the shared DNA between two individuals.
+
+        This is a fast path of :meth:`find_shared_dna` for ranking matches: only the totals of
+        the shared DNA segments are computed, from the genotype codes and genetic positions of
+        the SNPs of each chromosome. No DataFrames are created, no resources other than the
+        genetic map are loaded, and no output is saved. The summary of each chromosome is
+        cached; segments cached by :meth:`find_shared_dna` are also used.
+
+        Parameters
+        ----------
+        individual1 : Individual
+        individual2 : Individual
+        cM_threshold : float
+            minimum centiMorgans for each shared DNA segment
+        snp_threshold : int
+            minimum SNPs for each shared DNA segment
+
+        Returns
+        -------
+        dict
+            count of segments (`one_chrom_segments`), total centiMorgans (`one_chrom_cMs`), and
+            centiMorgans of the longest segment (`one_chrom_longest_cMs`) of shared DNA on one
+            chromosome; likewise for shared DNA on two chromosomes (`two_chrom_segments`,
+            `two_chrom_cMs`, and `two_chrom_longest_cMs`)
+        """
+        self._remap_snps_to_GRCh37([individual1, individual2])
+
+        keys = self._get_shared_dna_keys(
+            individual1, individual2, cM_threshold, snp_threshold
+        )
+
+        summaries = {}
+        for chrom, key in keys.items():
+            cached = self._result_cache.get(("shared_dna_summary",) + key[1:])
+
+            if cached is None:
+                shared_dna = self._result_cache.get(key)
+                if shared_dna is not None:
+                    cached = tuple(
+                        self._summarize_segments([x["cMs"] for x in segments])
+                        for segments in shared_dna
+                    )
+
+            if cached is not None:
+                summaries[chrom] = cached
+
+        # only compute the summaries of chromosomes without cached results
+        chroms = [chrom for chrom in individual1.chromosomes if chrom not in summaries]
+
+        if len(chroms) > 0:
+            computed = self._compute_shared_dna_summaries(
+                individual1, individual2, cM_threshold, snp_threshold, chroms
+            )
+
+            for chrom in chroms:
+                # chromosomes without a genetic map don't have shared DNA
+                summaries[chrom] = computed.get(
+                    chrom, (self._summarize_segments([]), self._summarize_segments([]))
+                )
+
+                if chrom in keys:
+                    self._result_cache.set(
+                        ("shared_dna_summary",) + keys[chrom][1:], summaries[chrom]
+                    )
+
+        summary = {}
+
+        for i, prefix in enumerate(("one_chrom", "two_chrom")):
+            chrom_summaries = [summaries[chrom][i] for chrom in summaries]
+            summary[prefix + "_segments"] = sum(x[0] for x in chrom_summaries)
+            summary[prefix + "_cMs"] = float(sum(x[1] for x in chrom_summaries))
+            summary[prefix + "_longest_cMs"] = max(
+                [x[2] for x in chrom_summaries], default=0.0
+            )
+
+        return summary
+
+    @instrumentation.instrumented("lineage.find_shared_dna_thresholds")
+    def find_shared_dna_thresholds(self, individual1, individual2, thresholds):
+        """ Find the shared DNA between two individuals for several pairs of thresholds.
+
+        The genotypes of the individuals are compared, the genetic distances between SNPs are
+        computed, and the runs of matching SNPs are found once; each pair of thresholds is then
+        applied to the runs (see :meth:`find_shared_dna`). This is much faster than calling
+        :meth:`find_shared_dna` for each pair of thresholds, e.g., to tune thresholds.
+
+        Results are cached like the results of :meth:`find_shared_dna`, so subsequent calls of
+        either method with any of the pairs of thresholds use the cached results. No output is
+        saved.
+
+        Parameters
+        ----------
+        individual1 : Individual
+        individual2 : Individual
+        thresholds : list of tuple
+            pairs of minimum centiMorgans (float) and minimum SNPs (int) for each shared DNA
+            segment, e.g., ``[(0.75, 1100), (7, 500)]``
+
+        Returns
+        -------
+        collections.OrderedDict
+            segments of shared DNA on one and two chromosomes (see :meth:`find_shared_dna`),
+            for each pair of thresholds, in the order of `thresholds`; keyed by
+            `(cM_threshold, snp_threshold)`
+
+        Raises
+        ------
+        ValueError
+            if a pair of thresholds is invalid
+        """
+        pairs = []
+
+        for threshold in thresholds:
+            try:
+                cM_threshold, snp_threshold = threshold
+                pair = (float(cM_threshold), int(snp_threshold))
+            except (TypeError, ValueError):
+                raise ValueError("invalid thresholds " + repr(threshold))
+
+            if pair not in pairs:
+                pairs.append(pair)
+
+        if len(pairs) == 0:
+            return OrderedDict()
+
+        self._remap_snps_to_GRCh37([individual1, individual2])
+
+        shared_dna = self._find_shared_dna_segments(individual1, individual2, pairs)
+
+        return OrderedDict(
+            (
+                pair,
+                (
+                    self._convert_shared_dna_list_to_df(one_chrom_shared_dna),
+                    self._convert_shared_dna_list_to_df(two_chrom_shared_dna),
+                ),
+            )
+            for pair, (one_chrom_shared_dna, two_chrom_shared_dna) in zip(
+                pairs, shared_dna
+            )
+        )
+
+    def _get_shared_dna_keys(self, individual1, individual2, cM_threshold, snp_threshold):
+        """ Get the keys of the shared DNA of each chromosome in the result cache.
+
+        Shared DNA is cached by chromosome, so that when the SNPs of an individual change (e.g.,
+        SNPs are added from another file, or discrepant SNPs are nulled), only the shared DNA of
+        the chromosomes with changed SNPs is recomputed.
+
+        Returns
+        -------
+        dict
+            key of each chromosome of `individual1`, or empty dict if results can't be cached
+        """
+        genetic_map_version = self._resources.get_genetic_map_HapMapII_GRCh37_version()
+
+        if genetic_map_version is None:
+            return {}
+
+        fingerprints1 = individual1.chromosome_fingerprints
+        fingerprints2 = individual2.chromosome_fingerprints
+        one_x_chrom = self._is_one_individual_male([individual1, individual2])
+
+        return {
+            chrom: (
+                "shared_dna",
+                chrom,
+                fingerprints1[chrom],
+                fingerprints2.get(chrom),
+                float(cM_threshold),
+                int(snp_threshold),
+                genetic_map_version,
+                one_x_chrom if chrom == "X" else None,
+            )
+            for chrom in fingerprints1
+        }
+
+    def _find_shared_dna_segments(self, individual1, individual2, thresholds):
+        """ Find the segments of shared DNA for each pair of thresholds.
+
+        Cached results are used where available; the shared DNA of the remaining chromosomes is
+        computed for all pairs of thresholds in one pass.
+
+        Returns
+        -------
+        list of tuple
+            lists of the segments of shared DNA on one and two chromosomes, for each pair of
+            `thresholds`
+        """
+        keys = [
+            self._get_shared_dna_keys(
+                individual1, individual2, cM_threshold, snp_threshold
+            )
+            for cM_threshold, snp_threshold in thresholds
+        ]
+
+        if len(keys[0]) == 0:
+            return self._compute_shared_dna_segments(
+                individual1, individual2, thresholds
+            )
+
+        shared_dna = [{} for _ in thresholds]
+        for i in range(len(thresholds)):
+            for chrom, key in keys[i].items():
+                cached = self._result_cache.get(key)
+                if cached is not None:
+                    shared_dna[i][chrom] = cached
+
+        # only compute the shared DNA of chromosomes and thresholds without cached results
+        missing = [
+            i for i in range(len(thresholds)) if len(shared_dna[i]) < len(keys[i])
+        ]
+        chroms = [
+            chrom
+            for chrom in keys[0]
+            if any(chrom not in shared_dna[i] for i in missing)
+        ]
+
+        if len(missing) > 0:
+            computed = self._compute_shared_dna_segments(
+                individual1, individual2, [thresholds[i] for i in missing], chroms
+            )
+
+            for i, (one_chrom_shared_dna, two_chrom_shared_dna) in zip(
+                missing, computed
+            ):
+                for chrom in chroms:
+                    shared_dna[i][chrom] = (
+                        [x for x in one_chrom_shared_dna if x["chrom"] == chrom],
+                        [x for x in two_chrom_shared_dna if x["chrom"] == chrom],
+                    )
+                    self._result_cache.set(keys[i][chrom], shared_dna[i][chrom])
+
+        # combine the shared DNA of each chromosome, in the order of the chromosomes
+        return [
+            tuple(
+                [
+                    x
+                    for chrom in individual1.chromosomes
+                    for x in shared_dna[i][chrom][j]
+                ]
+                for j in range(2)
+            )
+            for i in range(len(thresholds))
+        ]
+
+    @instrumentation.instrumented("lineage.compute_shared_dna_segments")
+    def _compute_shared_dna_segments(
+        self, individual1, individual2, thresholds, chroms=None
+    ):
+        df = individual1.get_snps(copy=False)
+
+        df["genotype2"], common = self._get_genotypes(individual2, individual1)
+
+        if chroms is not None:
+            common &= df["chrom"].isin(chroms).values
+
+        df = df.loc[common]
+        instrumentation.count(len(df))
+
+        genotype1 = "genotype_" + individual1.get_var_name()
+        genotype2 = "genotype_" + individual2.get_var_name()
+
+        df = df.rename(columns={"genotype": genotype1, "genotype2": genotype2})
+
+        one_x_chrom = self._is_one_individual_male([individual1, individual2])
+
+        # determine the genetic distance between each SNP using the HapMap Phase II genetic map
+        genetic_map, df = self._compute_snp_distances(df)
+
+        # determine where individuals share an allele on one chromosome
+        df["one_chrom_match"] = np.where(
+            df[genotype1].isnull()
+            | df[genotype2].isnull()
+            | (df[genotype1].str[0] == df[genotype2].str[0])
+            | (df[genotype1].str[0] == df[genotype2].str[1])
+            | (df[genotype1].str[1] == df[genotype2].str[0])
+            | (df[genotype1].str[1] == df[genotype2].str[1]),
+            True,
+            False,
+        )
+
+        # determine where individuals share alleles on both chromosomes
+        df["two_chrom_match"] = np.where(
+            df[genotype1].isnull()
+            | df[genotype2].isnull()
+            | (
+                (df[genotype1].str.len() == 2)
+                & (df[genotype2].str.len() == 2)
+                & (
+                    (df[genotype1] == df[genotype2])
+                    | (
+                        (df[genotype1].str[0] == df[genotype2].str[1])
+                        & (df[genotype1].str[1] == df[genotype2].str[0])
+                    )
+                )
+            ),
+            True,
+            False,
+        )
+
+        # compute shared DNA between individuals
+        one_chrom_shared_dna = self._compute_shared_dna(
+            df, genetic_map, "one_chrom_match", thresholds, one_x_chrom
+        )
+
+        two_chrom_shared_dna = self._compute_shared_dna(
+            df, genetic_map, "two_chrom_match", thresholds, one_x_chrom
+        )
+
+        return list(zip(one_chrom_shared_dna, two_chrom_shared_dna))
+
+    @instrumentation.instrumented("lineage.compute_shared_dna_summaries")
+    def _compute_shared_dna_summaries(
+        self, individual1, individual2, cM_threshold, snp_threshold, chroms
+    ):
+        """ Summarize the shared DNA of each chromosome, using arrays instead of DataFrames.
+
+        Returns
+        -------
+        dict
+            summaries (see :meth:`_summarize_segments`) of the shared DNA on one and two
+            chromosomes, for each of `chroms` with a genetic map
+        """
+        snps = individual1._snps
+        codes1 = individual1._get_genotype_codes()
+        codes2, common = self._get_genotypes(individual2, individual1, encoded=True)
+        instrumentation.count(len(snps))
+
+        one_x_chrom = self._is_one_individual_male([individual1, individual2])
+        genetic_map = self._resources.get_genetic_map_HapMapII_GRCh37(chroms)
+
+        # SNPs are sorted by chromosome, so each chromosome is a contiguous slice
+        chrom_codes = snps["chrom"].cat.codes.values
+        bounds = np.r_[0, np.flatnonzero(np.diff(chrom_codes)) + 1, len(chrom_codes)]
+
+        summaries = {}
+
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            if start == end:
+                continue
+
+            chrom = snps["chrom"].cat.categories[chrom_codes[start]]
+
+            if chrom not in chroms or chrom not in genetic_map.keys():
+                continue
+
+            # only compare the SNPs that both individuals have
+            mask = common[start:end]
+            pos = snps["pos"].values[start:end][mask]
+            chrom_codes1 = codes1[start:end][mask]
+            chrom_codes2 = codes2[start:end][mask]
+
+            cMs = compute_cMs(pos, genetic_map[chrom])
+
+            matches = [
+                one_chrom_match(chrom_codes1, chrom_codes2),
+                two_chrom_match(chrom_codes1, chrom_codes2),
+            ]
+
+            # set two_chrom_match in non-PAR region to False if an individual is male
+            if chrom == "X" and one_x_chrom:
+                matches[1][(pos > X_NON_PAR[0]) & (pos < X_NON_PAR[1])] = False
+
+            summaries[chrom] = tuple(
+                self._summarize_segments(
+                    find_segments(match, cMs, cM_threshold, snp_threshold)[1]
+                )
+                for match in matches
+            )
+
+        return summaries
+
+    @staticmethod
+    def _summarize_segments(segment_cMs):
+        """ Summarize segments of shared DNA.
+
+        Returns
+        -------
+        tuple
+            count of segments, total centiMorgans, and centiMorgans of the longest segment
+        """
+        if len(segment_cMs) == 0:
+            return 0, 0.0, 0.0
+
+        return len(segment_cMs), float(np.sum(segment_cMs)), float(np.max(segment_cMs))
+
+    @staticmethod
+    def _get_genotypes(individual, individual_ref, encoded=False):
+        """ Get the genotypes of an individual at the SNPs of a reference individual.
+
+        SNPs are joined on their integer rsid keys (see :func:`~lineage.snps.join_rsid_keys`).
+
+        Parameters
+        ----------
+        individual : Individual
+            individual with genotypes to get
+        individual_ref : Individual
+            reference individual
+        encoded : bool
+            get genotype codes (see :func:`~lineage.genotypes.encode_genotypes`) instead of
+            genotypes
+
+        Returns
+        -------
+        genotypes : numpy.ndarray
+            genotypes of `individual`, aligned to the SNPs of `individual_ref`; null where
+            `individual` does not have the SNP
+        common : numpy.ndarray
+            bool mask of the SNPs of `individual_ref` that `individual` also has
+        """
+        keys_ref, order_ref = individual_ref._get_rsid_keys()
+        keys, order = individual._get_rsid_keys()
+
+        indices_ref, indices = join_rsid_keys(
+            keys_ref,
+            keys,
+            order_ref,
+            order,
+            individual_ref._snps.index,
+            individual._snps.index,
+        )
+
+        if encoded:
+            genotypes = np.full(len(keys_ref), NULL, dtype=np.uint8)
+            genotypes[indices_ref] = individual._get_genotype_codes()[indices]
+        else:
+            genotypes = np.full(len(keys_ref), np.nan, dtype=object)
+            genotypes[indices_ref] = individual._snps["genotype"].values[indices]
+
+        common = np.zeros(len(keys_ref), dtype=bool)
+        common[indices_ref] = True
+
+        return genotypes, common
+
     def _convert_shared_dna_list_to_df(self, shared_dna):
         df = pd.DataFrame(shared_dna, columns=["chrom", "start", "end", "cMs", "snps"])
         df.index.name = "segment"
         df.index = df.index + 1
         return df
 
+    @instrumentation.instrumented("lineage.compute_shared_genes")
     def _compute_shared_genes(
         self, shared_dna, type, individual1_name, individual2_name, save_output
     ):
-        knownGenes = self._resources.get_knownGene_hg19()
-        kgXref = self._resources.get_kgXref_hg19()
+        # only load the genes of the chromosomes with shared DNA
+        chroms = list(shared_dna["chrom"].unique())
+        knownGenes = self._resources.get_knownGene_hg19(chroms)
+        kgXref = self._resources.get_kgXref_hg19(chroms)
 
         # http://seqanswers.com/forums/showthread.php?t=22336
         df = knownGenes.join(kgXref)
@@ -688,8 +1304,13 @@ class Lineage(object):
                 return True
         return False
 
+    @instrumentation.instrumented("lineage.compute_snp_distances")
     def _compute_snp_distances(self, df):
-        genetic_map = self._resources.get_genetic_map_HapMapII_GRCh37()
+        instrumentation.count(len(df))
+
+        genetic_map = self._resources.get_genetic_map_HapMapII_GRCh37(
+            list(df["chrom"].unique())
+        )
 
         for chrom in df["chrom"].unique():
             if chrom not in genetic_map.keys():
@@ -749,10 +1370,8 @@ class Lineage(object):
 
         return genetic_map, df
 
-    def _compute_shared_dna(
-        self, df, genetic_map, col, cM_threshold, snp_threshold, one_x_chrom
-    ):
-        shared_dna = []
+    def _compute_shared_dna(self, df, genetic_map, col, thresholds, one_x_chrom):
+        shared_dna = [[] for _ in thresholds]
 
         for chrom in df["chrom"].unique():
             if chrom not in genetic_map.keys():
@@ -760,91 +1379,40 @@ class Lineage(object):
 
             # set two_chrom_match in non-PAR region to False if an individual is male
             if chrom == "X" and col == "two_chrom_match" and one_x_chrom:
-                # https://www.ncbi.nlm.nih.gov/grc/human
                 df.loc[
                     (df["chrom"] == "X")
-                    & (df["pos"] > 2699520)
-                    & (df["pos"] < 154931044),
+                    & (df["pos"] > X_NON_PAR[0])
+                    & (df["pos"] < X_NON_PAR[1]),
                     "two_chrom_match",
                 ] = False
 
-            # get consecutive strings of trues
-            # http://stackoverflow.com/a/17151327
-            a = df.loc[(df["chrom"] == chrom)][col].values
-            a = np.r_[a, False]
-            a_rshifted = np.roll(a, 1)
-            starts = a & ~a_rshifted
-            ends = ~a & a_rshifted
-            a_starts = np.nonzero(starts)[0]
-            a_starts = np.reshape(a_starts, (len(a_starts), 1))
-            a_ends = np.nonzero(ends)[0]
-            a_ends = np.reshape(a_ends, (len(a_ends), 1))
-
-            matches = np.hstack((a_starts, a_ends))
-
-            c = np.r_[0, df.loc[(df["chrom"] == chrom)]["cM_from_prev_snp"].cumsum()][
-                matches
-            ]
-            cMs_match_segment = c[:, 1] - c[:, 0]
-
-            # get matching segments where total cMs is greater than the threshold
-            matches_passed = matches[np.where(cMs_match_segment > cM_threshold)]
+            snps = df.loc[(df["chrom"] == chrom)]
 
-            # get indices where a_end boundary is adjacent to a_start, perhaps indicating a
-            # discrepant SNP
-            adjacent_ix = np.where(
-                np.roll(matches_passed[:, 0], -1) - matches_passed[:, 1] == 1
+            # find the runs of matching SNPs once for all pairs of thresholds
+            segments = find_segments_thresholds(
+                snps[col].values, snps["cM_from_prev_snp"].cumsum().values, thresholds
             )
 
-            # if there are adjacent segments
-            if len(adjacent_ix[0]) != 0:
-                matches_stitched = np.array([0, 0])
-                prev = -1
-                counter = 0
-
-                # stitch together adjacent segments
-                for x in matches_passed:
-                    if prev != -1 and prev + 1 == x[0]:
-                        matches_stitched[counter, 1] = x[1]
-                    else:
-                        matches_stitched = np.vstack((matches_stitched, x))
-                        counter += 1
-
-                    prev = x[1]
-
-                matches_passed = matches_stitched[1:]
-
-            snp_counts = matches_passed[:, 1] - matches_passed[:, 0]
-
-            # apply SNP count threshold for each matching segment; we now have the shared DNA
-            # segments that pass the centiMorgan and SNP thresholds
-            matches_passed = matches_passed[np.where(snp_counts > snp_threshold)]
-
-            # compute total cMs for each match segment
-            c = np.r_[0, df.loc[(df["chrom"] == chrom)]["cM_from_prev_snp"].cumsum()][
-                matches_passed
-            ]
-            cMs_match_segment = c[:, 1] - c[:, 0]
-
-            counter = 0
             # save matches for this chromosome
             if col == "one_chrom_match":
                 chrom_stain = "one_chrom"
             else:
                 chrom_stain = "two_chrom"
 
-            for x in matches_passed:
-                shared_dna.append(
-                    {
-                        "chrom": chrom,
-                        "start": df.loc[(df["chrom"] == chrom)].ix[x[0]].pos,
-                        "end": df.loc[(df["chrom"] == chrom)].ix[x[1] - 1].pos,
-                        "cMs": cMs_match_segment[counter],
-                        "snps": x[1] - x[0],
-                        "gie_stain": chrom_stain,
-                    }
-                )
-                counter += 1
+            for i, (matches_passed, cMs_match_segment) in enumerate(segments):
+                counter = 0
+                for x in matches_passed:
+                    shared_dna[i].append(
+                        {
+                            "chrom": chrom,
+                            "start": snps["pos"].iat[x[0]],
+                            "end": snps["pos"].iat[x[1] - 1],
+                            "cMs": cMs_match_segment[counter],
+                            "snps": x[1] - x[0],
+                            "gie_stain": chrom_stain,
+                        }
+                    )
+                    counter += 1
         return shared_dna
 
     @staticmethod
@@ -873,7 +1441,7 @@ def create_dir(path):
     try:
         os.makedirs(path, exist_ok=True)
     except Exception as err:
-        print(err)
+        logger.error(err)
         return False
 
     if os.path.exists(path):
@@ -882,7 +1450,8 @@ def create_dir(path):
         return False
 
 
-def save_df_as_csv(df, path, filename, comment=None, **kwargs):
+@instrumentation.instrumented("lineage.save_csv")
+def save_df_as_csv(df, path, filename, comment=None, bgzip=False, **kwargs):
     """ Save dataframe to a CSV file.
 
     Parameters
@@ -895,6 +1464,9 @@ def save_df_as_csv(df, path, filename, comment=None, **kwargs):
         filename of CSV file
     comment : str
         header comment(s); one or more lines starting with '#'
+    bgzip : bool
+        compress the file with BGZF and index it by chromosome / position (requires `chrom`
+        and `pos` columns); see :mod:`lineage.bgzf`
     **kwargs
         additional parameters to `pandas.DataFrame.to_csv`
 
@@ -910,7 +1482,7 @@ def save_df_as_csv(df, path, filename, comment=None, **kwargs):
 
             destination = os.path.join(path, filename)
 
-            print("Saving " + os.path.relpath(destination))
+            logger.info("Saving %s", os.path.relpath(destination))
 
             s = (
                 "# Generated by lineage v{}, https://github.com/apriha/lineage\n"
@@ -924,17 +1496,23 @@ def save_df_as_csv(df, path, filename, comment=None, **kwargs):
             if isinstance(comment, str):
                 s += comment
 
-            with open(destination, "w") as f:
-                f.write(s)
+            if bgzip:
+                destination = bgzf.write_csv(destination, s, df, na_rep="--", **kwargs)
+            else:
+                with open(destination, "w") as f:
+                    f.write(s)
+
+                # https://stackoverflow.com/a/29233924/4727627
+                with open(destination, "a") as f:
+                    df.to_csv(f, na_rep="--", **kwargs)
 
-            # https://stackoverflow.com/a/29233924/4727627
-            with open(destination, "a") as f:
-                df.to_csv(f, na_rep="--", **kwargs)
+            if destination:
+                instrumentation.count(len(df), os.path.getsize(destination))
 
             return destination
         except Exception as err:
-            print(err)
+            logger.error(err)
             return ""
     else:
-        print("no data to save...")
+        logger.info("no data to save...")
         return ""
@@ -0,0 +1,599 @@
+""" Asyncio API of `lineage`, to use `lineage` from asynchronous applications.
+
+The classes of this module wrap ``EnsemblRestClient``, ``Resources``, and ``Lineage`` with
+coroutines, so that many I/O-bound operations (downloads of resources, Ensembl REST requests,
+and loading of raw data files) run concurrently under one event loop, with a limit on the count
+of concurrent I/O operations. The standard library doesn't provide asynchronous HTTP or file
+I/O, so blocking I/O and CPU-bound work (e.g., parsing files and finding shared DNA) are run on
+an executor (by default, the event loop's default executor); the event loop is never blocked.
+
+Examples
+--------
+>>> import asyncio
+>>> from lineage.aio import AsyncLineage
+>>> async def main():
+...     l = AsyncLineage(max_concurrency=8)
+...     user662, user663 = await asyncio.gather(
+...         l.create_individual('User662', ['resources/662.23andme.304.txt.gz',
+...                                         'resources/662.23andme.340.txt.gz']),
+...         l.create_individual('User663', 'resources/663.23andme.305.txt.gz'),
+...     )
+...     return await l.find_shared_dna(user662, user663, save_output=False)
+>>> results = asyncio.get_event_loop().run_until_complete(main())  # doctest: +SKIP
+
+"""
+
+"""
+Copyright (C) 2019 Andrew Riha
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+import asyncio
+from collections import deque
+import functools
+import logging
+import os
+import tarfile
+import time
+import urllib.error
+
+import lineage
+from lineage.ensembl import EnsemblRestClient
+from lineage.resources import (
+    Resources,
+    _ASSEMBLY_MAPPING_CHROMS,
+    _EXAMPLE_DATASETS,
+)
+from lineage.snps import SNPs
+
+logger = logging.getLogger(__name__)
+
+_ASSEMBLIES = {36: "NCBI36", 37: "GRCh37", 38: "GRCh38"}
+
+
+class _Runner(object):
+    """ Run blocking functions on an executor, limiting the count of concurrent I/O operations.
+
+    Asyncio primitives are created on first use, so that they belong to the running event loop.
+    """
+
+    def __init__(self, executor=None, max_concurrency=4):
+        self._executor = executor
+        self._max_concurrency = max(1, max_concurrency)
+        self._semaphore = None
+
+    async def run(self, func, *args, **kwargs):
+        """ Run a function on the executor. """
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(
+            self._executor, functools.partial(func, *args, **kwargs)
+        )
+
+    async def run_io(self, func, *args, **kwargs):
+        """ Run an I/O-bound function on the executor, limiting concurrency. """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self._max_concurrency)
+
+        async with self._semaphore:
+            return await self.run(func, *args, **kwargs)
+
+
+class AsyncEnsemblRestClient(object):
+    """ Asynchronous Ensembl REST client. """
+
+    def __init__(
+        self, client=None, reqs_per_sec=15, max_concurrency=4, executor=None, retries=3
+    ):
+        """ Initialize an ``AsyncEnsemblRestClient``.
+
+        Parameters
+        ----------
+        client : EnsemblRestClient
+            client used to make requests; if None, use a client for the default server
+        reqs_per_sec : int
+            maximum count of requests started per second
+        max_concurrency : int
+            maximum count of concurrent requests
+        executor : concurrent.futures.Executor
+            executor that runs the requests; if None, use the event loop's default executor
+        retries : int
+            count of retries of requests rate limited by the server
+        """
+        self._client = client if client is not None else EnsemblRestClient()
+        self._reqs_per_sec = reqs_per_sec
+        self._retries = retries
+        self._runner = _Runner(executor, max_concurrency)
+        self._starts = deque()
+        self._lock = None
+
+    async def perform_rest_action(self, endpoint, hdrs=None, params=None):
+        """ Perform a request.
+
+        Parameters
+        ----------
+        endpoint : str
+            endpoint of request (e.g., '/map/human/GRCh37/1/GRCh38')
+        hdrs : dict
+            request headers
+        params : dict
+            query parameters
+
+        Returns
+        -------
+        object
+            decoded JSON response, or None if the request failed
+        """
+        for _ in range(self._retries + 1):
+            await self._wait_for_rate_limit()
+
+            try:
+                return await self._runner.run_io(
+                    self._client.request, endpoint, hdrs, params
+                )
+            except urllib.error.HTTPError as err:
+                # check if we are being rate limited by the server
+                if err.code == 429 and "Retry-After" in err.headers:
+                    await asyncio.sleep(float(err.headers["Retry-After"]))
+                    continue
+
+                logger.error(
+                    "Request failed for %s: Status code: %s Reason: %s",
+                    endpoint,
+                    err.code,
+                    err.reason,
+                )
+                return None
+            except urllib.error.URLError as err:
+                logger.error("Request failed for %s: %s", endpoint, err)
+                return None
+
+        return None
+
+    async def _wait_for_rate_limit(self):
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        # start at most `reqs_per_sec` requests in any one second
+        async with self._lock:
+            if len(self._starts) >= self._reqs_per_sec:
+                delta = time.monotonic() - self._starts[0]
+                if delta < 1:
+                    await asyncio.sleep(1 - delta)
+                self._starts.popleft()
+
+            self._starts.append(time.monotonic())
+
+
+class AsyncResources(object):
+    """ Asynchronous interface to the resources of a ``Resources`` object.
+
+    Resources are downloaded concurrently (assembly mapping data is downloaded with concurrent
+    Ensembl REST requests), and loaded on the executor. Loaded resources are cached by the
+    wrapped ``Resources`` object.
+    """
+
+    def __init__(
+        self, resources=None, max_concurrency=4, executor=None, ensembl_rest_client=None
+    ):
+        """ Initialize an ``AsyncResources`` object.
+
+        Parameters
+        ----------
+        resources : Resources
+            resources to wrap; if None, use resources in the default resources directory
+        max_concurrency : int
+            maximum count of concurrent downloads and requests
+        executor : concurrent.futures.Executor
+            executor that runs blocking I/O and loads resources; if None, use the event loop's
+            default executor
+        ensembl_rest_client : AsyncEnsemblRestClient
+            client used to download assembly mapping data; if None, a client that wraps the
+            ``EnsemblRestClient`` of `resources` is used
+        """
+        self._resources = resources if resources is not None else Resources()
+        self._runner = _Runner(executor, max_concurrency)
+
+        if ensembl_rest_client is None:
+            ensembl_rest_client = AsyncEnsemblRestClient(
+                self._resources._ensembl_rest_client,
+                max_concurrency=max_concurrency,
+                executor=executor,
+            )
+
+        self._ensembl_rest_client = ensembl_rest_client
+        self._downloads = {}
+
+    @property
+    def resources(self):
+        """ Wrapped ``Resources`` object.
+
+        Returns
+        -------
+        Resources
+        """
+        return self._resources
+
+    async def get_genetic_map_HapMapII_GRCh37(self, chroms=None):
+        """ Get International HapMap Consortium HapMap Phase II genetic map for Build 37.
+
+        See :meth:`Resources.get_genetic_map_HapMapII_GRCh37`.
+        """
+        await self._download(self._resources._get_path_genetic_map_HapMapII_GRCh37)
+        return await self._runner.run(
+            self._resources.get_genetic_map_HapMapII_GRCh37, chroms
+        )
+
+    async def get_cytoBand_hg19(self):
+        """ Get UCSC cytoBand table for Build 37.
+
+        See :meth:`Resources.get_cytoBand_hg19`.
+        """
+        await self._download(self._resources._get_path_cytoBand_hg19)
+        return await self._runner.run(self._resources.get_cytoBand_hg19)
+
+    async def get_knownGene_hg19(self, chroms=None):
+        """ Get UCSC knownGene table for Build 37.
+
+        See :meth:`Resources.get_knownGene_hg19`.
+        """
+        await self._download(self._resources._get_path_knownGene_hg19)
+        return await self._runner.run(self._resources.get_knownGene_hg19, chroms)
+
+    async def get_kgXref_hg19(self, chroms=None):
+        """ Get UCSC kgXref table for Build 37.
+
+        See :meth:`Resources.get_kgXref_hg19`.
+        """
+        await asyncio.gather(
+            self._download(self._resources._get_path_knownGene_hg19),
+            self._download(self._resources._get_path_kgXref_hg19),
+        )
+        return await self._runner.run(self._resources.get_kgXref_hg19, chroms)
+
+    async def get_assembly_mapping_data(self, source_assembly, target_assembly, chroms=None):
+        """ Get assembly mapping data.
+
+        If the assembly mapping data hasn't been downloaded, the assembly map of each
+        chromosome is requested concurrently.
+
+        See :meth:`Resources.get_assembly_mapping_data`.
+        """
+        await self._download(
+            self._download_assembly_mapping_data, source_assembly, target_assembly
+        )
+        return await self._runner.run(
+            self._resources.get_assembly_mapping_data,
+            source_assembly,
+            target_assembly,
+            chroms,
+        )
+
+    async def download_example_datasets(self):
+        """ Download example datasets from `openSNP <https://opensnp.org>`_ concurrently.
+
+        See :meth:`Resources.download_example_datasets`.
+
+        Returns
+        -------
+        paths : list of str or None
+            paths to example datasets
+        """
+        paths = await asyncio.gather(
+            *[
+                self._runner.run_io(
+                    self._resources._download_file, url, filename, compress=compress
+                )
+                for url, filename, compress in _EXAMPLE_DATASETS
+            ]
+        )
+        await self._runner.run(self._resources._decompress_concatenated_gzip, paths[-2:])
+        return list(paths)
+
+    async def get_all_resources(self):
+        """ Get / download all resources used throughout `lineage` concurrently.
+
+        Returns
+        -------
+        dict
+            dict of resources
+        """
+        names = [
+            "genetic_map_HapMapII_GRCh37",
+            "cytoBand_hg19",
+            "knownGene_hg19",
+            "kgXref_hg19",
+        ]
+        coros = [
+            self.get_genetic_map_HapMapII_GRCh37(),
+            self.get_cytoBand_hg19(),
+            self.get_knownGene_hg19(),
+            self.get_kgXref_hg19(),
+        ]
+
+        for source, target in (
+            ("NCBI36", "GRCh37"),
+            ("NCBI36", "GRCh38"),
+            ("GRCh37", "NCBI36"),
+            ("GRCh37", "GRCh38"),
+            ("GRCh38", "NCBI36"),
+            ("GRCh38", "GRCh37"),
+        ):
+            names.append(source + "_" + target)
+            coros.append(self.get_assembly_mapping_data(source, target))
+
+        return dict(zip(names, await asyncio.gather(*coros)))
+
+    async def _download(self, func, *args):
+        """ Run a download once, even if requested by several coroutines at once.
+
+        `func` is a coroutine function, or a blocking function that is run on the executor.
+        """
+        key = (func.__name__,) + args
+
+        if key not in self._downloads:
+            if asyncio.iscoroutinefunction(func):
+                download = func(*args)
+            else:
+                download = self._runner.run_io(func, *args)
+
+            self._downloads[key] = asyncio.ensure_future(download)
+
+        future = self._downloads[key]
+
+        try:
+            return await asyncio.shield(future)
+        finally:
+            if future.done() and self._downloads.get(key) is future:
+                del self._downloads[key]
+
+    async def _download_assembly_mapping_data(self, source_assembly, target_assembly):
+        resources = self._resources
+
+        if not await self._runner.run(lineage.create_dir, resources._resources_dir):
+            return None
+
+        destination = resources._get_destination_assembly_mapping_data(
+            source_assembly, target_assembly
+        )
+
+        if await self._runner.run(resources._has_assembly_mapping_data, destination):
+            return destination
+
+        logger.info("Downloading %s", os.path.relpath(destination))
+
+        responses = await asyncio.gather(
+            *[
+                self._get_assembly_map(source_assembly, target_assembly, chrom)
+                for chrom in _ASSEMBLY_MAPPING_CHROMS
+            ]
+        )
+
+        try:
+            await self._runner.run(
+                self._save_assembly_mapping_data, destination, responses
+            )
+        except Exception as err:
+            logger.error(err)
+            return None
+
+        resources._verified_assembly_mapping_paths.add(destination)
+        return destination
+
+    async def _get_assembly_map(self, source_assembly, target_assembly, chrom, retries=10):
+        endpoint = Resources._get_assembly_map_endpoint(
+            source_assembly, target_assembly, chrom
+        )
+
+        response = None
+        retry = 0
+        while response is None and retry < retries:
+            response = await self._ensembl_rest_client.perform_rest_action(endpoint)
+            retry += 1
+
+        return response
+
+    @staticmethod
+    def _save_assembly_mapping_data(destination, responses):
+        # write to a temporary file first, so a partial archive is never seen
+        tmp = "{}.{}.tmp".format(destination, os.getpid())
+
+        with tarfile.open(tmp, "w:gz") as tar:
+            for chrom, response in zip(_ASSEMBLY_MAPPING_CHROMS, responses):
+                if response is not None:
+                    Resources._add_json_to_tar(tar, chrom + ".json", response)
+
+        os.replace(tmp, destination)
+
+
+class AsyncLineage(object):
+    """ Asynchronous interface to a ``Lineage`` object. """
+
+    def __init__(self, l=None, max_concurrency=4, executor=None):
+        """ Initialize an ``AsyncLineage`` object.
+
+        Parameters
+        ----------
+        l : Lineage
+            ``Lineage`` object to wrap; if None, a ``Lineage`` object with default arguments is
+            used
+        max_concurrency : int
+            maximum count of concurrent I/O operations (e.g., files loaded, downloads, and
+            requests)
+        executor : concurrent.futures.Executor
+            executor that runs blocking I/O and CPU-bound work; if None, use the event loop's
+            default executor
+        """
+        self._lineage = l if l is not None else lineage.Lineage()
+        self._runner = _Runner(executor, max_concurrency)
+        self._resources = AsyncResources(
+            self._lineage._resources, max_concurrency=max_concurrency, executor=executor
+        )
+
+    @property
+    def lineage(self):
+        """ Wrapped ``Lineage`` object.
+
+        Returns
+        -------
+        Lineage
+        """
+        return self._lineage
+
+    @property
+    def resources(self):
+        """ Resources of the wrapped ``Lineage`` object.
+
+        Returns
+        -------
+        AsyncResources
+        """
+        return self._resources
+
+    async def create_individual(self, name, raw_data=None, **kwargs):
+        """ Initialize an individual, loading raw data files concurrently.
+
+        Parameters
+        ----------
+        name : str
+            name of the individual
+        raw_data : list or str
+            path(s) to file(s) with raw genotype data
+        **kwargs
+            arguments of :meth:`load_snps`
+
+        Returns
+        -------
+        Individual
+        """
+        individual = self._lineage.create_individual(name)
+
+        if raw_data is not None:
+            await self.load_snps(individual, raw_data, **kwargs)
+
+        return individual
+
+    async def load_snps(
+        self,
+        individual,
+        raw_data,
+        discrepant_snp_positions_threshold=100,
+        discrepant_genotypes_threshold=500,
+        save_output=False,
+        chroms=None,
+        region=None,
+    ):
+        """ Load raw genotype data into an individual.
+
+        Files are read and parsed concurrently, then merged into the individual in the order of
+        `raw_data`. See :meth:`Individual.load_snps`.
+
+        Parameters
+        ----------
+        individual : Individual
+            individual to load SNPs into
+        raw_data : list or str
+            path(s) to file(s) with raw genotype data
+        """
+        if isinstance(raw_data, str):
+            raw_data = [raw_data]
+        elif not isinstance(raw_data, list):
+            raise TypeError("invalid filetype")
+
+        for file in raw_data:
+            logger.info("Loading %s", os.path.relpath(file))
+
+        snps = await asyncio.gather(
+            *[
+                self._runner.run_io(SNPs, file, chroms=chroms, region=region)
+                for file in raw_data
+            ]
+        )
+
+        for s in snps:
+            await self._runner.run(
+                individual._merge_snps,
+                s,
+                discrepant_snp_positions_threshold,
+                discrepant_genotypes_threshold,
+                save_output,
+            )
+
+    async def remap_snps(self, individual, target_assembly, complement_bases=True):
+        """ Remap the SNP coordinates of an individual from one assembly to another.
+
+        See :meth:`Lineage.remap_snps`.
+        """
+        target = _ASSEMBLIES.get(target_assembly, target_assembly)
+
+        # download the assembly mapping data without blocking the event loop
+        if individual.snp_count > 0 and individual.assembly != target:
+            await self._resources.get_assembly_mapping_data(individual.assembly, target)
+
+        return await self._runner.run(
+            self._lineage.remap_snps, individual, target_assembly, complement_bases
+        )
+
+    async def find_discordant_snps(
+        self, individual1, individual2, individual3=None, save_output=False
+    ):
+        """ Find discordant SNPs between two or three individuals.
+
+        See :meth:`Lineage.find_discordant_snps`.
+        """
+        await self._remap_snps_to_GRCh37([individual1, individual2, individual3])
+        return await self._runner.run(
+            self._lineage.find_discordant_snps,
+            individual1,
+            individual2,
+            individual3,
+            save_output,
+        )
+
+    async def find_shared_dna(
+        self,
+        individual1,
+        individual2,
+        cM_threshold=0.75,
+        snp_threshold=1100,
+        shared_genes=False,
+        save_output=True,
+    ):
+        """ Find the shared DNA between two individuals.
+
+        See :meth:`Lineage.find_shared_dna`.
+        """
+        await self._remap_snps_to_GRCh37([individual1, individual2])
+
+        # download the resources used without blocking the event loop
+        await asyncio.gather(
+            self._resources.get_genetic_map_HapMapII_GRCh37([]),
+            self._resources.get_cytoBand_hg19(),
+        )
+
+        return await self._runner.run(
+            self._lineage.find_shared_dna,
+            individual1,
+            individual2,
+            cM_threshold=cM_threshold,
+            snp_threshold=snp_threshold,
+            shared_genes=shared_genes,
+            save_output=save_output,
+        )
+
+    async def _remap_snps_to_GRCh37(self, individuals):
+        await asyncio.gather(
+            *[self.remap_snps(ind, 37) for ind in individuals if ind is not None]
+        )
@@ -0,0 +1,430 @@
+""" Run batch jobs described by a manifest.
+
+A manifest describes the individuals of a job (and the files with their raw data), the
+comparisons to make between them (e.g., shared DNA), the thresholds of the comparisons, and the
+outputs to save. Individuals are loaded once and comparisons are made by a pool of workers that
+share one ``Lineage`` object, so resources (e.g., the genetic map) are loaded once per job.
+
+Manifests are JSON objects (dicts); for example::
+
+    {
+        "output_dir": "output",
+        "individuals": {
+            "User662": ["resources/662.23andme.340.txt.gz",
+                        "resources/662.ftdna-illumina.341.csv.gz"],
+            "User663": "resources/663.23andme.305.txt.gz"
+        },
+        "save_snps": true,
+        "cM_threshold": 0.75,
+        "snp_threshold": 1100,
+        "shared_dna": [{"individuals": ["User662", "User663"], "shared_genes": true}],
+        "discordant_snps": [{"individuals": ["User662", "User663"]}]
+    }
+
+Keys of manifests:
+
+individuals : dict
+    path (or list of paths) to the raw data of each individual (required)
+output_dir, resources_dir, cache_dir, cache_size
+    arguments of ``Lineage`` (defaults: 'output', 'resources', None, and 1024)
+build : {36, 37, 38}
+    build of saved SNPs (default: 37)
+save_snps : bool
+    save the SNPs of each individual to the output directory (default: false)
+save_output : bool
+    save the output of comparisons (e.g., shared DNA plots) to the output directory (default:
+    true)
+cM_threshold, snp_threshold, shared_genes
+    default arguments of shared DNA comparisons (defaults: 0.75, 1100, and false)
+shared_dna : list of dict, or 'all'
+    shared DNA comparisons; each comparison has the names of two `individuals` and optionally
+    a `cM_threshold`, `snp_threshold`, and `shared_genes`; if 'all', compare all pairs of
+    individuals
+discordant_snps : list of dict
+    discordant SNP comparisons; each comparison has the names of two or three `individuals`
+    (see :meth:`Lineage.find_discordant_snps`)
+
+Paths are relative to the current directory.
+
+"""
+
+"""
+Copyright (C) 2019 Andrew Riha
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import itertools
+import json
+import logging
+import os
+import time
+
+import numpy as np
+
+import lineage
+from lineage import progress
+from lineage.individual import Individual
+
+logger = logging.getLogger(__name__)
+
+_DEFAULTS = {
+    "output_dir": "output",
+    "resources_dir": "resources",
+    "cache_dir": None,
+    "cache_size": 1024,
+    "build": 37,
+    "save_snps": False,
+    "save_output": True,
+    "cM_threshold": 0.75,
+    "snp_threshold": 1100,
+    "shared_genes": False,
+    "shared_dna": [],
+    "discordant_snps": [],
+}
+
+_SHARED_DNA_KEYS = {"individuals", "cM_threshold", "snp_threshold", "shared_genes"}
+
+
+def load_manifest(path):
+    """ Load and validate a manifest.
+
+    Parameters
+    ----------
+    path : str
+        path to JSON manifest
+
+    Returns
+    -------
+    dict
+        manifest, with defaults for unspecified keys
+
+    Raises
+    ------
+    ValueError
+        if the manifest is invalid
+    """
+    with open(path, "r") as f:
+        try:
+            manifest = json.load(f)
+        except ValueError as err:
+            raise ValueError("invalid manifest {}: {}".format(path, err))
+
+    return validate_manifest(manifest)
+
+
+def validate_manifest(manifest):
+    """ Validate a manifest.
+
+    Parameters
+    ----------
+    manifest : dict
+        manifest (see :mod:`lineage.batch`)
+
+    Returns
+    -------
+    dict
+        copy of manifest, with defaults for unspecified keys, and the comparisons of all pairs
+        of individuals if `shared_dna` is 'all'
+
+    Raises
+    ------
+    ValueError
+        if the manifest is invalid
+    """
+    if not isinstance(manifest, dict):
+        raise ValueError("manifest must be an object")
+
+    unknown = set(manifest.keys()) - set(_DEFAULTS.keys()) - {"individuals"}
+    if unknown:
+        raise ValueError("unknown manifest keys: " + ", ".join(sorted(unknown)))
+
+    individuals = manifest.get("individuals")
+    if not isinstance(individuals, dict) or len(individuals) == 0:
+        raise ValueError("manifest must specify individuals")
+
+    for name, raw_data in individuals.items():
+        if isinstance(raw_data, str):
+            raw_data = [raw_data]
+
+        if (
+            not isinstance(raw_data, list)
+            or len(raw_data) == 0
+            or not all(isinstance(path, str) for path in raw_data)
+        ):
+            raise ValueError("invalid raw data of individual " + name)
+
+    validated = dict(_DEFAULTS)
+    validated.update(manifest)
+    validated["individuals"] = dict(individuals)
+
+    if validated["build"] not in (36, 37, 38):
+        raise ValueError("invalid build " + str(validated["build"]))
+
+    if validated["shared_dna"] == "all":
+        validated["shared_dna"] = [
+            {"individuals": list(pair)}
+            for pair in itertools.combinations(sorted(individuals.keys()), 2)
+        ]
+
+    for comparison_type, counts, keys in (
+        ("shared_dna", (2,), _SHARED_DNA_KEYS),
+        ("discordant_snps", (2, 3), {"individuals"}),
+    ):
+        comparisons = validated[comparison_type]
+
+        if not isinstance(comparisons, list):
+            raise ValueError(comparison_type + " must be a list")
+
+        for comparison in comparisons:
+            if not isinstance(comparison, dict):
+                raise ValueError(comparison_type + " comparisons must be objects")
+
+            unknown = set(comparison.keys()) - keys
+            if unknown:
+                raise ValueError(
+                    "unknown {} keys: {}".format(comparison_type, ", ".join(sorted(unknown)))
+                )
+
+            names = comparison.get("individuals")
+
+            if not isinstance(names, list) or len(names) not in counts:
+                raise ValueError(
+                    "{} comparisons must have {} individuals".format(
+                        comparison_type, " or ".join(str(count) for count in counts)
+                    )
+                )
+
+            for name in names:
+                if name not in individuals:
+                    raise ValueError("unknown individual " + str(name))
+
+    return validated
+
+
+def run_manifest(manifest, workers=1):
+    """ Run a batch job described by a manifest.
+
+    Individuals are loaded (and remapped) first, then comparisons are made. Each individual and
+    comparison is a task run by a pool of `workers` threads. A failed task is logged and
+    recorded in the results, but doesn't stop the job; comparisons of individuals that failed to
+    load are skipped.
+
+    Parameters
+    ----------
+    manifest : dict
+        manifest (see :mod:`lineage.batch`)
+    workers : int
+        count of worker threads
+
+    Returns
+    -------
+    dict
+        results of the job: summary of each individual (see :meth:`Individual.get_summary`),
+        and summary of each comparison; failed tasks have an `error`
+
+    Raises
+    ------
+    ValueError
+        if the manifest is invalid
+    """
+    manifest = validate_manifest(manifest)
+
+    l = lineage.Lineage(
+        output_dir=manifest["output_dir"],
+        resources_dir=manifest["resources_dir"],
+        cache_size=manifest["cache_size"],
+        cache_dir=manifest["cache_dir"],
+    )
+
+    individuals = {}
+    has_comparisons = len(manifest["shared_dna"]) > 0 or len(
+        manifest["discordant_snps"]
+    ) > 0
+
+    def load(name):
+        raw_data = manifest["individuals"][name]
+        ind = l.create_individual(name, raw_data)
+
+        if ind.snp_count == 0:
+            raise ValueError("no SNPs loaded")
+
+        if manifest["save_snps"]:
+            # remap a copy of the SNPs, since remapping back to Build 37 for comparisons would
+            # be lossy (e.g., SNPs outside of mapped regions keep the positions of the other
+            # build)
+            saved = Individual(ind.name, output_dir=l._output_dir)
+            saved._set_snps(ind.get_snps(), ind.build)
+            saved._source = list(ind._source)
+            l.remap_snps(saved, manifest["build"])
+            saved.save_snps()
+
+        # comparisons are made in Build 37; remap before comparisons are made, so that
+        # individuals aren't remapped by several workers at once
+        if has_comparisons:
+            l.remap_snps(ind, 37)
+
+            if ind.build != 37:
+                raise ValueError("SNPs not remapped to Build 37")
+
+        individuals[name] = ind
+        return ind.get_summary()
+
+    def find_shared_dna(comparison):
+        cM_threshold = comparison.get("cM_threshold", manifest["cM_threshold"])
+        snp_threshold = comparison.get("snp_threshold", manifest["snp_threshold"])
+        shared_genes = comparison.get("shared_genes", manifest["shared_genes"])
+
+        ind1, ind2 = _get_individuals(individuals, comparison)
+
+        summary = l.find_shared_dna_summary(ind1, ind2, cM_threshold, snp_threshold)
+        summary["cM_threshold"] = cM_threshold
+        summary["snp_threshold"] = snp_threshold
+
+        # the shared DNA segments found for the summary are in the result cache, so only the
+        # output is computed here (unless the cache is disabled, i.e., `cache_size` is 0)
+        if manifest["save_output"] or shared_genes:
+            _, _, one_chrom_genes, two_chrom_genes = l.find_shared_dna(
+                ind1,
+                ind2,
+                cM_threshold=cM_threshold,
+                snp_threshold=snp_threshold,
+                shared_genes=shared_genes,
+                save_output=manifest["save_output"],
+            )
+
+            if shared_genes:
+                summary["one_chrom_genes"] = len(one_chrom_genes)
+                summary["two_chrom_genes"] = len(two_chrom_genes)
+
+        return summary
+
+    def find_discordant_snps(comparison):
+        df = l.find_discordant_snps(
+            *_get_individuals(individuals, comparison),
+            save_output=manifest["save_output"]
+        )
+        return {"discordant_snps": len(df)}
+
+    results = {"individuals": {}, "shared_dna": [], "discordant_snps": []}
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        names = sorted(manifest["individuals"].keys())
+        results["individuals"] = dict(
+            zip(names, _run_tasks(executor, "batch.load", load, names))
+        )
+
+        for comparison_type, func in (
+            ("shared_dna", find_shared_dna),
+            ("discordant_snps", find_discordant_snps),
+        ):
+            comparisons = manifest[comparison_type]
+
+            for comparison, result in zip(
+                comparisons,
+                _run_tasks(executor, "batch." + comparison_type, func, comparisons),
+            ):
+                result["individuals"] = list(comparison["individuals"])
+                results[comparison_type].append(result)
+
+    return results
+
+
+def save_results(results, path):
+    """ Save the results of a batch job to a JSON file.
+
+    Parameters
+    ----------
+    results : dict
+        results returned by :func:`run_manifest`
+    path : str
+        path to JSON file
+    """
+    directory = os.path.dirname(path)
+
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    with open(path, "w") as f:
+        json.dump(results, f, indent=2, sort_keys=True, default=_to_json)
+
+
+def count_errors(results):
+    """ Count the failed tasks of a batch job.
+
+    Parameters
+    ----------
+    results : dict
+        results returned by :func:`run_manifest`
+
+    Returns
+    -------
+    int
+    """
+    tasks = list(results["individuals"].values())
+    tasks += results["shared_dna"] + results["discordant_snps"]
+    return sum(1 for task in tasks if "error" in task)
+
+
+def _get_individuals(individuals, comparison):
+    missing = [name for name in comparison["individuals"] if name not in individuals]
+
+    if missing:
+        raise ValueError("individuals not loaded: " + ", ".join(missing))
+
+    return [individuals[name] for name in comparison["individuals"]]
+
+
+def _run_tasks(executor, task, func, items):
+    """ Run a function on each item with a pool of workers.
+
+    Returns
+    -------
+    list of dict
+        result of each item, in the order of `items`; each result has the wall time (s) of the
+        task, and the error if the task failed
+    """
+
+    def run(item):
+        start = time.perf_counter()
+
+        try:
+            result = func(item)
+        except Exception as err:
+            logger.error("%s failed for %s: %s", task, item, err)
+            result = {"error": str(err)}
+
+        if result is None:
+            result = {}
+
+        result["time"] = time.perf_counter() - start
+        return result
+
+    futures = [executor.submit(run, item) for item in items]
+    results = []
+
+    for i, future in enumerate(futures, 1):
+        results.append(future.result())
+        progress.report(task, i, len(futures), items[i - 1])
+
+    return results
+
+
+def _to_json(obj):
+    if isinstance(obj, np.generic):
+        return obj.item()
+
+    raise TypeError("{} is not JSON serializable".format(type(obj).__name__))
@@ -0,0 +1,289 @@
+""" Block gzip (BGZF) compressed CSV files with a chromosome / position index.
+
+A BGZF file is a series of gzip members ("blocks"), each with at most 64 KB of uncompressed data
+(see [1]_). Since a BGZF file is a valid gzip file, it can be read with any gzip reader; however,
+individual blocks can also be decompressed by seeking directly to their offset in the file.
+
+`lineage` writes each block such that it only contains complete rows of one chromosome, and saves
+an index of the chromosome and position range of each block alongside the file (`<file>.idx`).
+This allows the rows of a chromosome or region to be read without decompressing the whole file.
+
+The index is specific to `lineage` (a table of the offsets of blocks); it isn't a tabix (`.tbi`)
+or CSI index, since those only index tab-separated files, whereas `lineage` writes CSV files.
+Files can still be decompressed by other tools (e.g., `bgzip -d` or `gzip -d`). The index
+records the size and modification time of the file, and is only used while the file is
+unchanged.
+
+References
+----------
+..[1] The SAM/BAM Format Specification Working Group, "Sequence Alignment/Map Format
+  Specification," Section 4.1, https://samtools.github.io/hts-specs/SAMv1.pdf
+
+"""
+
+"""
+Copyright (C) 2019 Andrew Riha
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+import os
+import struct
+import zlib
+
+import pandas as pd
+
+# maximum uncompressed data per block; leaves room for incompressible data in a 64 KB block
+MAX_BLOCK_DATA_SIZE = 65280
+
+# index rows with this chromosome refer to the blocks of the header (comments, column names)
+HEADER_CHROM = "#"
+
+
+def write_csv(destination, comment, df, **kwargs):
+    """ Write a dataframe to an indexed BGZF compressed CSV file.
+
+    Parameters
+    ----------
+    destination : str
+        path to file
+    comment : str
+        text to write before the CSV data (e.g., header comments)
+    df : pandas.DataFrame
+        dataframe to write; must have `chrom` and `pos` columns and be sorted by them
+    **kwargs
+        additional parameters to `pandas.DataFrame.to_csv`
+
+    Returns
+    -------
+    str
+        path to file
+    """
+    lines = df.to_csv(None, **kwargs).splitlines(True)
+
+    # an index of a previous file at `destination` is invalid once the file is overwritten
+    index_path = get_index_path(destination)
+    if os.path.exists(index_path):
+        os.remove(index_path)
+
+    # first line is the column header
+    header = comment + lines[0]
+    lines = lines[1:]
+
+    index = []
+
+    with open(destination, "wb") as f:
+        for i in range(0, len(header), MAX_BLOCK_DATA_SIZE):
+            index.append(
+                _write_block(f, header[i : i + MAX_BLOCK_DATA_SIZE], HEADER_CHROM, 0, 0)
+            )
+
+        chroms = df["chrom"].astype(str).values
+        positions = df["pos"].values
+
+        block = []
+        block_size = 0
+        block_start = 0
+
+        for i, line in enumerate(lines):
+            if len(block) > 0 and (
+                chroms[i] != chroms[block_start]
+                or block_size + len(line) > MAX_BLOCK_DATA_SIZE
+            ):
+                index.append(
+                    _write_block(
+                        f,
+                        "".join(block),
+                        chroms[block_start],
+                        positions[block_start],
+                        positions[i - 1],
+                    )
+                )
+                block = []
+                block_size = 0
+                block_start = i
+
+            block.append(line)
+            block_size += len(line)
+
+        if len(block) > 0:
+            index.append(
+                _write_block(
+                    f,
+                    "".join(block),
+                    chroms[block_start],
+                    positions[block_start],
+                    positions[-1],
+                )
+            )
+
+        # empty block marks the end of the file
+        f.write(_compress_block(b""))
+
+    # write to a temporary file first, so readers never see a partial index
+    with open(index_path + ".tmp", "w") as f:
+        f.write(_get_index_header(destination))
+        pd.DataFrame(index, columns=["chrom", "start", "end", "offset", "size"]).to_csv(
+            f, sep="\t", index=False
+        )
+    os.replace(index_path + ".tmp", index_path)
+
+    return destination
+
+
+def get_index_path(file):
+    """ Get the path to the index of a BGZF compressed file. """
+    return file + ".idx"
+
+
+def has_index(file):
+    """ Determine if a file is an indexed BGZF compressed file.
+
+    An index is only valid if the file hasn't changed since the index was written (i.e., the
+    size and modification time of the file are those recorded in the index).
+
+    Parameters
+    ----------
+    file : str
+        path to file
+
+    Returns
+    -------
+    bool
+    """
+    if not isinstance(file, str):
+        return False
+
+    try:
+        with open(get_index_path(file)) as f:
+            return f.readline() == _get_index_header(file)
+    except OSError:
+        return False
+
+
+def read_index(file):
+    """ Read the index of a BGZF compressed file.
+
+    Parameters
+    ----------
+    file : str
+        path to file
+
+    Returns
+    -------
+    pandas.DataFrame
+        chromosome, start and end positions, offset, and size of each block
+    """
+    return pd.read_csv(
+        get_index_path(file), sep="\t", dtype={"chrom": object}, skiprows=1
+    )
+
+
+def read_lines(file, chroms=None, region=None):
+    """ Read the header and the lines of the blocks with the specified chromosomes / region.
+
+    Only the blocks with the specified chromosomes / region are decompressed; lines in those
+    blocks may be outside of the region, so lines should be filtered further by the caller.
+
+    Parameters
+    ----------
+    file : str
+        path to indexed BGZF compressed file
+    chroms : set of str
+        chromosomes to read; if None, read all chromosomes
+    region : tuple
+        (chrom, start, end) region to read; `start` and `end` can be None
+
+    Returns
+    -------
+    generator of str
+        lines of the header and the selected blocks
+    """
+    index = read_index(file)
+
+    selected = index["chrom"] == HEADER_CHROM
+    blocks = index["chrom"] != HEADER_CHROM
+
+    if chroms is not None:
+        blocks &= index["chrom"].isin(chroms)
+
+    if region is not None:
+        chrom, start, end = region
+        blocks &= index["chrom"] == chrom
+        if start is not None:
+            blocks &= (index["end"] >= start) & (index["start"] <= end)
+
+    selected |= blocks
+
+    with open(file, "rb") as f:
+        for block in index.loc[selected].itertuples():
+            f.seek(block.offset)
+            data = zlib.decompress(f.read(block.size), 31).decode("utf-8")
+
+            for line in data.splitlines(True):
+                yield line
+
+
+def _get_index_header(file):
+    """ Get the first line of the index of a file, with the size and modification time. """
+    stat = os.stat(file)
+    return "# size={} mtime={}\n".format(stat.st_size, stat.st_mtime_ns)
+
+
+def _write_block(f, text, chrom, start, end):
+    """ Write text to a BGZF block and return the index entry for the block. """
+    offset = f.tell()
+    block = _compress_block(text.encode("utf-8"))
+    f.write(block)
+    return chrom, int(start), int(end), offset, len(block)
+
+
+def _compress_block(data):
+    """ Compress data to a BGZF block.
+
+    Parameters
+    ----------
+    data : bytes
+        uncompressed data
+
+    Returns
+    -------
+    bytes
+        gzip member with the BGZF extra subfield specifying the size of the block
+    """
+    compressor = zlib.compressobj(6, zlib.DEFLATED, -15)
+    compressed = compressor.compress(data) + compressor.flush()
+
+    # 18 byte header, compressed data, 8 byte footer (CRC32 and uncompressed size)
+    block_size = 18 + len(compressed) + 8
+
+    header = struct.pack(
+        "<BBBBIBBHBBHH",
+        31,  # ID1
+        139,  # ID2
+        8,  # CM (deflate)
+        4,  # FLG (FEXTRA)
+        0,  # MTIME
+        0,  # XFL
+        255,  # OS (unknown)
+        6,  # XLEN
+        66,  # SI1 ('B')
+        67,  # SI2 ('C')
+        2,  # SLEN
+        block_size - 1,  # BSIZE
+    )
+    footer = struct.pack("<II", zlib.crc32(data) & 0xFFFFFFFF, len(data))
+
+    return header + compressed + footer
@@ -0,0 +1,183 @@
+""" Cache of results computed from individuals, e.g., the shared DNA of pairs of individuals.
+
+Results are keyed by the fingerprints of the individuals (see
+:attr:`~lineage.individual.Individual.fingerprint`), the parameters of the computation, and the
+versions of the resources used, so results are reused only while all of them are unchanged.
+Results cached on disk are also keyed by `CACHE_VERSION`, the version of the results.
+
+"""
+
+"""
+Copyright (C) 2019 Andrew Riha
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+from collections import OrderedDict
+import copy
+import hashlib
+import logging
+import os
+import pickle
+import threading
+
+from lineage import memory
+
+logger = logging.getLogger(__name__)
+
+# version of the results cached on disk; increment when the computation or the format of results
+# changes, so results saved by earlier versions of `lineage` aren't reused
+CACHE_VERSION = 1
+
+
+class ResultCache(object):
+    """ Cache of results in memory with least-recently-used eviction, and optionally on disk. """
+
+    def __init__(self, maxsize=128, cache_dir=None):
+        """ Initialize a ``ResultCache``.
+
+        Parameters
+        ----------
+        maxsize : int
+            maximum number of results to keep in memory; if 0, results aren't kept in memory
+        cache_dir : str
+            if specified, also save results to files in this directory, so results are
+            reused across processes; results are loaded with `pickle`, so the directory must
+            only be writable by trusted users
+        """
+        self._maxsize = maxsize
+        self._cache_dir = cache_dir
+        self._results = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._results)
+
+    def get(self, key):
+        """ Get a result.
+
+        Parameters
+        ----------
+        key : tuple
+            key of result; the elements should have stable `repr` strings (e.g., str, int,
+            float), since on disk results are found by a hash of the key
+
+        Returns
+        -------
+        object
+            copy of result, or None if the result isn't cached
+        """
+        with self._lock:
+            if key in self._results:
+                self._results.move_to_end(key)
+                return copy.deepcopy(self._results[key])
+
+        path = self._get_path(key)
+
+        if path is None or not os.path.exists(path):
+            return None
+
+        try:
+            with open(path, "rb") as f:
+                cached_key, result = pickle.load(f)
+        except Exception as err:
+            logger.warning(err)
+            return None
+
+        # guard against hash collisions
+        if cached_key != self._get_disk_key(key):
+            return None
+
+        self._add(key, result)
+        return copy.deepcopy(result)
+
+    def set(self, key, result):
+        """ Cache a result.
+
+        Parameters
+        ----------
+        key : tuple
+            key of result (see :meth:`get`)
+        result : object
+            result; a copy of the result is cached
+        """
+        result = copy.deepcopy(result)
+        self._add(key, result)
+
+        path = self._get_path(key)
+
+        if path is None:
+            return
+
+        # write to a temporary file first, so readers never see a partial file
+        tmp = "{}.{}.tmp".format(path, os.getpid())
+
+        try:
+            os.makedirs(self._cache_dir, exist_ok=True)
+
+            with open(tmp, "wb") as f:
+                pickle.dump(
+                    (self._get_disk_key(key), result),
+                    f,
+                    protocol=pickle.HIGHEST_PROTOCOL,
+                )
+            os.replace(tmp, path)
+        except OSError as err:
+            # the result is still cached in memory
+            logger.warning(err)
+
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    def clear(self):
+        """ Clear the results in memory. """
+        with self._lock:
+            self._results.clear()
+
+    def get_memory_usage(self):
+        """ Get the memory used by the results in memory.
+
+        Returns
+        -------
+        int
+            memory usage in bytes
+        """
+        with self._lock:
+            results = list(self._results.values())
+
+        seen = set()
+        return sum(memory.get_size(result, seen) for result in results)
+
+    def _add(self, key, result):
+        if self._maxsize <= 0:
+            return
+
+        with self._lock:
+            self._results[key] = result
+            self._results.move_to_end(key)
+
+            while len(self._results) > self._maxsize:
+                self._results.popitem(last=False)
+
+    def _get_path(self, key):
+        if self._cache_dir is None:
+            return None
+
+        digest = hashlib.sha1(repr(self._get_disk_key(key)).encode("utf-8")).hexdigest()
+        return os.path.join(self._cache_dir, digest + ".pkl")
+
+    @staticmethod
+    def _get_disk_key(key):
+        return (CACHE_VERSION,) + tuple(key)
@@ -0,0 +1,170 @@
+""" Command-line interface of `lineage`.
+
+Examples
+--------
+Run a batch job described by a manifest (see :mod:`lineage.batch`) with four workers::
+
+    $ lineage run manifest.json --workers 4
+
+Serve requests to compare individuals kept in memory (see :mod:`lineage.service`)::
+
+    $ lineage serve --port 8000 --workers 4
+
+"""
+
+"""
+Copyright (C) 2019 Andrew Riha
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+import argparse
+import logging
+import os
+import sys
+
+import lineage
+from lineage import batch, service
+
+logger = logging.getLogger(__name__)
+
+
+def main(argv=None):
+    """ Run the command-line interface.
+
+    Parameters
+    ----------
+    argv : list of str
+        command-line arguments; if None, use ``sys.argv[1:]``
+
+    Returns
+    -------
+    int
+        exit status: 0 if successful, 1 if any task failed, and 2 if the arguments or manifest
+        are invalid
+    """
+    parser = argparse.ArgumentParser(
+        prog="lineage",
+        description="tools for genetic genealogy and the analysis of consumer DNA test results",
+    )
+    parser.add_argument(
+        "--version", action="version", version="%(prog)s " + lineage.__version__
+    )
+    parser.add_argument(
+        "-v", "--verbose", action="count", default=0, help="log more messages (-vv for debug)"
+    )
+    subparsers = parser.add_subparsers(dest="command")
+
+    run_parser = subparsers.add_parser("run", help="run a batch job described by a manifest")
+    run_parser.add_argument("manifest", help="path to JSON manifest")
+    run_parser.add_argument(
+        "-w", "--workers", type=int, default=1, help="count of worker threads (default: 1)"
+    )
+    run_parser.add_argument(
+        "-o", "--output-dir", help="output directory (overrides the manifest)"
+    )
+    run_parser.add_argument(
+        "-r",
+        "--results",
+        help="path to JSON file of results (default: results.json in the output directory)",
+    )
+    run_parser.set_defaults(func=_run)
+
+    serve_parser = subparsers.add_parser(
+        "serve", help="serve requests to load, compare, and remap individuals over HTTP"
+    )
+    serve_parser.add_argument(
+        "--host", default="127.0.0.1", help="host to listen on (default: 127.0.0.1)"
+    )
+    serve_parser.add_argument(
+        "-p", "--port", type=int, default=8000, help="port to listen on (default: 8000)"
+    )
+    serve_parser.add_argument(
+        "-s", "--socket", help="listen on this Unix socket instead of a port"
+    )
+    serve_parser.add_argument(
+        "-w", "--workers", type=int, default=4, help="count of worker threads (default: 4)"
+    )
+    serve_parser.add_argument(
+        "-q",
+        "--max-queue",
+        type=int,
+        default=16,
+        help="maximum count of queued requests; more are rejected (default: 16)",
+    )
+    serve_parser.add_argument(
+        "--resources-dir", default="resources", help="resources directory (default: resources)"
+    )
+    serve_parser.add_argument(
+        "-o", "--output-dir", default="output", help="output directory (default: output)"
+    )
+    serve_parser.add_argument(
+        "--data-dir",
+        help="only load raw data files from this directory (default: any path)",
+    )
+    serve_parser.add_argument(
+        "--save-output",
+        action="store_true",
+        help="save the output files of comparisons (e.g., plots)",
+    )
+    serve_parser.set_defaults(func=_serve)
+
+    args = parser.parse_args(argv)
+
+    if args.command is None:
+        parser.print_usage(sys.stderr)
+        return 2
+
+    logging.basicConfig(
+        level=[logging.WARNING, logging.INFO, logging.DEBUG][min(args.verbose, 2)],
+        format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+    )
+
+    return args.func(args)
+
+
+def _run(args):
+    try:
+        manifest = batch.load_manifest(args.manifest)
+    except (OSError, ValueError) as err:
+        logger.error(err)
+        return 2
+
+    if args.output_dir is not None:
+        manifest["output_dir"] = args.output_dir
+
+    results = batch.run_manifest(manifest, workers=args.workers)
+
+    path = args.results
+    if path is None:
+        path = os.path.join(manifest["output_dir"], "results.json")
+
+    batch.save_results(results, path)
+    logger.info("Saved results to %s", path)
+
+    return 1 if batch.count_errors(results) > 0 else 0
+
+
+def _serve(args):
+    l = lineage.Lineage(output_dir=args.output_dir, resources_dir=args.resources_dir)
+    s = service.MatchService(
+        l,
+        workers=args.workers,
+        max_queue=args.max_queue,
+        save_output=args.save_output,
+        data_dir=args.data_dir,
+    )
+    service.serve(s, host=args.host, port=args.port, socket_path=args.socket)
+    return 0
@@ -0,0 +1,498 @@
+""" Class for representing the genotypes of many individuals on a shared panel of SNPs. """
+
+"""
+Copyright (C) 2019 Andrew Riha
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+import numpy as np
+import pandas as pd
+
+from lineage import instrumentation
+from lineage.genotypes import NULL
+from lineage.snps import check_other_ids, get_chrom_dtype, get_rsids, join_rsid_keys
+
+# positions of the X chromosome outside of the pseudoautosomal regions, where males have one
+# copy of the chromosome; https://www.ncbi.nlm.nih.gov/grc/human
+X_NON_PAR = (2699520, 154931044)
+
+
+class Cohort(object):
+    """ Object used to represent the genotypes of many individuals.
+
+    The genotypes of the individuals are encoded (see :func:`~lineage.genotypes.encode_genotypes`)
+    and stored as a single contiguous `uint8` matrix of individuals x SNPs, aligned to a shared
+    panel of SNPs. The SNPs of the panel are sorted by chromosome and position, so the SNPs of
+    each chromosome are a contiguous range of columns.
+
+    """
+
+    def __init__(self, individuals, panel="union", genetic_map=None, filename=None):
+        """ Initialize a ``Cohort`` object.
+
+        Individuals should have SNPs of the same build; see
+        :meth:`~lineage.Lineage.create_cohort` to remap SNPs to Build 37 and add genetic
+        distances from the HapMap genetic map.
+
+        Parameters
+        ----------
+        individuals : list of Individual
+            individuals of the cohort
+        panel : {'union', 'intersection'}
+            panel of SNPs; the SNPs of any individual (genotypes of individuals without a SNP
+            are null), or only the SNPs common to all individuals
+        genetic_map : dict
+            dict of pandas.DataFrame genetic maps by chromosome, used to compute the genetic
+            position (cM) of each SNP; if None, genetic positions are null
+        filename : str
+            if specified, store the genotypes in a memory-mapped file at this path instead of in
+            memory
+        """
+        if panel not in ["union", "intersection"]:
+            raise ValueError("panel must be 'union' or 'intersection'")
+
+        self._names = [individual.get_var_name() for individual in individuals]
+        self._sexes = [individual.sex for individual in individuals]
+
+        keys = [_get_rsid_keys(individual) for individual in individuals]
+
+        # identifiers of the keys that are hashes, to get the rsids of the panel
+        self._other_ids = _get_other_ids(individuals, keys)
+
+        if len(keys) == 0:
+            panel_keys = np.array([], dtype=np.int64)
+        elif panel == "union":
+            panel_keys = np.unique(np.concatenate(keys))
+        else:
+            panel_keys = keys[0]
+            for k in keys[1:]:
+                panel_keys = np.intersect1d(panel_keys, k)
+            panel_keys = np.unique(panel_keys)
+
+        chrom, pos = _get_positions(individuals, panel_keys)
+
+        # sort panel by chromosome and position
+        chrom = pd.Categorical(chrom, dtype=get_chrom_dtype(pd.unique(chrom)))
+        order = np.lexsort((pos, chrom.codes))
+
+        self._keys = panel_keys[order]
+        self._pos = pos[order]
+        self._chrom = chrom[order]
+
+        # columns of the SNPs in the panel, in sorted key order
+        self._sorted_keys = panel_keys
+        self._columns = np.empty(len(order), dtype=np.int64)
+        self._columns[order] = np.arange(len(order))
+
+        # offsets of the SNPs of each chromosome
+        codes = self._chrom.codes
+        starts = np.flatnonzero(np.r_[True, np.diff(codes) != 0])[: len(codes)]
+        self._chroms = list(self._chrom.categories[codes[starts]])
+        self._offsets = np.r_[starts, len(codes)].astype(np.int64)
+
+        self._cMs = np.full(len(self._pos), np.nan)
+        if genetic_map is not None:
+            for chrom in self._chroms:
+                if chrom in genetic_map:
+                    s = self.get_chrom_slice(chrom)
+                    self._cMs[s] = compute_cMs(self._pos[s], genetic_map[chrom])
+
+        shape = (len(individuals), len(self._keys))
+        if filename is not None:
+            self._genotypes = np.memmap(filename, dtype=np.uint8, mode="w+", shape=shape)
+        else:
+            self._genotypes = np.zeros(shape, dtype=np.uint8)
+
+        for i, individual in enumerate(individuals):
+            self._genotypes[i] = self._align(
+                keys[i], individual._get_genotype_codes() if len(keys[i]) else None
+            )
+
+        if filename is not None:
+            self._genotypes.flush()
+
+    def __repr__(self):
+        return "Cohort({} individuals, {} SNPs)".format(len(self), self.snp_count)
+
+    def __len__(self):
+        return len(self._names)
+
+    @property
+    def names(self):
+        """ Names of the individuals of this ``Cohort``, in the order of the rows of genotypes.
+
+        Returns
+        -------
+        list of str
+        """
+        return list(self._names)
+
+    @property
+    def sexes(self):
+        """ Sexes of the individuals of this ``Cohort``; 'Male' or 'Female' if detected, else
+        empty str.
+
+        Returns
+        -------
+        list of str
+        """
+        return list(self._sexes)
+
+    @property
+    def snp_count(self):
+        """ Count of SNPs in the panel.
+
+        Returns
+        -------
+        int
+        """
+        return len(self._keys)
+
+    @property
+    def chromosomes(self):
+        """ Chromosomes of the panel, in sorted order.
+
+        Returns
+        -------
+        list of str
+        """
+        return list(self._chroms)
+
+    @property
+    def genotypes(self):
+        """ Genotype codes; an individuals x SNPs `uint8` matrix.
+
+        Returns
+        -------
+        numpy.ndarray
+        """
+        return self._genotypes
+
+    @property
+    def keys(self):
+        """ rsid keys of the SNPs of the panel (see :func:`~lineage.snps.get_rsid_keys`).
+
+        Returns
+        -------
+        numpy.ndarray
+        """
+        return self._keys
+
+    @property
+    def pos(self):
+        """ Positions of the SNPs of the panel.
+
+        Returns
+        -------
+        numpy.ndarray
+        """
+        return self._pos
+
+    @property
+    def cMs(self):
+        """ Genetic positions (cM) of the SNPs of the panel, relative to the start of each
+        chromosome; null if the genetic map for a chromosome isn't available.
+
+        Returns
+        -------
+        numpy.ndarray
+        """
+        return self._cMs
+
+    @property
+    def offsets(self):
+        """ Offsets of the SNPs of each chromosome; the SNPs of `chromosomes[i]` are the columns
+        `offsets[i]` to `offsets[i + 1]`.
+
+        Returns
+        -------
+        numpy.ndarray
+        """
+        return self._offsets
+
+    def get_chrom_slice(self, chrom):
+        """ Get the columns of the SNPs of a chromosome.
+
+        Parameters
+        ----------
+        chrom : str
+
+        Returns
+        -------
+        slice
+            columns of the chromosome's SNPs; empty if the chromosome isn't in the panel
+        """
+        if chrom not in self._chroms:
+            return slice(0, 0)
+
+        i = self._chroms.index(chrom)
+        return slice(int(self._offsets[i]), int(self._offsets[i + 1]))
+
+    def index(self, individual):
+        """ Get the row of an individual.
+
+        Parameters
+        ----------
+        individual : Individual or str
+            individual or name of individual
+
+        Returns
+        -------
+        int
+        """
+        if not isinstance(individual, str):
+            individual = individual.get_var_name()
+
+        return self._names.index(individual)
+
+    def get_genotypes(self, individual):
+        """ Get the genotype codes of an individual.
+
+        Parameters
+        ----------
+        individual : Individual or str
+            individual or name of individual
+
+        Returns
+        -------
+        numpy.ndarray
+            genotype codes, aligned to the panel
+        """
+        return self._genotypes[self.index(individual)]
+
+    def get_snps(self):
+        """ Get the SNPs of the panel.
+
+        Returns
+        -------
+        pandas.DataFrame
+            chromosome, position, and genetic position (cM) of each SNP
+        """
+        return pd.DataFrame(
+            {"chrom": self._chrom, "pos": self._pos, "cM": self._cMs},
+            index=pd.Index(get_rsids(self._keys, self._other_ids), name="rsid"),
+            columns=["chrom", "pos", "cM"],
+        )
+
+    def get_columns(self, keys):
+        """ Get the columns of SNPs in the panel.
+
+        Parameters
+        ----------
+        keys : numpy.ndarray
+            rsid keys
+
+        Returns
+        -------
+        numpy.ndarray
+            column of each SNP, or -1 if the SNP isn't in the panel
+        """
+        columns = np.full(len(keys), -1, dtype=np.int64)
+
+        if len(self._sorted_keys) == 0:
+            return columns
+
+        loc = np.searchsorted(self._sorted_keys, keys)
+        loc[loc == len(self._sorted_keys)] = 0
+        found = self._sorted_keys[loc] == keys
+        columns[found] = self._columns[loc[found]]
+
+        return columns
+
+    def _align(self, keys, codes):
+        """ Align genotype codes of SNPs to the panel. """
+        aligned = np.full(len(self._keys), NULL, dtype=np.uint8)
+
+        if codes is not None:
+            columns = self.get_columns(keys)
+            in_panel = columns >= 0
+            aligned[columns[in_panel]] = codes[in_panel]
+
+        return aligned
+
+
+@instrumentation.instrumented("cohort.compute_cMs")
+def compute_cMs(pos, genetic_map):
+    """ Compute the genetic positions (cM) of SNPs on a chromosome.
+
+    Genetic positions are computed by integrating the recombination rates of the genetic map
+    (each rate applies from its position to the next position of the map, and a rate of 0 is
+    assumed upstream of the first position), so the genetic distance between two SNPs is the
+    difference between their genetic positions.
+
+    Parameters
+    ----------
+    pos : numpy.ndarray
+        positions of SNPs
+    genetic_map : pandas.DataFrame
+        genetic map for the chromosome, with `pos` and `rate` (cM/Mb) columns
+
+    Returns
+    -------
+    numpy.ndarray
+        genetic positions (cM) of SNPs
+    """
+    instrumentation.count(len(pos))
+    map_pos = genetic_map["pos"].values.astype(np.float64)
+    rate = genetic_map["rate"].values.astype(np.float64)
+
+    # genetic position at each position of the genetic map
+    map_cMs = np.r_[0, np.cumsum(rate[:-1] * np.diff(map_pos) / 1e6)]
+
+    i = np.searchsorted(map_pos, pos, side="right") - 1
+    upstream = i < 0
+    i[upstream] = 0
+
+    cMs = map_cMs[i] + rate[i] * (pos - map_pos[i]) / 1e6
+    cMs[upstream] = 0
+
+    return cMs
+
+
+def find_segments(match, cMs, cM_threshold, snp_threshold):
+    """ Find segments of consecutive matching SNPs that pass the thresholds for shared DNA.
+
+    Segments with more than `cM_threshold` cMs are found first; segments separated by only one
+    (e.g., discrepant) SNP are then stitched together, and stitched segments with more than
+    `snp_threshold` SNPs are shared DNA.
+
+    Parameters
+    ----------
+    match : numpy.ndarray
+        bool mask of the matching SNPs of a chromosome, sorted by position
+    cMs : numpy.ndarray
+        genetic positions (cM) of the SNPs (see :func:`compute_cMs`)
+    cM_threshold : float
+        minimum centiMorgans for each segment
+    snp_threshold : int
+        minimum SNPs for each segment
+
+    Returns
+    -------
+    segments : numpy.ndarray
+        start (inclusive) and end (exclusive) index of each segment
+    segment_cMs : numpy.ndarray
+        centiMorgans of each segment
+    """
+    return find_segments_thresholds(match, cMs, [(cM_threshold, snp_threshold)])[0]
+
+
+@instrumentation.instrumented("cohort.find_segments")
+def find_segments_thresholds(match, cMs, thresholds):
+    """ Find the segments of shared DNA for each of several pairs of thresholds.
+
+    The runs of matching SNPs and their centiMorgans are found once, and then filtered by each
+    pair of thresholds (see :func:`find_segments`), so that evaluating many thresholds costs
+    little more than evaluating one.
+
+    Parameters
+    ----------
+    match : numpy.ndarray
+        bool mask of the matching SNPs of a chromosome, sorted by position
+    cMs : numpy.ndarray
+        genetic positions (cM) of the SNPs (see :func:`compute_cMs`)
+    thresholds : list of tuple
+        pairs of minimum centiMorgans and minimum SNPs for each segment
+
+    Returns
+    -------
+    list of tuple
+        segments and centiMorgans of each segment (see :func:`find_segments`) for each pair of
+        thresholds
+    """
+    instrumentation.count(len(match))
+
+    # get consecutive strings of trues
+    # http://stackoverflow.com/a/17151327
+    a = np.r_[False, match, False]
+    edges = np.flatnonzero(a[1:] != a[:-1])
+    matches = edges.reshape(-1, 2)
+
+    # the distance from the SNP preceding a segment is included in the segment
+    c = np.r_[cMs[:1], cMs]
+    matches_cMs = c[matches[:, 1]] - c[matches[:, 0]]
+
+    results = []
+
+    for cM_threshold, snp_threshold in thresholds:
+        matches_passed = matches[matches_cMs > cM_threshold]
+
+        # stitch together segments where a segment's end boundary is adjacent to the next
+        # segment's start, perhaps indicating a discrepant SNP
+        if len(matches_passed) > 1:
+            adjacent = matches_passed[1:, 0] - matches_passed[:-1, 1] == 1
+            if np.any(adjacent):
+                starts = np.r_[True, ~adjacent]
+                ends = np.r_[~adjacent, True]
+                matches_passed = np.c_[matches_passed[starts, 0], matches_passed[ends, 1]]
+
+        # apply SNP count threshold for each segment
+        snp_counts = matches_passed[:, 1] - matches_passed[:, 0]
+        matches_passed = matches_passed[snp_counts > snp_threshold]
+
+        results.append(
+            (matches_passed, c[matches_passed[:, 1]] - c[matches_passed[:, 0]])
+        )
+
+    return results
+
+
+def _get_rsid_keys(individual):
+    if individual._snps is None:
+        return np.array([], dtype=np.int64)
+
+    return individual._get_rsid_keys()[0]
+
+
+def _get_other_ids(individuals, keys):
+    """ Get the identifiers of the negative (i.e., hashed) rsid keys of the individuals.
+
+    Since the panel is joined on keys, this also checks that a key has the same identifier for
+    all individuals (i.e., that hashes of identifiers of different individuals don't collide).
+    """
+    other_ids = {}
+
+    for individual, individual_keys in zip(individuals, keys):
+        other = np.flatnonzero(individual_keys < 0)
+
+        if len(other) > 0:
+            check_other_ids(
+                other_ids, individual_keys[other], individual._snps.index.values[other]
+            )
+
+    return other_ids
+
+
+def _get_positions(individuals, keys):
+    """ Get the chromosome and position of SNPs from the individuals with them. """
+    chrom = np.empty(len(keys), dtype=object)
+    pos = np.zeros(len(keys), dtype=np.int64)
+    found = np.zeros(len(keys), dtype=bool)
+
+    for individual in individuals:
+        if individual._snps is None or np.all(found):
+            continue
+
+        rows = np.flatnonzero(~found)
+        individual_keys, order = individual._get_rsid_keys()
+        indices_panel, indices = join_rsid_keys(keys[rows], individual_keys, order2=order)
+        rows = rows[indices_panel]
+
+        chrom[rows] = individual._snps["chrom"].values[indices]
+        pos[rows] = individual._snps["pos"].values[indices]
+        found[rows] = True
+
+    return chrom, pos
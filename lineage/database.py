@@ -0,0 +1,248 @@
+""" Persistent database of shared DNA segments, backed by SQLite.
+
+Segments of shared DNA (e.g., from :meth:`~lineage.Lineage.find_shared_dna` or
+:meth:`~lineage.store.CohortStore.find_shared_dna`) are stored with the totals of each pair of
+individuals, and indexed by individual, chromosome, and position, so matches can be queried
+without re-reading the output files of each pair.
+
+"""
+
+"""
+Copyright (C) 2019 Andrew Riha
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+import sqlite3
+
+import pandas as pd
+
+# each pair of individuals is stored once, with `name1` < `name2`
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS segments (
+    name1 TEXT NOT NULL,
+    name2 TEXT NOT NULL,
+    shared TEXT NOT NULL,
+    chrom TEXT NOT NULL,
+    "start" INTEGER NOT NULL,
+    "end" INTEGER NOT NULL,
+    cMs REAL NOT NULL,
+    snps INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS segments_name1 ON segments (name1, name2);
+CREATE INDEX IF NOT EXISTS segments_name2 ON segments (name2);
+CREATE INDEX IF NOT EXISTS segments_start ON segments (chrom, "start");
+CREATE INDEX IF NOT EXISTS segments_end ON segments (chrom, "end");
+CREATE TABLE IF NOT EXISTS matches (
+    name1 TEXT NOT NULL,
+    name2 TEXT NOT NULL,
+    shared TEXT NOT NULL,
+    cMs REAL NOT NULL,
+    segments INTEGER NOT NULL,
+    longest REAL NOT NULL,
+    PRIMARY KEY (name1, name2, shared)
+);
+CREATE INDEX IF NOT EXISTS matches_name2 ON matches (name2);
+"""
+
+SHARED = ["one", "two"]
+
+
+class MatchDatabase(object):
+    """ Object used to store and query segments of shared DNA. """
+
+    def __init__(self, path=":memory:"):
+        """ Open a ``MatchDatabase``.
+
+        Parameters
+        ----------
+        path : str
+            path of SQLite database file; created if it doesn't exist
+        """
+        self._connection = sqlite3.connect(path)
+        self._connection.executescript(_SCHEMA)
+
+    def close(self):
+        """ Close the database. """
+        self._connection.close()
+
+    def add_shared_dna(self, name1, name2, one_chrom_shared_dna, two_chrom_shared_dna):
+        """ Add the shared DNA between two individuals.
+
+        Shared DNA previously added for the pair is replaced.
+
+        Parameters
+        ----------
+        name1 : str
+            name of an individual
+        name2 : str
+            name of the other individual
+        one_chrom_shared_dna : pandas.DataFrame
+            segments of shared DNA on one chromosome (see
+            :meth:`~lineage.Lineage.find_shared_dna`)
+        two_chrom_shared_dna : pandas.DataFrame
+            segments of shared DNA on two chromosomes
+        """
+        one_chrom_shared_dna = one_chrom_shared_dna.assign(name=name2)
+        two_chrom_shared_dna = two_chrom_shared_dna.assign(name=name2)
+
+        self.add_matches(name1, one_chrom_shared_dna, two_chrom_shared_dna, [name2])
+
+    def add_matches(self, name, one_chrom_shared_dna, two_chrom_shared_dna, names=None):
+        """ Add the shared DNA between an individual and many individuals in bulk.
+
+        Shared DNA previously added for the pairs is replaced.
+
+        Parameters
+        ----------
+        name : str
+            name of individual
+        one_chrom_shared_dna : pandas.DataFrame
+            segments of shared DNA on one chromosome, with the name of the other individual (see
+            :meth:`~lineage.store.CohortStore.find_shared_dna`)
+        two_chrom_shared_dna : pandas.DataFrame
+            segments of shared DNA on two chromosomes, with the name of the other individual
+        names : list of str
+            names of the individuals that were compared with the individual (including those
+            without shared DNA, so that their previous results are replaced); if None, the
+            individuals with shared DNA
+        """
+        if names is None:
+            names = set(one_chrom_shared_dna["name"]) | set(two_chrom_shared_dna["name"])
+
+        pairs = [_get_pair(name, other) for other in names]
+        segments = []
+        matches = []
+
+        for shared, shared_dna in zip(SHARED, [one_chrom_shared_dna, two_chrom_shared_dna]):
+            for other, df in shared_dna.groupby("name", sort=False):
+                name1, name2 = _get_pair(name, other)
+
+                segments.extend(
+                    (name1, name2, shared, str(x[0]), int(x[1]), int(x[2]), float(x[3]), int(x[4]))
+                    for x in zip(df["chrom"], df["start"], df["end"], df["cMs"], df["snps"])
+                )
+                matches.append(
+                    (
+                        name1,
+                        name2,
+                        shared,
+                        float(df["cMs"].sum()),
+                        len(df),
+                        float(df["cMs"].max()),
+                    )
+                )
+
+        # add all rows in one transaction
+        with self._connection:
+            for table in ["segments", "matches"]:
+                self._connection.executemany(
+                    "DELETE FROM {} WHERE name1 = ? AND name2 = ?".format(table), pairs
+                )
+
+            self._connection.executemany(
+                "INSERT INTO segments VALUES (?, ?, ?, ?, ?, ?, ?, ?)", segments
+            )
+            self._connection.executemany(
+                "INSERT INTO matches VALUES (?, ?, ?, ?, ?, ?)", matches
+            )
+
+    def get_matches(self, name, min_cMs=0.0, shared="one"):
+        """ Get the individuals that share DNA with an individual.
+
+        Parameters
+        ----------
+        name : str
+            name of individual
+        min_cMs : float
+            minimum total centiMorgans of shared DNA
+        shared : {'one', 'two'}
+            get shared DNA on one chromosome or on two chromosomes
+
+        Returns
+        -------
+        pandas.DataFrame
+            total centiMorgans, number of segments, and centiMorgans of the longest segment of
+            the shared DNA with each individual, sorted by total centiMorgans
+        """
+        df = pd.read_sql_query(
+            "SELECT name2 AS name, cMs, segments, longest FROM matches "
+            "WHERE name1 = ? AND shared = ? AND cMs >= ? "
+            "UNION ALL "
+            "SELECT name1 AS name, cMs, segments, longest FROM matches "
+            "WHERE name2 = ? AND shared = ? AND cMs >= ? "
+            "ORDER BY cMs DESC, name",
+            self._connection,
+            params=(name, shared, min_cMs) * 2,
+        )
+        return df.set_index("name")
+
+    def get_segments(
+        self, name=None, chrom=None, start=None, end=None, min_cMs=0.0, shared=None
+    ):
+        """ Get segments of shared DNA.
+
+        Parameters
+        ----------
+        name : str
+            get only the segments of this individual
+        chrom : str
+            get only the segments on this chromosome
+        start : int
+            get only the segments that end after this position
+        end : int
+            get only the segments that start before this position
+        min_cMs : float
+            minimum centiMorgans of each segment
+        shared : {'one', 'two'}
+            get only shared DNA on one chromosome or on two chromosomes
+
+        Returns
+        -------
+        pandas.DataFrame
+            segments of shared DNA, with the names of both individuals
+        """
+        conditions = ["cMs >= ?"]
+        params = [min_cMs]
+
+        for column, operator, value in [
+            ("chrom", "=", chrom),
+            ('"end"', ">", start),
+            ('"start"', "<", end),
+            ("shared", "=", shared),
+        ]:
+            if value is not None:
+                conditions.append("{} {} ?".format(column, operator))
+                params.append(value)
+
+        query = "SELECT * FROM segments WHERE " + " AND ".join(conditions)
+
+        if name is not None:
+            # query each side of the pair separately, so both indexes are used
+            query = "{0} AND name1 = ? UNION ALL {0} AND name2 = ?".format(query)
+            params = params + [name] + params + [name]
+
+        df = pd.read_sql_query(
+            query + ' ORDER BY name1, name2, shared, chrom, "start"',
+            self._connection,
+            params=params,
+        )
+        df.index.name = "segment"
+        df.index = df.index + 1
+        return df
+
+
+def _get_pair(name1, name2):
+    return (name1, name2) if name1 < name2 else (name2, name1)
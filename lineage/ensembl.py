@@ -63,17 +63,6 @@ class EnsemblRestClient(object):
         self.last_req = 0
 
     def perform_rest_action(self, endpoint, hdrs=None, params=None):
-        if hdrs is None:
-            hdrs = {}
-
-        if "Content-Type" not in hdrs:
-            hdrs["Content-Type"] = "application/json"
-
-        if params:
-            endpoint += "?" + urllib.parse.urlencode(params)
-
-        data = None
-
         # check if we need to rate limit ourselves
         if self.req_count >= self.reqs_per_sec:
             delta = time.time() - self.last_req
@@ -82,14 +71,10 @@ class EnsemblRestClient(object):
             self.last_req = time.time()
             self.req_count = 0
 
-        try:
-            request = urllib.request.Request(self.server + endpoint, headers=hdrs)
-
-            with urllib.request.urlopen(request) as response:
-                content = response.read().decode("utf-8")
+        data = None
 
-            if content:
-                data = json.loads(content)
+        try:
+            data = self.request(endpoint, hdrs, params)
             self.req_count += 1
 
         except urllib.error.HTTPError as e:
@@ -98,7 +83,7 @@ class EnsemblRestClient(object):
                 if "Retry-After" in e.headers:
                     retry = e.headers["Retry-After"]
                     time.sleep(float(retry))
-                    self.perform_rest_action(endpoint, hdrs, params)
+                    data = self.perform_rest_action(endpoint, hdrs, params)
             else:
                 sys.stderr.write(
                     "Request failed for {0}: Status code: {1.code} Reason: {1.reason}\n".format(
@@ -107,3 +92,43 @@ class EnsemblRestClient(object):
                 )
 
         return data
+
+    def request(self, endpoint, hdrs=None, params=None):
+        """ Perform one request, without rate limiting or retries.
+
+        Parameters
+        ----------
+        endpoint : str
+            endpoint of request (e.g., '/map/human/GRCh37/1/GRCh38')
+        hdrs : dict
+            request headers; 'Content-Type' defaults to 'application/json'
+        params : dict
+            query parameters
+
+        Returns
+        -------
+        object
+            decoded JSON response, or None if the response is empty
+
+        Raises
+        ------
+        urllib.error.URLError
+            if the request failed (``urllib.error.HTTPError`` for error responses)
+        """
+        hdrs = dict(hdrs) if hdrs is not None else {}
+
+        if "Content-Type" not in hdrs:
+            hdrs["Content-Type"] = "application/json"
+
+        if params:
+            endpoint += "?" + urllib.parse.urlencode(params)
+
+        request = urllib.request.Request(self.server + endpoint, headers=hdrs)
+
+        with urllib.request.urlopen(request) as response:
+            content = response.read().decode("utf-8")
+
+        if content:
+            return json.loads(content)
+
+        return None
@@ -0,0 +1,305 @@
+""" Genotypes encoded as integer codes, and array kernels that operate on them.
+
+Each genotype is encoded as a `uint8` code representing the unordered pair of its alleles (e.g.,
+'AG' and 'GA' have the same code), so genotypes of many SNPs (and many individuals) can be
+compared with array operations, without creating intermediate strings.
+
+"""
+
+"""
+Copyright (C) 2019 Andrew Riha
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+import numpy as np
+import pandas as pd
+
+# alleles, in the order of their codes; D and I are deletions and insertions, and the others are
+# IUPAC codes (e.g., 'N'); the table is fixed, so codes are the same in every process and can be
+# persisted (e.g., see :class:`~lineage.store.CohortStore`)
+ALLELES = "ACGTDI" + "BHKMNRSUVWY"
+
+# code of a null genotype
+NULL = 0
+
+# code of a genotype that can't be encoded (e.g., a genotype with more than two alleles, or with
+# an allele not in `ALLELES`)
+UNKNOWN = 255
+
+
+def _get_table(alleles):
+    """ Get the codes of the genotypes of a table of alleles.
+
+    Codes are assigned sequentially, starting at 1: for each allele, the haploid genotype, then
+    the diploid genotypes with that allele and the alleles before it.
+
+    Returns
+    -------
+    codes : dict
+        code of each genotype (e.g., 'A', 'AG', and 'GA')
+    ploidy : numpy.ndarray
+        number of alleles of each code (0 for null / unknown genotypes)
+    allele1, allele2 : numpy.ndarray
+        alleles of each code as indices into `alleles`; alleles of haploid genotypes and the
+        second allele of homozygous genotypes are repeated, and alleles of null / unknown
+        genotypes are -1
+    """
+    codes = {}
+    ploidy = np.zeros(256, dtype=np.uint8)
+    allele1 = np.full(256, -1, dtype=np.int8)
+    allele2 = np.full(256, -1, dtype=np.int8)
+
+    code = NULL
+
+    for i, allele in enumerate(alleles):
+        code += 1
+        codes[allele] = code
+        ploidy[code] = 1
+        allele1[code] = allele2[code] = i
+
+        for j, other in enumerate(alleles[: i + 1]):
+            code += 1
+            codes[other + allele] = codes[allele + other] = code
+            ploidy[code] = 2
+            allele1[code] = j
+            allele2[code] = i
+
+    if code >= UNKNOWN:
+        raise ValueError("too many alleles to encode genotypes as uint8 codes")
+
+    return codes, ploidy, allele1, allele2
+
+
+_codes, PLOIDY, ALLELE1, ALLELE2 = _get_table(ALLELES)
+
+
+def _get_code(genotype):
+    """ Get the code of a genotype. """
+    return _codes.get(genotype, UNKNOWN)
+
+
+def get_code_map(alleles_from, alleles_to=ALLELES):
+    """ Get the map of the codes of one table of alleles to the codes of another.
+
+    Parameters
+    ----------
+    alleles_from : str or list of str
+        alleles of the codes to map, in the order of their codes (e.g., of a store)
+    alleles_to : str or list of str
+        alleles of the mapped codes, in the order of their codes
+
+    Returns
+    -------
+    numpy.ndarray
+        uint8 code for each code (i.e., index into the array); genotypes with alleles not in
+        `alleles_to` are mapped to `UNKNOWN`
+    """
+    codes_to = _get_table(alleles_to)[0]
+
+    code_map = np.full(256, UNKNOWN, dtype=np.uint8)
+    code_map[NULL] = NULL
+
+    for genotype, code in _get_table(alleles_from)[0].items():
+        code_map[code] = codes_to.get(genotype, UNKNOWN)
+
+    return code_map
+
+
+def encode_genotypes(genotypes):
+    """ Encode genotypes as integer codes.
+
+    Codes are fixed (see `ALLELES`), so codes of different individuals can be compared, and
+    codes can be persisted.
+
+    Parameters
+    ----------
+    genotypes : array_like of str
+        genotypes (e.g., the `genotype` column of SNPs); nulls are encoded as `NULL`, and
+        genotypes that can't be encoded are encoded as `UNKNOWN`
+
+    Returns
+    -------
+    numpy.ndarray
+        uint8 codes
+    """
+    # encode each of the (few) distinct genotypes rather than each SNP
+    labels, uniques = pd.factorize(np.asarray(genotypes, dtype=object))
+
+    unique_codes = np.array(
+        [_get_code(genotype) for genotype in uniques] + [NULL], dtype=np.uint8
+    )
+
+    # null genotypes are labeled -1, i.e., the last code
+    return unique_codes[labels]
+
+
+def is_homozygous(codes):
+    """ Determine which genotypes are diploid and homozygous.
+
+    Parameters
+    ----------
+    codes : numpy.ndarray
+        genotype codes
+
+    Returns
+    -------
+    numpy.ndarray
+        bool
+    """
+    return (PLOIDY[codes] == 2) & (ALLELE1[codes] == ALLELE2[codes])
+
+
+def discordant_duo(child, parent):
+    """ Find Mendelian inconsistencies between a child and a parent.
+
+    A SNP is discordant if both genotypes are haploid and differ, or if both genotypes are
+    diploid and have no allele in common [1]_. SNPs with a null child or parent genotype are not
+    discordant.
+
+    Parameters
+    ----------
+    child : numpy.ndarray
+        genotype codes of the child
+    parent : numpy.ndarray
+        genotype codes of the parent
+
+    Returns
+    -------
+    numpy.ndarray
+        bool; arrays of any shape are supported (e.g., `n_duos` x `n_snps` to process many duos
+        at once), following numpy broadcasting rules
+
+    References
+    ----------
+    ..[1] David Pike, "Search for Discordant SNPs in Parent-Child
+      Raw Data Files," David Pike's Utilities,
+      http://www.math.mun.ca/~dapike/FF23utils/pair-discord.php
+    """
+    child_ploidy = PLOIDY[child]
+    parent_ploidy = PLOIDY[parent]
+    c1 = ALLELE1[child]
+    c2 = ALLELE2[child]
+    p1 = ALLELE1[parent]
+    p2 = ALLELE2[parent]
+
+    haploid = (child_ploidy == 1) & (parent_ploidy == 1) & (c1 != p1)
+
+    diploid = (
+        (child_ploidy == 2)
+        & (parent_ploidy == 2)
+        & (c1 != p1)
+        & (c1 != p2)
+        & (c2 != p1)
+        & (c2 != p2)
+    )
+
+    return haploid | diploid
+
+
+def discordant_trio(child, parent1, parent2):
+    """ Find Mendelian inconsistencies between a child and both parents.
+
+    A SNP is discordant if it's discordant between the child and either parent (see
+    :func:`discordant_duo`), or if both parents are homozygous for the same allele and the
+    child's genotype differs [1]_. SNPs with a null child genotype are not discordant.
+
+    Parameters
+    ----------
+    child : numpy.ndarray
+        genotype codes of the child
+    parent1 : numpy.ndarray
+        genotype codes of one parent
+    parent2 : numpy.ndarray
+        genotype codes of the other parent
+
+    Returns
+    -------
+    numpy.ndarray
+        bool; arrays of any shape are supported (e.g., `n_trios` x `n_snps` to process many
+        trios at once), following numpy broadcasting rules
+
+    References
+    ----------
+    ..[1] David Pike, "Search for Discordant SNPs when given data
+      for child and both parents," David Pike's Utilities,
+      http://www.math.mun.ca/~dapike/FF23utils/trio-discord.php
+    """
+    homozygous_parents = (
+        is_homozygous(parent1) & (parent1 == parent2) & (child != parent1)
+    ) & (child != NULL)
+
+    return (
+        discordant_duo(child, parent1)
+        | discordant_duo(child, parent2)
+        | homozygous_parents
+    )
+
+
+def one_chrom_match(codes1, codes2):
+    """ Determine where two individuals share an allele on (at least) one chromosome.
+
+    SNPs with a null genotype are considered a match, so that no-calls don't break segments of
+    shared DNA.
+
+    Parameters
+    ----------
+    codes1 : numpy.ndarray
+        genotype codes of one individual
+    codes2 : numpy.ndarray
+        genotype codes of the other individual
+
+    Returns
+    -------
+    numpy.ndarray
+        bool; arrays of any shape are supported (e.g., `n_individuals` x `n_snps` to compare an
+        individual with many individuals at once), following numpy broadcasting rules
+    """
+    a1 = ALLELE1[codes1]
+    a2 = ALLELE2[codes1]
+    b1 = ALLELE1[codes2]
+    b2 = ALLELE2[codes2]
+
+    # alleles of unknown genotypes are -1, so they don't match
+    shared = (PLOIDY[codes1] > 0) & (
+        (a1 == b1) | (a1 == b2) | (a2 == b1) | (a2 == b2)
+    )
+
+    return (codes1 == NULL) | (codes2 == NULL) | shared
+
+
+def two_chrom_match(codes1, codes2):
+    """ Determine where two individuals share alleles on both chromosomes.
+
+    SNPs with a null genotype are considered a match, so that no-calls don't break segments of
+    shared DNA.
+
+    Parameters
+    ----------
+    codes1 : numpy.ndarray
+        genotype codes of one individual
+    codes2 : numpy.ndarray
+        genotype codes of the other individual
+
+    Returns
+    -------
+    numpy.ndarray
+        bool; arrays of any shape are supported, following numpy broadcasting rules
+    """
+    return (
+        (codes1 == NULL)
+        | (codes2 == NULL)
+        | ((codes1 == codes2) & (PLOIDY[codes1] == 2))
+    )
@@ -18,6 +18,7 @@ along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 """
 
+import logging
 import os
 import re
 
@@ -25,16 +26,26 @@ import numpy as np
 import pandas as pd
 
 import lineage
+from lineage import instrumentation, memory, progress
+from lineage.genotypes import encode_genotypes
 from lineage.snps import (
     SNPs,
+    SNPsCache,
     get_assembly,
+    get_chrom_dtype,
     get_chromosomes,
+    get_chromosome_fingerprints,
     get_chromosomes_summary,
+    get_fingerprint,
     get_snp_count,
+    get_rsid_keys,
+    join_rsid_keys,
     sort_snps,
     determine_sex,
 )
 
+logger = logging.getLogger(__name__)
+
 
 class Individual(object):
     """ Object used to represent and interact with an individual.
@@ -60,6 +71,7 @@ class Individual(object):
         self._name = name
         self._output_dir = output_dir
         self._snps = None
+        self._cache = SNPsCache()
         self._build = None
         self._source = []
         self._discrepant_positions_file_count = 0
@@ -91,11 +103,30 @@ class Individual(object):
         -------
         pandas.DataFrame
         """
-        if self._snps is not None:
-            return self._snps.copy()
-        else:
+        return self.get_snps()
+
+    def get_snps(self, copy=True):
+        """ Get this ``Individual``'s SNPs.
+
+        Parameters
+        ----------
+        copy : bool
+            if False, get the SNPs without copying their data (e.g., for analyses that only read
+            the SNPs); the returned dataframe is a new object, so adding or removing its columns
+            or rows doesn't affect this ``Individual``, but it shares its values with this
+            ``Individual``, so callers must not set its values (e.g., with `loc`, or by assigning
+            to an existing column, which sets the values in place in some versions of pandas);
+            use `assign` to replace columns, or copy the dataframe to modify it
+
+        Returns
+        -------
+        pandas.DataFrame
+        """
+        if self._snps is None:
             return None
 
+        return self._snps.copy(deep=copy)
+
     @property
     def snp_count(self):
         """ Count of SNPs loaded for this ``Individual``.
@@ -104,7 +135,7 @@ class Individual(object):
         -------
         int
         """
-        return get_snp_count(self._snps)
+        return self._cache.get(self._snps, "snp_count", get_snp_count)
 
     @property
     def chromosomes(self):
@@ -115,7 +146,7 @@ class Individual(object):
         list
             list of str chromosomes (e.g., ['1', '2', '3', 'MT'], empty list if no chromosomes
         """
-        return get_chromosomes(self._snps)
+        return list(self._cache.get(self._snps, "chromosomes", get_chromosomes))
 
     @property
     def chromosomes_summary(self):
@@ -126,7 +157,7 @@ class Individual(object):
         str
             human-readable listing of chromosomes (e.g., '1-3, MT'), empty str if no chromosomes
         """
-        return get_chromosomes_summary(self._snps)
+        return self._cache.get(self._snps, "chromosomes_summary", get_chromosomes_summary)
 
     @property
     def build(self):
@@ -167,7 +198,108 @@ class Individual(object):
         str
             'Male' or 'Female' if detected, else empty str
         """
-        return determine_sex(self._snps)
+        return self._cache.get(self._snps, "sex", determine_sex)
+
+    @property
+    def fingerprint(self):
+        """ Fingerprint of the content of this ``Individual``'s SNPs.
+
+        The fingerprint changes whenever SNPs are loaded, merged, or remapped, so it can be used
+        to identify results computed from the SNPs (see :func:`~lineage.snps.get_fingerprint`).
+
+        Returns
+        -------
+        str
+            hex digest, or None if no SNPs
+        """
+        return self._cache.get(self._snps, "fingerprint", get_fingerprint)
+
+    @property
+    def chromosome_fingerprints(self):
+        """ Fingerprints of the content of this ``Individual``'s SNPs on each chromosome.
+
+        Only the fingerprints of chromosomes with changed SNPs change when SNPs are loaded or
+        merged (see :func:`~lineage.snps.get_chromosome_fingerprints`).
+
+        Returns
+        -------
+        dict
+            hex digest of each chromosome, empty dict if no SNPs
+        """
+        return dict(
+            self._cache.get(
+                self._snps, "chromosome_fingerprints", get_chromosome_fingerprints
+            )
+        )
+
+    def get_summary(self):
+        """ Get summary of this ``Individual``'s SNPs.
+
+        Statistics derived from the SNPs are computed once and cached until the SNPs change
+        (e.g., when SNPs are loaded or remapped).
+
+        Returns
+        -------
+        dict
+            summary info, else None if this ``Individual`` has no SNPs
+        """
+        if self._snps is None:
+            return None
+        else:
+            return {
+                "name": self.name,
+                "source": self.source,
+                "assembly": self.assembly,
+                "build": self.build,
+                "snp_count": self.snp_count,
+                "chromosomes": self.chromosomes_summary,
+                "sex": self.sex,
+            }
+
+    def get_memory_usage(self):
+        """ Get the memory used by this ``Individual``, by component.
+
+        Returns
+        -------
+        pandas.Series
+            memory usage in bytes of each component: the index and columns of the SNPs
+            (e.g., 'snps.genotype'), the discrepant SNPs, and the values cached from the SNPs
+
+        Notes
+        -----
+        Memory can be freed with :meth:`clear_discrepant_snps` and :meth:`clear_cache`.
+        """
+        usage = []
+
+        if self._snps is not None:
+            snps_usage = self._snps.memory_usage(index=True, deep=True)
+            snps_usage.index = ["snps." + str(key).lower() for key in snps_usage.index]
+            usage.append(snps_usage)
+
+        usage.append(
+            pd.Series(
+                [
+                    memory.get_size(self._discrepant_positions),
+                    memory.get_size(self._discrepant_genotypes),
+                    self._cache.get_memory_usage(),
+                ],
+                index=["discrepant_positions", "discrepant_genotypes", "cache"],
+            )
+        )
+
+        return pd.concat(usage).astype(np.int64)
+
+    def clear_discrepant_snps(self):
+        """ Clear the discrepant SNPs discovered while loading SNPs, to free memory. """
+        self._discrepant_positions = pd.DataFrame()
+        self._discrepant_genotypes = pd.DataFrame()
+
+    def clear_cache(self):
+        """ Clear the values cached from the SNPs (e.g., fingerprints), to free memory.
+
+        Values are computed again when needed.
+        """
+        self._cache.clear()
 
     @property
     def discrepant_positions(self):
@@ -208,6 +340,8 @@ class Individual(object):
         discrepant_snp_positions_threshold=100,
         discrepant_genotypes_threshold=500,
         save_output=False,
+        chroms=None,
+        region=None,
     ):
         """ Load raw genotype data.
 
@@ -223,21 +357,30 @@ class Individual(object):
             a large value could indicated mismatched individuals
         save_output : bool
             specifies whether to save discrepant SNP output to CSV files in the output directory
+        chroms : list of str
+            only load SNPs on these chromosomes (e.g., ['X', 'Y'])
+        region : str
+            only load SNPs in this region (e.g., '7' or '7:10000000-20000000')
         """
         if type(raw_data) is list:
-            for file in raw_data:
+            for i, file in enumerate(raw_data, 1):
                 self._load_snps_helper(
                     file,
                     discrepant_snp_positions_threshold,
                     discrepant_genotypes_threshold,
                     save_output,
+                    chroms,
+                    region,
                 )
+                progress.report("individual.load_snps", i, len(raw_data), file)
         elif type(raw_data) is str:
             self._load_snps_helper(
                 raw_data,
                 discrepant_snp_positions_threshold,
                 discrepant_genotypes_threshold,
                 save_output,
+                chroms,
+                region,
             )
         else:
             raise TypeError("invalid filetype")
@@ -248,10 +391,33 @@ class Individual(object):
         discrepant_snp_positions_threshold,
         discrepant_genotypes_threshold,
         save_output,
+        chroms=None,
+        region=None,
+    ):
+        logger.info("Loading %s", os.path.relpath(file))
+        self._merge_snps(
+            SNPs(file, chroms=chroms, region=region),
+            discrepant_snp_positions_threshold,
+            discrepant_genotypes_threshold,
+            save_output,
+        )
+
+    def _merge_snps(
+        self,
+        snps,
+        discrepant_snp_positions_threshold,
+        discrepant_genotypes_threshold,
+        save_output,
     ):
-        print("Loading " + os.path.relpath(file))
+        """ Merge SNPs loaded from a file into this ``Individual``'s SNPs.
+
+        Parameters
+        ----------
+        snps : SNPs
+            SNPs loaded from a file
+        """
         discrepant_positions, discrepant_genotypes = self._add_snps(
-            SNPs(file),
+            snps,
             discrepant_snp_positions_threshold,
             discrepant_genotypes_threshold,
             save_output,
@@ -264,13 +430,17 @@ class Individual(object):
             discrepant_genotypes, sort=True
         )
 
-    def save_snps(self, filename=None):
+    def save_snps(self, filename=None, bgzip=False):
         """ Save SNPs to file.
 
         Parameters
         ----------
         filename : str
             filename for file to save
+        bgzip : bool
+            compress the file with BGZF and index it, so that chromosomes / regions can be
+            loaded without decompressing the whole file; ".gz" is appended to `filename` if
+            missing, so that the file is read as compressed
 
         Returns
         -------
@@ -289,11 +459,15 @@ class Individual(object):
         if filename is None:
             filename = self.get_var_name() + "_lineage_" + self.assembly + ".csv"
 
+        if bgzip and not filename.endswith(".gz"):
+            filename += ".gz"
+
         return lineage.save_df_as_csv(
             self._snps,
             self._output_dir,
             filename,
             comment=comment,
+            bgzip=bgzip,
             header=["chromosome", "position", "genotype"],
         )
 
@@ -442,7 +616,46 @@ class Individual(object):
         """
         self._snps = snps
         self._build = build
+        self._cache.clear()
+
+    def _get_rsid_keys(self):
+        """ Get the integer rsid keys of this ``Individual``'s SNPs.
+
+        Notes
+        -----
+        Intended to be used internally to `lineage`. Keys are cached until `_snps` is replaced.
+
+        Returns
+        -------
+        keys : numpy.ndarray
+            rsid keys (see :func:`~lineage.snps.get_rsid_keys`)
+        order : numpy.ndarray
+            indices that sort `keys`
+        """
+        return self._cache.get(self._snps, "rsid_keys", self._compute_rsid_keys)
+
+    def _get_genotype_codes(self):
+        """ Get the genotype codes of this ``Individual``'s SNPs.
+
+        Notes
+        -----
+        Intended to be used internally to `lineage`. Codes are cached until `_snps` is replaced.
+
+        Returns
+        -------
+        numpy.ndarray
+            genotype codes (see :func:`~lineage.genotypes.encode_genotypes`)
+        """
+        return self._cache.get(
+            self._snps, "genotype_codes", lambda snps: encode_genotypes(snps["genotype"])
+        )
+
+    @staticmethod
+    def _compute_rsid_keys(snps):
+        keys = get_rsid_keys(snps.index)
+        return keys, np.argsort(keys, kind="mergesort")
 
+    @instrumentation.instrumented("individual.merge")
     def _add_snps(
         self,
         snps,
@@ -474,16 +687,18 @@ class Individual(object):
         if snps.snps is None:
             return discrepant_positions, discrepant_genotypes
 
+        instrumentation.count(len(snps.snps))
+
         build = snps.build
         source = [s.strip() for s in snps.source.split(",")]
 
         if not snps.build_detected:
-            print("build not detected, assuming build {}".format(snps.build))
+            logger.warning("build not detected, assuming build %s", snps.build)
 
         if self._build is None:
             self._build = build
         elif self._build != build:
-            print(
+            logger.warning(
                 "build / assembly mismatch between current build of SNPs and SNPs being loaded"
             )
 
@@ -494,7 +709,33 @@ class Individual(object):
             self._source.extend(source)
             self._snps = snps
         else:
-            common_snps = self._snps.join(snps, how="inner", rsuffix="_added")
+            keys, order = self._get_rsid_keys()
+            indices, indices_added = join_rsid_keys(
+                keys,
+                get_rsid_keys(snps.index),
+                order1=order,
+                rsids1=self._snps.index,
+                rsids2=snps.index,
+            )
+
+            columns = list(self._snps.columns) + [col + "_added" for col in snps.columns]
+            values = [self._snps[col].values[indices] for col in self._snps.columns] + [
+                snps[col].values[indices_added] for col in snps.columns
+            ]
+            common_snps = pd.DataFrame(
+                dict(zip(columns, values)),
+                index=self._snps.index[indices],
+                columns=columns,
+            )
+
+            # give the chromosomes of both SNPs the same categories, so that they can be
+            # compared (e.g., if only one file has a non-standard chromosome)
+            chrom_dtype = get_chrom_dtype(
+                list(common_snps["chrom"].cat.categories)
+                + list(common_snps["chrom_added"].cat.categories)
+            )
+            common_snps["chrom"] = common_snps["chrom"].astype(chrom_dtype)
+            common_snps["chrom_added"] = common_snps["chrom_added"].astype(chrom_dtype)
 
             discrepant_positions = common_snps.loc[
                 (common_snps["chrom"] != common_snps["chrom_added"])
@@ -502,9 +743,9 @@ class Individual(object):
             ]
 
             if 0 < len(discrepant_positions) < discrepant_snp_positions_threshold:
-                print(
-                    str(len(discrepant_positions)) + " SNP positions were discrepant; "
-                    "keeping original positions"
+                logger.warning(
+                    "%s SNP positions were discrepant; keeping original positions",
+                    len(discrepant_positions),
                 )
 
                 if save_output:
@@ -518,7 +759,7 @@ class Individual(object):
                         + ".csv",
                     )
             elif len(discrepant_positions) >= discrepant_snp_positions_threshold:
-                print(
+                logger.warning(
                     "too many SNPs differ in position; ensure same genome build is being used"
                 )
                 return discrepant_positions, discrepant_genotypes
@@ -567,9 +808,9 @@ class Individual(object):
             ]
 
             if 0 < len(discrepant_genotypes) < discrepant_genotypes_threshold:
-                print(
-                    str(len(discrepant_genotypes)) + " SNP genotypes were discrepant; "
-                    "marking those as null"
+                logger.warning(
+                    "%s SNP genotypes were discrepant; marking those as null",
+                    len(discrepant_genotypes),
                 )
 
                 if save_output:
@@ -583,21 +824,28 @@ class Individual(object):
                         + ".csv",
                     )
             elif len(discrepant_genotypes) >= discrepant_genotypes_threshold:
-                print(
+                logger.warning(
                     "too many SNPs differ in their genotype; ensure file is for same "
                     "individual"
                 )
                 return discrepant_positions, discrepant_genotypes
 
+            # fill null genotypes of common SNPs with the genotypes of the added SNPs
+            genotype = self._snps["genotype"].values.copy()
+            fill = pd.isnull(genotype[indices])
+            genotype[indices[fill]] = snps["genotype"].values[indices_added[fill]]
+
             # add new SNPs
+            added = np.ones(len(snps), dtype=bool)
+            added[indices_added] = False
+
             self._source.extend(source)
-            self._snps = self._snps.combine_first(snps)
+            self._snps = self._snps.assign(genotype=genotype)
             self._snps.loc[discrepant_genotypes.index, "genotype"] = np.nan
-
-            # combine_first converts position to float64, so convert it back to int64
-            self._snps["pos"] = self._snps["pos"].astype(np.int64)
+            self._snps = pd.concat([self._snps, snps.iloc[added]])
 
         self._snps = sort_snps(self._snps)
+        self._cache.clear()
 
         return discrepant_positions, discrepant_genotypes
 
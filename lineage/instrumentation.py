@@ -0,0 +1,250 @@
+""" Opt-in instrumentation of the stages of `lineage` (e.g., parsing, remapping, plotting).
+
+Instrumentation is disabled by default, and then costs one check per stage. When enabled, the
+wall time of each stage, and the rows and bytes processed by the stage, are recorded; records
+are aggregated into stats (see :func:`get_stats`) and passed to hooks (see :func:`add_hook`).
+Stages can be nested (e.g., ``lineage.find_shared_dna`` includes ``cohort.find_segments``), so
+the time of a stage includes the time of its nested stages.
+
+Examples
+--------
+>>> from lineage import Lineage, instrumentation
+>>> instrumentation.enable()
+>>> l = Lineage()
+>>> user662 = l.create_individual('User662', 'resources/662.23andme.340.txt.gz')
+>>> instrumentation.get_stats()  # doctest: +SKIP
+                      count      time    rows     bytes
+stage
+snps.parse                1  2.191436  991767  16081632
+individual.merge          1  0.337109  991767         0
+...
+
+"""
+
+"""
+Copyright (C) 2019 Andrew Riha
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+from collections import namedtuple
+import functools
+import logging
+import threading
+import time
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# record of one run of a stage: wall time (s), and rows and bytes processed
+Record = namedtuple("Record", ["stage", "time", "rows", "bytes"])
+
+_enabled = False
+_hooks = []
+_stats = {}
+_lock = threading.Lock()
+
+# stack of the active stages of each thread
+_local = threading.local()
+
+
+def enable():
+    """ Enable instrumentation. """
+    global _enabled
+    _enabled = True
+
+
+def disable():
+    """ Disable instrumentation; stats recorded so far are kept. """
+    global _enabled
+    _enabled = False
+
+
+def is_enabled():
+    """ Check if instrumentation is enabled.
+
+    Returns
+    -------
+    bool
+    """
+    return _enabled
+
+
+def add_hook(hook):
+    """ Add a hook that is called with the record of each stage, when the stage completes.
+
+    Parameters
+    ----------
+    hook : function
+        function that takes a :class:`Record`; hooks are called on the thread that ran the
+        stage, so they should be fast and thread-safe
+    """
+    with _lock:
+        if hook not in _hooks:
+            _hooks.append(hook)
+
+
+def remove_hook(hook):
+    """ Remove a hook.
+
+    Parameters
+    ----------
+    hook : function
+        hook added with :func:`add_hook`
+    """
+    with _lock:
+        if hook in _hooks:
+            _hooks.remove(hook)
+
+
+def get_stats():
+    """ Get the stats of each stage recorded since instrumentation was enabled or reset.
+
+    Returns
+    -------
+    pandas.DataFrame
+        count of runs, and total wall time (s), rows, and bytes of each stage, sorted by time
+    """
+    with _lock:
+        stats = [[stage] + list(values) for stage, values in _stats.items()]
+
+    df = pd.DataFrame(stats, columns=["stage", "count", "time", "rows", "bytes"])
+    df = df.set_index("stage").sort_values("time", ascending=False)
+    return df
+
+
+def reset_stats():
+    """ Reset the recorded stats. """
+    with _lock:
+        _stats.clear()
+
+
+def stage(name):
+    """ Get a context manager that records a stage.
+
+    Parameters
+    ----------
+    name : str
+        name of stage (e.g., 'snps.parse')
+
+    Returns
+    -------
+    context manager
+        records the stage if instrumentation is enabled, else does nothing
+
+    Examples
+    --------
+    >>> with stage('lineage.remap_snps'):
+    ...     count(rows=1000)
+    """
+    if not _enabled:
+        return _NULL_STAGE
+
+    return _Stage(name)
+
+
+def count(rows=0, nbytes=0):
+    """ Count rows and bytes processed by the innermost active stage of this thread.
+
+    Parameters
+    ----------
+    rows : int
+        rows processed (e.g., SNPs)
+    nbytes : int
+        bytes read or written
+    """
+    if not _enabled:
+        return
+
+    stack = getattr(_local, "stack", None)
+
+    if stack:
+        stack[-1].rows += int(rows)
+        stack[-1].bytes += int(nbytes)
+
+
+def instrumented(name):
+    """ Decorate a function so that each call is recorded as a stage.
+
+    Parameters
+    ----------
+    name : str
+        name of stage
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+
+            with _Stage(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+class _Stage(object):
+    __slots__ = ["name", "rows", "bytes", "_start"]
+
+    def __init__(self, name):
+        self.name = name
+        self.rows = 0
+        self.bytes = 0
+        self._start = None
+
+    def __enter__(self):
+        if not hasattr(_local, "stack"):
+            _local.stack = []
+
+        _local.stack.append(self)
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self._start
+        _local.stack.pop()
+        _record(Record(self.name, elapsed, self.rows, self.bytes))
+        return False
+
+
+class _NullStage(object):
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+def _record(record):
+    with _lock:
+        values = _stats.setdefault(record.stage, [0, 0.0, 0, 0])
+        values[0] += 1
+        values[1] += record.time
+        values[2] += record.rows
+        values[3] += record.bytes
+        hooks = list(_hooks)
+
+    for hook in hooks:
+        try:
+            hook(record)
+        except Exception as err:
+            logger.error(err)
@@ -0,0 +1,79 @@
+""" Estimate the memory used by `lineage` objects (e.g., SNPs, resources, caches). """
+
+"""
+Copyright (C) 2019 Andrew Riha
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+import sys
+
+import numpy as np
+import pandas as pd
+
+
+def get_size(obj, seen=None):
+    """ Get the deep size of an object, in bytes.
+
+    The sizes of pandas objects and numpy arrays include their data (and the Python objects
+    they hold, e.g., strings); the sizes of containers (dict, list, tuple, set) include their
+    items. Objects referenced more than once are counted once.
+
+    Parameters
+    ----------
+    obj : object
+        object to size
+    seen : set
+        ids of objects already counted (e.g., by a previous call), which aren't counted again;
+        ids of the objects counted by this call are added
+
+    Returns
+    -------
+    int
+        size in bytes
+    """
+    if seen is None:
+        seen = set()
+
+    size = 0
+    stack = [obj]
+
+    while stack:
+        obj = stack.pop()
+
+        if obj is None or id(obj) in seen:
+            continue
+
+        seen.add(id(obj))
+
+        if isinstance(obj, pd.DataFrame):
+            size += int(obj.memory_usage(index=True, deep=True).sum())
+        elif isinstance(obj, (pd.Series, pd.Index)):
+            size += int(obj.memory_usage(deep=True))
+        elif isinstance(obj, np.ndarray):
+            size += obj.nbytes
+            if obj.dtype == object:
+                stack.extend(obj.ravel())
+        elif isinstance(obj, dict):
+            size += sys.getsizeof(obj)
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            size += sys.getsizeof(obj)
+            stack.extend(obj)
+        else:
+            size += sys.getsizeof(obj)
+
+    return size
@@ -0,0 +1,99 @@
+""" Progress events of long-running operations (e.g., loading files, remapping chromosomes).
+
+Progress is reported to callbacks added with :func:`add_callback`; when no callbacks are added,
+reporting progress does nothing. Messages (e.g., the files being loaded and saved) are logged
+with the standard :mod:`logging` module, under the ``lineage`` logger, which is silent unless
+logging is configured by the application.
+
+Examples
+--------
+>>> import logging
+>>> from lineage import progress
+>>> logging.basicConfig(level=logging.INFO)
+>>> progress.add_callback(lambda p: print(p.task, p.done, '/', p.total))
+
+"""
+
+"""
+Copyright (C) 2019 Andrew Riha
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+from collections import namedtuple
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# progress of a task: count of items done, total count of items, and the last item done
+Progress = namedtuple("Progress", ["task", "done", "total", "item"])
+
+_callbacks = []
+_lock = threading.Lock()
+
+
+def add_callback(callback):
+    """ Add a callback that is called with the progress of tasks.
+
+    Parameters
+    ----------
+    callback : function
+        function that takes a :class:`Progress`; callbacks are called on the thread that runs
+        the task, so they should be fast and thread-safe
+    """
+    with _lock:
+        if callback not in _callbacks:
+            _callbacks.append(callback)
+
+
+def remove_callback(callback):
+    """ Remove a callback.
+
+    Parameters
+    ----------
+    callback : function
+        callback added with :func:`add_callback`
+    """
+    with _lock:
+        if callback in _callbacks:
+            _callbacks.remove(callback)
+
+
+def report(task, done, total, item=None):
+    """ Report the progress of a task.
+
+    Parameters
+    ----------
+    task : str
+        name of task (e.g., 'individual.load_snps')
+    done : int
+        count of items done
+    total : int
+        total count of items
+    item : object
+        last item done (e.g., a path or chromosome)
+    """
+    if not _callbacks:
+        return
+
+    with _lock:
+        callbacks = list(_callbacks)
+
+    for callback in callbacks:
+        try:
+            callback(Progress(task, done, total, item))
+        except Exception as err:
+            logger.error(err)
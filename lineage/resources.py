@@ -47,12 +47,17 @@ along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 """
 
+import functools
 import gzip
+import io
 import itertools
 import json
+import logging
 import os
+import shutil
 import tarfile
 import tempfile
+import threading
 import urllib.error
 import urllib.request
 import zlib
@@ -60,6 +65,46 @@ import zlib
 import pandas as pd
 
 import lineage
+from lineage import instrumentation, memory, progress
+
+logger = logging.getLogger(__name__)
+
+# URL, filename, and whether to compress each example dataset; the last two datasets consist of
+# concatenated gzip files and therefore need special handling
+_EXAMPLE_DATASETS = [
+    ("https://opensnp.org/data/662.23andme.304", "662.23andme.304.txt.gz", True),
+    ("https://opensnp.org/data/662.23andme.340", "662.23andme.340.txt.gz", True),
+    (
+        "https://opensnp.org/data/662.ftdna-illumina.341",
+        "662.ftdna-illumina.341.csv.gz",
+        True,
+    ),
+    ("https://opensnp.org/data/663.23andme.305", "663.23andme.305.txt.gz", True),
+    (
+        "https://opensnp.org/data/4583.ftdna-illumina.3482",
+        "4583.ftdna-illumina.3482.csv.gz",
+        False,
+    ),
+    (
+        "https://opensnp.org/data/4584.ftdna-illumina.3483",
+        "4584.ftdna-illumina.3483.csv.gz",
+        False,
+    ),
+]
+
+# chromosomes of assembly mapping data
+_ASSEMBLY_MAPPING_CHROMS = [str(chrom) for chrom in range(1, 23)] + ["X", "Y", "MT"]
+
+
+def _synchronized(method):
+    """ Decorate a method of ``Resources`` so that it holds the lock of the object. """
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+
+    return wrapper
 
 
 class Resources(object):
@@ -74,27 +119,66 @@ class Resources(object):
             name / path of resources directory
         """
         self._resources_dir = os.path.abspath(resources_dir)
-        self._genetic_map_HapMapII_GRCh37 = None
+        self._genetic_map_HapMapII_GRCh37 = _ChromosomeCache()
         self._cytoBand_hg19 = None
         self._knownGene_hg19 = None
         self._kgXref_hg19 = None
+        self._knownGene_hg19_chroms = _ChromosomeCache()
+        self._kgXref_hg19_chroms = _ChromosomeCache()
+        self._assembly_mapping_data = {}
+        self._verified_assembly_mapping_paths = set()
         self._ensembl_rest_client = ensembl_rest_client
+        # resources are loaded (and downloaded) once, even if requested by several threads
+        self._lock = threading.RLock()
 
-    def get_genetic_map_HapMapII_GRCh37(self):
+    @_synchronized
+    def get_genetic_map_HapMapII_GRCh37(self, chroms=None):
         """ Get International HapMap Consortium HapMap Phase II genetic map for Build 37.
 
+        Parameters
+        ----------
+        chroms : list of str
+            chromosomes to get; if None, get all chromosomes
+
         Returns
         -------
         dict
             dict of pandas.DataFrame HapMapII genetic maps if loading was successful, else None
+
+        Notes
+        -----
+        Chromosomes are loaded on demand and cached, so specifying `chroms` only parses the
+        genetic maps of those chromosomes.
         """
-        if self._genetic_map_HapMapII_GRCh37 is None:
-            self._genetic_map_HapMapII_GRCh37 = self._load_genetic_map(
-                self._get_path_genetic_map_HapMapII_GRCh37()
-            )
+        return self._get_chroms(
+            self._genetic_map_HapMapII_GRCh37,
+            chroms,
+            lambda chroms: self._load_genetic_map(
+                self._get_path_genetic_map_HapMapII_GRCh37(), chroms
+            ),
+        )
+
+    def get_genetic_map_HapMapII_GRCh37_version(self):
+        """ Get the version of the HapMap Phase II genetic map for Build 37.
 
-        return self._genetic_map_HapMapII_GRCh37
+        The version identifies the local copy of the genetic map, so that results computed from
+        the genetic map (e.g., cached shared DNA) can be invalidated if it changes.
+
+        Returns
+        -------
+        str
+            version (name, size, and modification time of the local file) if the genetic map is
+            available, else None
+        """
+        path = self._get_path_genetic_map_HapMapII_GRCh37()
 
+        if path is None or not os.path.exists(path):
+            return None
+
+        stat = os.stat(path)
+        return "{}:{}:{}".format(os.path.basename(path), stat.st_size, int(stat.st_mtime))
+
+    @_synchronized
     def get_cytoBand_hg19(self):
         """ Get UCSC cytoBand table for Build 37.
 
@@ -108,33 +192,91 @@ class Resources(object):
 
         return self._cytoBand_hg19
 
-    def get_knownGene_hg19(self):
+    @_synchronized
+    def get_knownGene_hg19(self, chroms=None):
         """ Get UCSC knownGene table for Build 37.
 
+        Parameters
+        ----------
+        chroms : list of str
+            chromosomes of genes to get; if None, get all genes
+
         Returns
         -------
         pandas.DataFrame
             knownGene table if loading was successful, else None
         """
-        if self._knownGene_hg19 is None:
-            self._knownGene_hg19 = self._load_knownGene(self._get_path_knownGene_hg19())
+        if chroms is None:
+            if self._knownGene_hg19 is None:
+                self._knownGene_hg19 = self._load_knownGene(
+                    self._get_path_knownGene_hg19()
+                )
+
+            return self._knownGene_hg19
 
-        return self._knownGene_hg19
+        if self._knownGene_hg19 is not None:
+            return self._knownGene_hg19.loc[self._knownGene_hg19["chrom"].isin(chroms)]
 
-    def get_kgXref_hg19(self):
+        def load(chroms):
+            lines = self._read_chrom_lines(
+                self._get_path_knownGene_hg19(), chroms, self._get_knownGene_chrom
+            )
+            return self._split_by_chrom(self._load_knownGene(lines), chroms)
+
+        tables = self._get_chroms(self._knownGene_hg19_chroms, chroms, load)
+
+        return self._concat_chroms(tables, chroms)
+
+    @_synchronized
+    def get_kgXref_hg19(self, chroms=None):
         """ Get UCSC kgXref table for Build 37.
 
+        Parameters
+        ----------
+        chroms : list of str
+            chromosomes of genes to get; if None, get all genes
+
         Returns
         -------
         pandas.DataFrame
             kgXref table if loading was successful, else None
         """
-        if self._kgXref_hg19 is None:
-            self._kgXref_hg19 = self._load_kgXref(self._get_path_kgXref_hg19())
+        if chroms is None:
+            if self._kgXref_hg19 is None:
+                self._kgXref_hg19 = self._load_kgXref(self._get_path_kgXref_hg19())
+
+            return self._kgXref_hg19
 
-        return self._kgXref_hg19
+        knownGene = self.get_knownGene_hg19(chroms)
+
+        if knownGene is None:
+            return None
 
-    def get_assembly_mapping_data(self, source_assembly, target_assembly):
+        if self._kgXref_hg19 is not None:
+            return self._kgXref_hg19.loc[
+                self._kgXref_hg19.index.isin(knownGene.index)
+            ]
+
+        def load(chroms):
+            lines = self._read_chrom_lines(
+                self._get_path_kgXref_hg19(), chroms, self._get_kgXref_chrom
+            )
+            df = self._load_kgXref(lines)
+            if df is None:
+                return None
+            df["chrom"] = knownGene["chrom"]
+            return self._split_by_chrom(df, chroms)
+
+        tables = self._get_chroms(self._kgXref_hg19_chroms, chroms, load)
+        df = self._concat_chroms(tables, chroms)
+
+        if df is not None:
+            del df["chrom"]
+
+        return df
+
+    @_synchronized
+    def get_assembly_mapping_data(self, source_assembly, target_assembly, chroms=None):
         """ Get assembly mapping data.
 
         Parameters
@@ -143,14 +285,32 @@ class Resources(object):
             assembly to remap from
         target_assembly : {'NCBI36', 'GRCh37', 'GRCh38'}
             assembly to remap to
+        chroms : list of str
+            chromosomes to get; if None, get all chromosomes
 
         Returns
         -------
         dict
             dict of json assembly mapping data if loading was successful, else None
+
+        Notes
+        -----
+        Chromosomes are loaded on demand and cached, so specifying `chroms` only decodes the
+        assembly maps of those chromosomes.
         """
-        return self._load_assembly_mapping_data(
-            self._get_path_assembly_mapping_data(source_assembly, target_assembly)
+        filename = self._get_path_assembly_mapping_data(source_assembly, target_assembly)
+
+        if filename is None:
+            return None
+
+        key = source_assembly + "_" + target_assembly
+        if key not in self._assembly_mapping_data:
+            self._assembly_mapping_data[key] = _ChromosomeCache()
+
+        return self._get_chroms(
+            self._assembly_mapping_data[key],
+            chroms,
+            lambda chroms: self._load_assembly_mapping_data(filename, chroms),
         )
 
     def download_example_datasets(self):
@@ -170,52 +330,24 @@ class Resources(object):
           for Personal Genomics," PLOS ONE, 9(3): e89204,
           https://doi.org/10.1371/journal.pone.0089204
         """
-        paths = []
-        paths.append(
-            self._download_file(
-                "https://opensnp.org/data/662.23andme.304",
-                "662.23andme.304.txt.gz",
-                compress=True,
-            )
-        )
-        paths.append(
-            self._download_file(
-                "https://opensnp.org/data/662.23andme.340",
-                "662.23andme.340.txt.gz",
-                compress=True,
-            )
-        )
-        paths.append(
-            self._download_file(
-                "https://opensnp.org/data/662.ftdna-illumina.341",
-                "662.ftdna-illumina.341.csv.gz",
-                compress=True,
-            )
-        )
-        paths.append(
-            self._download_file(
-                "https://opensnp.org/data/663.23andme.305",
-                "663.23andme.305.txt.gz",
-                compress=True,
-            )
-        )
+        paths = [
+            self._download_file(url, filename, compress=compress)
+            for url, filename, compress in _EXAMPLE_DATASETS
+        ]
+        self._decompress_concatenated_gzip(paths[-2:])
+        return paths
 
-        # these two files consist of concatenated gzip files and therefore need special handling
-        paths.append(
-            self._download_file(
-                "https://opensnp.org/data/4583.ftdna-illumina.3482",
-                "4583.ftdna-illumina.3482.csv.gz",
-            )
-        )
-        paths.append(
-            self._download_file(
-                "https://opensnp.org/data/4584.ftdna-illumina.3483",
-                "4584.ftdna-illumina.3483.csv.gz",
-            )
-        )
+    @staticmethod
+    def _decompress_concatenated_gzip(paths):
+        """ Recompress files that consist of concatenated gzip files as one gzip file.
 
+        Parameters
+        ----------
+        paths : list of str
+            paths to files
+        """
         try:
-            for gzip_path in paths[-2:]:
+            for gzip_path in paths:
                 # https://stackoverflow.com/q/4928560
                 # https://stackoverflow.com/a/37042747
                 with open(gzip_path, "rb") as f:
@@ -233,9 +365,7 @@ class Resources(object):
                 with gzip.open(gzip_path, "wb") as f:
                     f.write(data)
         except Exception as err:
-            print(err)
-
-        return paths
+            logger.error(err)
 
     def get_all_resources(self):
         """ Get / download all resources used throughout `lineage`.
@@ -245,27 +375,323 @@ class Resources(object):
         dict
             dict of resources
         """
-        resources = {}
-        resources[
-            "genetic_map_HapMapII_GRCh37"
-        ] = self.get_genetic_map_HapMapII_GRCh37()
-        resources["cytoBand_hg19"] = self.get_cytoBand_hg19()
-        resources["knownGene_hg19"] = self.get_knownGene_hg19()
-        resources["kgXref_hg19"] = self.get_kgXref_hg19()
+        getters = [
+            ("genetic_map_HapMapII_GRCh37", self.get_genetic_map_HapMapII_GRCh37),
+            ("cytoBand_hg19", self.get_cytoBand_hg19),
+            ("knownGene_hg19", self.get_knownGene_hg19),
+            ("kgXref_hg19", self.get_kgXref_hg19),
+        ]
         for source, target in itertools.permutations(["NCBI36", "GRCh37", "GRCh38"], 2):
-            resources[source + "_" + target] = self.get_assembly_mapping_data(
-                source, target
+            getters.append(
+                (
+                    source + "_" + target,
+                    functools.partial(self.get_assembly_mapping_data, source, target),
+                )
             )
+
+        resources = {}
+        for i, (name, get) in enumerate(getters, 1):
+            resources[name] = get()
+            progress.report("resources.get_all_resources", i, len(getters), name)
         return resources
 
+    def get_memory_usage(self):
+        """ Get the memory used by the resources loaded by this ``Resources`` object.
+
+        Returns
+        -------
+        pandas.Series
+            memory usage in bytes of each resource (e.g., 'genetic_map_HapMapII_GRCh37',
+            'assembly_mapping_data_NCBI36_GRCh37'); resources that haven't been loaded use 0
+            bytes
+
+        Notes
+        -----
+        Memory can be freed with :meth:`clear_cache`.
+        """
+        def get_size(*objs):
+            # count objects referenced by more than one table (e.g., strings) once
+            seen = set()
+            return sum(memory.get_size(obj, seen) for obj in objs)
+
+        usage = pd.Series(
+            [
+                get_size(*self._genetic_map_HapMapII_GRCh37.data.values()),
+                get_size(self._cytoBand_hg19),
+                get_size(self._knownGene_hg19, *self._knownGene_hg19_chroms.data.values()),
+                get_size(self._kgXref_hg19, *self._kgXref_hg19_chroms.data.values()),
+            ],
+            index=[
+                "genetic_map_HapMapII_GRCh37",
+                "cytoBand_hg19",
+                "knownGene_hg19",
+                "kgXref_hg19",
+            ],
+        )
+
+        for key in sorted(self._assembly_mapping_data.keys()):
+            usage["assembly_mapping_data_" + key] = get_size(
+                *self._assembly_mapping_data[key].data.values()
+            )
+
+        return usage.astype("int64")
+
+    @_synchronized
+    def clear_cache(self, resources=None):
+        """ Clear loaded resources, to free memory.
+
+        Cleared resources are loaded again (from the resources directory) when needed.
+
+        Parameters
+        ----------
+        resources : list of str
+            resources to clear (see :meth:`get_memory_usage`), where 'assembly_mapping_data'
+            clears the assembly mapping data of all assemblies; if None, clear all resources
+        """
+
+        def clear(name):
+            return resources is None or name in resources
+
+        if clear("genetic_map_HapMapII_GRCh37"):
+            self._genetic_map_HapMapII_GRCh37 = _ChromosomeCache()
+
+        if clear("cytoBand_hg19"):
+            self._cytoBand_hg19 = None
+
+        if clear("knownGene_hg19"):
+            self._knownGene_hg19 = None
+            self._knownGene_hg19_chroms = _ChromosomeCache()
+
+        if clear("kgXref_hg19"):
+            self._kgXref_hg19 = None
+            self._kgXref_hg19_chroms = _ChromosomeCache()
+
+        for key in list(self._assembly_mapping_data.keys()):
+            if clear("assembly_mapping_data") or clear("assembly_mapping_data_" + key):
+                del self._assembly_mapping_data[key]
+
+    def _get_chroms(self, cache, chroms, load):
+        """ Get per-chromosome data from a cache, loading uncached chromosomes on demand.
+
+        Parameters
+        ----------
+        cache : _ChromosomeCache
+            cache of per-chromosome data
+        chroms : list of str
+            chromosomes to get; if None, get all chromosomes
+        load : function
+            loads a dict of per-chromosome data given a list of chromosomes (None for all
+            chromosomes); returns None if loading was not successful
+
+        Returns
+        -------
+        dict
+            dict of per-chromosome data if loading was successful, else None
+        """
+        if chroms is None:
+            if not cache.complete:
+                data = load(None)
+                if data is None:
+                    return None
+                cache.data.update(data)
+                cache.complete = True
+
+            return dict(cache.data)
+
+        chroms = [str(chrom) for chrom in chroms]
+
+        if not cache.complete:
+            uncached = [
+                chrom
+                for chrom in chroms
+                if chrom not in cache.data and chrom not in cache.missing
+            ]
+
+            if len(uncached) > 0:
+                data = load(uncached)
+                if data is None:
+                    return None
+                cache.data.update(data)
+                cache.missing.update(set(uncached) - set(data.keys()))
+
+        return {chrom: cache.data[chrom] for chrom in chroms if chrom in cache.data}
+
     @staticmethod
-    def _load_genetic_map(filename):
+    def _split_by_chrom(df, chroms):
+        """ Split a table with a `chrom` column into a dict of per-chromosome tables.
+
+        Parameters
+        ----------
+        df : pandas.DataFrame
+            table to split
+        chroms : list of str
+            chromosomes to split out; chromosomes without rows map to an empty table
+
+        Returns
+        -------
+        dict
+            dict of pandas.DataFrame, else None if `df` is None
+        """
+        if df is None:
+            return None
+
+        return {chrom: df.loc[df["chrom"] == chrom] for chrom in chroms}
+
+    @staticmethod
+    def _concat_chroms(tables, chroms):
+        """ Concatenate per-chromosome tables in the order of `chroms`. """
+        if tables is None:
+            return None
+
+        frames = [tables[chrom] for chrom in chroms if chrom in tables]
+
+        if len(frames) == 0:
+            return pd.DataFrame()
+
+        return pd.concat(frames)
+
+    @classmethod
+    def _read_chrom_lines(cls, filename, chroms, make_get_chrom):
+        """ Read the lines of chromosomes of a gzip compressed text file.
+
+        The first time, the file is split into a file per chromosome (see :meth:`_split_lines`),
+        so only the lines of the requested chromosomes are decompressed.
+
+        Parameters
+        ----------
+        filename : str
+            path to gzip compressed text file
+        chroms : list of str
+            chromosomes of lines to read
+        make_get_chrom : function
+            see :meth:`_split_lines`
+
+        Returns
+        -------
+        io.StringIO
+            buffer with the lines of `chroms` if reading was successful, else None
+        """
+        try:
+            split_dir = cls._split_lines(filename, make_get_chrom)
+
+            buffer = io.StringIO()
+
+            for chrom in chroms:
+                path = os.path.join(split_dir, chrom + ".txt.gz")
+                if os.path.exists(path):
+                    with gzip.open(path, "rt") as f:
+                        shutil.copyfileobj(f, buffer)
+
+            buffer.seek(0)
+            return buffer
+        except Exception as err:
+            logger.error(err)
+            return None
+
+    @staticmethod
+    @instrumentation.instrumented("resources.split_lines")
+    def _split_lines(filename, make_get_chrom):
+        """ Split the lines of a gzip compressed text file into a file per chromosome.
+
+        The files are saved in the directory `<filename>.chroms`, with the size and modification
+        time of the file; the file is split again only if it changes.
+
+        Parameters
+        ----------
+        filename : str
+            path to gzip compressed text file
+        make_get_chrom : function
+            returns a function that gets the chromosome of the list of tab-separated fields of a
+            line (or None to skip the line); only called if the file is split
+
+        Returns
+        -------
+        str
+            path to directory of gzip compressed files of the lines of each chromosome (e.g.,
+            `7.txt.gz`)
+        """
+        split_dir = filename + ".chroms"
+        stat = os.stat(filename)
+        source = "{} {}\n".format(stat.st_size, stat.st_mtime_ns)
+        source_path = os.path.join(split_dir, "source.txt")
+
+        if os.path.exists(source_path):
+            with open(source_path) as f:
+                if f.read() == source:
+                    return split_dir
+
+        # split into a temporary directory first, so readers never see a partial split
+        tmp_dir = tempfile.mkdtemp(dir=os.path.dirname(filename))
+
+        try:
+            get_chrom = make_get_chrom()
+            files = {}
+
+            try:
+                with gzip.open(filename, "rt") as f:
+                    for line in f:
+                        chrom = get_chrom(line.split("\t", 2))
+
+                        if chrom is None:
+                            continue
+
+                        if chrom not in files:
+                            files[chrom] = gzip.open(
+                                os.path.join(tmp_dir, chrom + ".txt.gz"), "wt"
+                            )
+
+                        files[chrom].write(line)
+            finally:
+                for f in files.values():
+                    f.close()
+
+            with open(os.path.join(tmp_dir, "source.txt"), "w") as f:
+                f.write(source)
+
+            # remove a split of a previous version of the file
+            shutil.rmtree(split_dir, ignore_errors=True)
+
+            try:
+                os.rename(tmp_dir, split_dir)
+            except OSError:
+                # split by another process in the meantime
+                pass
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+        return split_dir
+
+    @staticmethod
+    def _get_knownGene_chrom():
+        """ Get a function that gets the chromosome of a line of the knownGene table. """
+        return lambda fields: fields[1][3:] if len(fields) > 1 else None
+
+    def _get_kgXref_chrom(self):
+        """ Get a function that gets the chromosome of a line of the kgXref table.
+
+        Genes of kgXref are mapped to chromosomes by their kgID, via the knownGene table.
+        """
+        chroms = {}
+
+        with gzip.open(self._get_path_knownGene_hg19(), "rt") as f:
+            for line in f:
+                fields = line.split("\t", 2)
+                if len(fields) > 1:
+                    chroms[fields[0]] = fields[1][3:]
+
+        return lambda fields: chroms.get(fields[0])
+
+    @staticmethod
+    @instrumentation.instrumented("resources.load_genetic_map")
+    def _load_genetic_map(filename, chroms=None):
         """ Load genetic map (e.g. HapMapII).
 
         Parameters
         ----------
         filename : str
             path to compressed archive with genetic map data
+        chroms : list of str
+            chromosomes to load; if None, load all chromosomes
 
         Returns
         -------
@@ -279,10 +705,23 @@ class Resources(object):
         try:
             genetic_map = {}
 
+            if chroms is not None:
+                chroms = set(chroms)
+                if "X" in chroms:
+                    chroms.update(["X_par1", "X_par2"])
+
             with tarfile.open(filename, "r") as tar:
-                # http://stackoverflow.com/a/2018576
-                for member in tar.getmembers():
+                # iterate over members rather than calling `getmembers`, which reads the whole
+                # archive, so that loading can stop once the requested chromosomes are found
+                for member in tar:
                     if "genetic_map" in member.name:
+                        start_pos = member.name.index("chr") + 3
+                        end_pos = member.name.index(".")
+                        chrom = member.name[start_pos:end_pos]
+
+                        if chroms is not None and chrom not in chroms:
+                            continue
+
                         df = pd.read_csv(tar.extractfile(member), sep="\t")
                         df = df.rename(
                             columns={
@@ -292,30 +731,36 @@ class Resources(object):
                             }
                         )
                         del df["Chromosome"]
-                        start_pos = member.name.index("chr") + 3
-                        end_pos = member.name.index(".")
-                        genetic_map[member.name[start_pos:end_pos]] = df
+                        genetic_map[chrom] = df
+                        instrumentation.count(len(df), member.size)
+
+                        if chroms is not None and chroms.issubset(genetic_map.keys()):
+                            break
 
             # X chrom consists of X PAR regions and X non-PAR region
-            genetic_map["X"] = pd.concat(
-                [genetic_map["X_par1"], genetic_map["X"], genetic_map["X_par2"]]
-            )
-            del genetic_map["X_par1"]
-            del genetic_map["X_par2"]
+            if "X" in genetic_map:
+                genetic_map["X"] = pd.concat(
+                    [genetic_map["X_par1"], genetic_map["X"], genetic_map["X_par2"]]
+                )
+                del genetic_map["X_par1"]
+                del genetic_map["X_par2"]
 
             return genetic_map
         except Exception as err:
-            print(err)
+            logger.error(err)
             return None
 
     @staticmethod
-    def _load_assembly_mapping_data(filename):
+    @instrumentation.instrumented("resources.load_assembly_mapping_data")
+    def _load_assembly_mapping_data(filename, chroms=None):
         """ Load assembly mapping data.
 
         Parameters
         ----------
         filename : str
             path to compressed archive with assembly mapping data
+        chroms : list of str
+            chromosomes to load; if None, load all chromosomes
 
         Returns
         -------
@@ -329,23 +774,37 @@ class Resources(object):
         try:
             assembly_mapping_data = {}
 
+            if chroms is not None:
+                chroms = set(chroms)
+
             with tarfile.open(filename, "r") as tar:
-                # http://stackoverflow.com/a/2018576
-                for member in tar.getmembers():
+                for member in tar:
                     if ".json" in member.name:
+                        chrom = member.name.split(".")[0]
+
+                        if chroms is not None and chrom not in chroms:
+                            continue
+
                         with tar.extractfile(member) as tar_file:
                             tar_bytes = tar_file.read()
+                        instrumentation.count(nbytes=len(tar_bytes))
                         # https://stackoverflow.com/a/42683509/4727627
-                        assembly_mapping_data[member.name.split(".")[0]] = json.loads(
+                        assembly_mapping_data[chrom] = json.loads(
                             tar_bytes.decode("utf-8")
                         )
 
+                        if chroms is not None and chroms.issubset(
+                            assembly_mapping_data.keys()
+                        ):
+                            break
+
             return assembly_mapping_data
         except Exception as err:
-            print(err)
+            logger.error(err)
             return None
 
     @staticmethod
+    @instrumentation.instrumented("resources.load_cytoBand")
     def _load_cytoBand(filename):
         """ Load UCSC cytoBand table.
 
@@ -370,19 +829,21 @@ class Resources(object):
                 filename, names=["chrom", "start", "end", "name", "gie_stain"]
             )
             df["chrom"] = df["chrom"].str[3:]
+            instrumentation.count(len(df))
             return df
         except Exception as err:
-            print(err)
+            logger.error(err)
             return None
 
     @staticmethod
+    @instrumentation.instrumented("resources.load_knownGene")
     def _load_knownGene(filename):
         """ Load UCSC knownGene table.
 
         Parameters
         ----------
-        filename : str
-            path to knownGene file
+        filename : str or io.StringIO
+            path to knownGene file, or buffer with lines of knownGene file
 
         Returns
         -------
@@ -409,19 +870,21 @@ class Resources(object):
                 index_col=0,
             )
             df["chrom"] = df["chrom"].str[3:]
+            instrumentation.count(len(df))
             return df
         except Exception as err:
-            print(err)
+            logger.error(err)
             return None
 
     @staticmethod
+    @instrumentation.instrumented("resources.load_kgXref")
     def _load_kgXref(filename):
         """ Load UCSC kgXref table.
 
         Parameters
         ----------
-        filename : str
-            path to kgXref file
+        filename : str or io.StringIO
+            path to kgXref file, or buffer with lines of kgXref file
 
         Returns
         -------
@@ -446,9 +909,10 @@ class Resources(object):
                 index_col=0,
                 dtype=object,
             )
+            instrumentation.count(len(df))
             return df
         except Exception as err:
-            print(err)
+            logger.error(err)
             return None
 
     def _get_path_cytoBand_hg19(self):
@@ -545,57 +1009,18 @@ class Resources(object):
         if not lineage.create_dir(self._resources_dir):
             return None
 
-        chroms = [
-            "1",
-            "2",
-            "3",
-            "4",
-            "5",
-            "6",
-            "7",
-            "8",
-            "9",
-            "10",
-            "11",
-            "12",
-            "13",
-            "14",
-            "15",
-            "16",
-            "17",
-            "18",
-            "19",
-            "20",
-            "21",
-            "22",
-            "X",
-            "Y",
-            "MT",
-        ]
-
-        assembly_mapping_data = source_assembly + "_" + target_assembly
-        destination = os.path.join(
-            self._resources_dir, assembly_mapping_data + ".tar.gz"
+        destination = self._get_destination_assembly_mapping_data(
+            source_assembly, target_assembly
         )
 
-        if not os.path.exists(destination) or not self._all_chroms_in_tar(
-            chroms, destination
-        ):
-            print("Downloading {}".format(os.path.relpath(destination)))
+        if not self._has_assembly_mapping_data(destination):
+            logger.info("Downloading %s", os.path.relpath(destination))
 
             try:
                 with tarfile.open(destination, "w:gz") as out_tar:
-                    for chrom in chroms:
-                        file = chrom + ".json"
-
-                        map_endpoint = (
-                            "/map/human/"
-                            + source_assembly
-                            + "/"
-                            + chrom
-                            + "/"
-                            + target_assembly
-                            + "?"
+                    for i, chrom in enumerate(_ASSEMBLY_MAPPING_CHROMS, 1):
+                        map_endpoint = self._get_assembly_map_endpoint(
+                            source_assembly, target_assembly, chrom
                         )
 
                         # get assembly mapping data
@@ -608,23 +1033,54 @@ class Resources(object):
                             retry += 1
 
                         if response is not None:
-                            # open temp file, save json response to file, close temp file
-                            with tempfile.NamedTemporaryFile(
-                                delete=False, mode="w"
-                            ) as f:
-                                json.dump(response, f)
-
-                            # add temp file to archive
-                            out_tar.add(f.name, arcname=file)
+                            self._add_json_to_tar(out_tar, chrom + ".json", response)
 
-                            # remove temp file
-                            os.remove(f.name)
+                        progress.report(
+                            "resources.download_assembly_mapping_data",
+                            i,
+                            len(_ASSEMBLY_MAPPING_CHROMS),
+                            chrom,
+                        )
             except Exception as err:
-                print(err)
+                logger.error(err)
                 return None
 
+        self._verified_assembly_mapping_paths.add(destination)
+
         return destination
 
+    def _get_destination_assembly_mapping_data(self, source_assembly, target_assembly):
+        return os.path.join(
+            self._resources_dir, source_assembly + "_" + target_assembly + ".tar.gz"
+        )
+
+    def _has_assembly_mapping_data(self, destination):
+        """ Check if the assembly mapping data at `destination` has been downloaded. """
+        if destination in self._verified_assembly_mapping_paths and os.path.exists(
+            destination
+        ):
+            return True
+
+        return os.path.exists(destination) and self._all_chroms_in_tar(
+            _ASSEMBLY_MAPPING_CHROMS, destination
+        )
+
+    @staticmethod
+    def _get_assembly_map_endpoint(source_assembly, target_assembly, chrom):
+        return "/map/human/" + source_assembly + "/" + chrom + "/" + target_assembly + "?"
+
+    @staticmethod
+    def _add_json_to_tar(tar, arcname, data):
+        # open temp file, save json response to file, close temp file
+        with tempfile.NamedTemporaryFile(delete=False, mode="w") as f:
+            json.dump(data, f)
+
+        # add temp file to archive
+        tar.add(f.name, arcname=arcname)
+
+        # remove temp file
+        os.remove(f.name)
+
     def _all_chroms_in_tar(self, chroms, filename):
         try:
             with tarfile.open(filename, "r") as tar:
@@ -634,7 +1090,7 @@ class Resources(object):
                 if chrom + ".json" not in members:
                     return False
         except Exception as err:
-            print(err)
+            logger.error(err)
             return False
 
         return True
@@ -675,16 +1131,24 @@ class Resources(object):
                 else:
                     open_func = open
 
+                # download to a temporary file first, so that a partial download isn't mistaken
+                # for a downloaded file (e.g., by other threads)
+                tmp = "{}.{}.{}.tmp".format(destination, os.getpid(), threading.get_ident())
+
                 # get file if it hasn't already been downloaded
                 # http://stackoverflow.com/a/7244263
                 with urllib.request.urlopen(
                     url, timeout=timeout
-                ) as response, open_func(destination, "wb") as f:
+                ) as response, open_func(tmp, "wb") as f:
                     self._print_download_msg(destination)
-                    data = response.read()  # a `bytes` object
-                    f.write(data)
+                    with instrumentation.stage("resources.download"):
+                        data = response.read()  # a `bytes` object
+                        f.write(data)
+                        instrumentation.count(nbytes=len(data))
+
+                os.replace(tmp, destination)
             except urllib.error.URLError as err:
-                print(err)
+                logger.error(err)
                 destination = None
                 # try HTTP if an FTP error occurred
                 if "ftp://" in url:
@@ -695,18 +1159,29 @@ class Resources(object):
                         timeout=timeout,
                     )
             except Exception as err:
-                print(err)
+                logger.error(err)
                 return None
 
         return destination
 
     @staticmethod
     def _print_download_msg(path):
-        """ Print download message.
+        """ Log download message.
 
         Parameters
         ----------
         path : str
             path to file being downloaded
         """
-        print("Downloading " + os.path.relpath(path))
+        logger.info("Downloading %s", os.path.relpath(path))
+
+
+class _ChromosomeCache(object):
+    """ Cache of per-chromosome resource data. """
+
+    def __init__(self):
+        self.data = {}
+        # chromosomes requested but not available in the resource
+        self.missing = set()
+        # all chromosomes of the resource have been loaded
+        self.complete = False
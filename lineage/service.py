@@ -0,0 +1,595 @@
+""" Resident service that keeps resources and individuals in memory to answer requests quickly.
+
+A ``MatchService`` loads individuals once and keeps them in memory, remapped to Build 37 and
+with the values used by comparisons (e.g., encoded genotypes) precomputed, so comparisons of
+loaded individuals don't reparse raw data or reload resources. Requests run on a pool of
+workers; when the pool and its queue are full, requests are rejected (see :class:`ServiceBusy`)
+rather than queued without bound.
+
+The service can be used from Python, or over HTTP (on a TCP port or a Unix socket) with
+:func:`serve`, or from the command line::
+
+    $ lineage serve --port 8000 --workers 4
+
+The HTTP API accepts and returns JSON:
+
+==========================  ========================================================
+``GET /status``             status of the service (see :meth:`MatchService.get_status`)
+``GET /individuals``        summaries of the loaded individuals
+``POST /individuals``       load an individual: ``{"name": ..., "raw_data": ...}``
+``DELETE /individuals/X``   unload individual `X`
+``POST /compare``           compare individuals (see :meth:`MatchService.compare`)
+``POST /remap``             save remapped SNPs (see :meth:`MatchService.remap`)
+==========================  ========================================================
+
+Invalid requests get status 400, unknown individuals 404, and rejected requests 503.
+
+Raw data files are read from the filesystem of the service, so clients can load any file that
+the service can read unless the service has a data directory (see :class:`MatchService`); the
+SNPs saved by ``POST /remap`` are always saved in the output directory.
+
+"""
+
+"""
+Copyright (C) 2019 Andrew Riha
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+import json
+import logging
+import os
+import socketserver
+import threading
+import time
+import urllib.parse
+
+import numpy as np
+
+import lineage
+from lineage.individual import Individual
+
+logger = logging.getLogger(__name__)
+
+
+class ServiceBusy(Exception):
+    """ Raised when a request is rejected because the workers and queue are full. """
+
+
+class MatchService(object):
+    """ Service that keeps resources and individuals in memory and runs requests on workers. """
+
+    def __init__(
+        self, l=None, workers=4, max_queue=16, save_output=False, data_dir=None
+    ):
+        """ Initialize a ``MatchService``.
+
+        Parameters
+        ----------
+        l : Lineage
+            ``Lineage`` object used for all requests; if None, a ``Lineage`` object with default
+            arguments is used
+        workers : int
+            count of worker threads
+        max_queue : int
+            maximum count of requests waiting for a worker; further requests are rejected
+        save_output : bool
+            specifies whether comparisons save output files (e.g., plots) to the output
+            directory of `l`
+        data_dir : str
+            if specified, raw data files are loaded from this directory: paths are relative to
+            it, and paths outside of it are rejected; otherwise, any path is loaded
+        """
+        self._lineage = l if l is not None else lineage.Lineage()
+        self._workers = max(1, workers)
+        self._max_queue = max(0, max_queue)
+        self._save_output = save_output
+        self._data_dir = None if data_dir is None else os.path.realpath(data_dir)
+        self._executor = ThreadPoolExecutor(max_workers=self._workers)
+        self._slots = threading.BoundedSemaphore(self._workers + self._max_queue)
+        self._individuals = {}
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._completed = 0
+        self._rejected = 0
+
+    def load(self, name, raw_data):
+        """ Load an individual, replacing a loaded individual with the same name.
+
+        Parameters
+        ----------
+        name : str
+            name of the individual
+        raw_data : list or str
+            path(s) to file(s) with raw genotype data, on the filesystem of the service (and
+            relative to the data directory, if specified)
+
+        Returns
+        -------
+        dict
+            summary of the individual (see :meth:`Individual.get_summary`)
+
+        Raises
+        ------
+        ServiceBusy
+            if the request is rejected
+        ValueError
+            if no SNPs are loaded, or a path is outside of the data directory
+        """
+        if self._data_dir is not None:
+            if isinstance(raw_data, list):
+                raw_data = [self._get_data_path(path) for path in raw_data]
+            else:
+                raw_data = self._get_data_path(raw_data)
+
+        return self._run(self._load, name, raw_data)
+
+    def unload(self, name):
+        """ Unload an individual.
+
+        Parameters
+        ----------
+        name : str
+            name of the individual
+
+        Raises
+        ------
+        KeyError
+            if the individual isn't loaded
+        """
+        with self._lock:
+            del self._individuals[name]
+
+    def get_individuals(self):
+        """ Get the summaries of the loaded individuals.
+
+        Returns
+        -------
+        dict
+            summary of each loaded individual, by name
+        """
+        with self._lock:
+            individuals = dict(self._individuals)
+
+        return {name: ind.get_summary() for name, ind in individuals.items()}
+
+    def get_individual(self, name):
+        """ Get a loaded individual.
+
+        Parameters
+        ----------
+        name : str
+            name of the individual
+
+        Returns
+        -------
+        Individual
+            loaded individual; it should be treated as read-only
+
+        Raises
+        ------
+        KeyError
+            if the individual isn't loaded
+        """
+        with self._lock:
+            return self._individuals[name]
+
+    def compare(
+        self,
+        individuals,
+        type="shared_dna",
+        cM_threshold=0.75,
+        snp_threshold=1100,
+        shared_genes=False,
+    ):
+        """ Compare loaded individuals.
+
+        Parameters
+        ----------
+        individuals : list of str
+            names of two individuals to compare, or three for discordant SNPs (see
+            :meth:`Lineage.find_discordant_snps`)
+        type : {'shared_dna', 'discordant_snps'}
+            type of comparison
+        cM_threshold : float
+            minimum centiMorgans for each shared DNA segment
+        snp_threshold : int
+            minimum SNPs for each shared DNA segment
+        shared_genes : bool
+            determine shared genes
+
+        Returns
+        -------
+        dict
+            for shared DNA, the segments shared on one and two chromosomes (and the shared
+            genes, if requested) as lists of records; for discordant SNPs, the rsids of the
+            discordant SNPs
+
+        Raises
+        ------
+        ServiceBusy
+            if the request is rejected
+        KeyError
+            if an individual isn't loaded
+        ValueError
+            if the comparison is invalid
+        """
+        if type == "shared_dna":
+            counts = (2,)
+        elif type == "discordant_snps":
+            counts = (2, 3)
+        else:
+            raise ValueError("invalid comparison type " + str(type))
+
+        if not isinstance(individuals, list) or len(individuals) not in counts:
+            raise ValueError("invalid count of individuals")
+
+        inds = [self.get_individual(name) for name in individuals]
+
+        if type == "shared_dna":
+            return self._run(
+                self._find_shared_dna,
+                inds,
+                float(cM_threshold),
+                int(snp_threshold),
+                bool(shared_genes),
+            )
+        else:
+            return self._run(self._find_discordant_snps, inds)
+
+    def remap(self, name, build, filename=None):
+        """ Save the SNPs of a loaded individual, remapped to another build.
+
+        The loaded individual isn't changed.
+
+        Parameters
+        ----------
+        name : str
+            name of the individual
+        build : {36, 37, 38}
+            build to remap to
+        filename : str
+            filename of the saved SNPs, in the output directory (i.e., without directories); if
+            None, use the default filename (see :meth:`Individual.save_snps`)
+
+        Returns
+        -------
+        dict
+            path to the saved SNPs, and the chromosomes remapped and not remapped
+
+        Raises
+        ------
+        ServiceBusy
+            if the request is rejected
+        KeyError
+            if the individual isn't loaded
+        ValueError
+            if the build or filename is invalid
+        """
+        if build not in (36, 37, 38):
+            raise ValueError("invalid build " + str(build))
+
+        if filename is not None and (
+            not isinstance(filename, str)
+            or os.path.basename(filename) != filename
+            or filename in ("", ".", "..")
+        ):
+            raise ValueError("invalid filename " + repr(filename))
+
+        return self._run(self._remap, self.get_individual(name), build, filename)
+
+    def get_status(self):
+        """ Get the status of this service.
+
+        Returns
+        -------
+        dict
+            count of workers, maximum queue, and count of requests pending (running or
+            queued), completed, and rejected; and count of loaded individuals
+        """
+        with self._lock:
+            return {
+                "workers": self._workers,
+                "max_queue": self._max_queue,
+                "pending": self._pending,
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "individuals": len(self._individuals),
+            }
+
+    def shutdown(self, wait=True):
+        """ Shut down the workers of this service.
+
+        Parameters
+        ----------
+        wait : bool
+            wait for pending requests to complete
+        """
+        self._executor.shutdown(wait=wait)
+
+    def _run(self, func, *args):
+        """ Run a request on a worker, waiting for the result.
+
+        Raises
+        ------
+        ServiceBusy
+            if the workers and queue are full
+        """
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._rejected += 1
+            raise ServiceBusy("service busy; retry later")
+
+        with self._lock:
+            self._pending += 1
+
+        def done(future):
+            with self._lock:
+                self._pending -= 1
+                self._completed += 1
+            self._slots.release()
+
+        try:
+            future = self._executor.submit(func, *args)
+        except Exception:
+            done(None)
+            raise
+
+        future.add_done_callback(done)
+        return future.result()
+
+    def _get_data_path(self, path):
+        if not isinstance(path, str):
+            raise ValueError("invalid path " + repr(path))
+
+        data_path = os.path.realpath(os.path.join(self._data_dir, path))
+
+        if os.path.commonpath([self._data_dir, data_path]) != self._data_dir:
+            raise ValueError("path outside of the data directory: " + path)
+
+        return data_path
+
+    def _load(self, name, raw_data):
+        l = self._lineage
+        ind = l.create_individual(name, raw_data)
+
+        if ind.snp_count == 0:
+            raise ValueError("no SNPs loaded for " + name)
+
+        l.remap_snps(ind, 37)
+
+        # precompute the values used by comparisons
+        ind.sex
+        ind.chromosome_fingerprints
+        ind._get_rsid_keys()
+        ind._get_genotype_codes()
+
+        with self._lock:
+            self._individuals[name] = ind
+
+        return ind.get_summary()
+
+    def _find_shared_dna(self, inds, cM_threshold, snp_threshold, shared_genes):
+        one_chrom_dna, two_chrom_dna, one_chrom_genes, two_chrom_genes = self._lineage.find_shared_dna(
+            inds[0],
+            inds[1],
+            cM_threshold=cM_threshold,
+            snp_threshold=snp_threshold,
+            shared_genes=shared_genes,
+            save_output=self._save_output,
+        )
+
+        result = {
+            "one_chrom_shared_dna": _to_records(one_chrom_dna),
+            "two_chrom_shared_dna": _to_records(two_chrom_dna),
+        }
+
+        if shared_genes:
+            result["one_chrom_shared_genes"] = _to_records(one_chrom_genes)
+            result["two_chrom_shared_genes"] = _to_records(two_chrom_genes)
+
+        return result
+
+    def _find_discordant_snps(self, inds):
+        df = self._lineage.find_discordant_snps(*inds, save_output=self._save_output)
+        return {"discordant_snps": list(df.index)}
+
+    def _remap(self, ind, build, filename):
+        # remap a copy of the SNPs, so comparisons of the loaded individual are unaffected
+        remapped = Individual(ind.name, output_dir=self._lineage._output_dir)
+        remapped._set_snps(ind.get_snps(), ind.build)
+
+        chromosomes_remapped, chromosomes_not_remapped = self._lineage.remap_snps(
+            remapped, build
+        )
+        path = remapped.save_snps(filename)
+
+        return {
+            "path": path,
+            "chromosomes_remapped": list(chromosomes_remapped),
+            "chromosomes_not_remapped": list(chromosomes_not_remapped),
+        }
+
+
+def serve(service, host="127.0.0.1", port=8000, socket_path=None):
+    """ Serve the HTTP API of a service until interrupted.
+
+    Parameters
+    ----------
+    service : MatchService
+        service to serve
+    host : str
+        host to listen on
+    port : int
+        TCP port to listen on
+    socket_path : str
+        if specified, listen on this Unix socket instead of a TCP port
+    """
+    server = create_server(service, host, port, socket_path)
+    logger.info("Serving on %s", socket_path or "{}:{}".format(*server.server_address))
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.shutdown()
+
+        if socket_path is not None and os.path.exists(socket_path):
+            os.remove(socket_path)
+
+
+def create_server(service, host="127.0.0.1", port=8000, socket_path=None):
+    """ Create an HTTP server for a service.
+
+    Each connection is handled on its own thread, which waits for the service's workers.
+
+    Parameters
+    ----------
+    service : MatchService
+        service to serve
+    host : str
+        host to listen on
+    port : int
+        TCP port to listen on; if 0, an unused port is chosen
+    socket_path : str
+        if specified, listen on this Unix socket instead of a TCP port
+
+    Returns
+    -------
+    socketserver.BaseServer
+        server; call ``serve_forever`` to serve requests
+    """
+    handler = type("Handler", (_RequestHandler,), {"service": service})
+
+    if socket_path is not None:
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+
+        return _UnixHTTPServer(socket_path, handler)
+
+    return _HTTPServer((host, port), handler)
+
+
+class _HTTPServer(socketserver.ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    service = None
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+    def do_DELETE(self):
+        self._handle("DELETE")
+
+    def address_string(self):
+        # clients of Unix sockets don't have an address
+        return self.client_address[0] if self.client_address else "unix"
+
+    def log_message(self, format, *args):
+        logger.debug("%s %s", self.address_string(), format % args)
+
+    def _handle(self, method):
+        start = time.perf_counter()
+        path = urllib.parse.urlparse(self.path).path.rstrip("/")
+
+        try:
+            status, body = 200, self._route(method, path)
+        except ServiceBusy as err:
+            status, body = 503, {"error": str(err)}
+        except KeyError as err:
+            status, body = 404, {"error": "not found: " + str(err)}
+        except (TypeError, ValueError) as err:
+            status, body = 400, {"error": str(err)}
+        except Exception as err:
+            logger.error(err)
+            status, body = 500, {"error": str(err)}
+
+        data = json.dumps(body, default=_to_json).encode("utf-8")
+
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header("X-Elapsed", "{:.6f}".format(time.perf_counter() - start))
+        if status == 503:
+            self.send_header("Retry-After", "1")
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _route(self, method, path):
+        service = self.service
+
+        if method == "GET" and path == "/status":
+            return service.get_status()
+        elif method == "GET" and path == "/individuals":
+            return service.get_individuals()
+        elif method == "POST" and path == "/individuals":
+            request = self._read_json("name", "raw_data")
+            return service.load(request["name"], request["raw_data"])
+        elif method == "DELETE" and path.startswith("/individuals/"):
+            service.unload(urllib.parse.unquote(path[len("/individuals/") :]))
+            return {}
+        elif method == "POST" and path == "/compare":
+            return service.compare(**self._read_json())
+        elif method == "POST" and path == "/remap":
+            request = self._read_json("individual", "build")
+            return service.remap(
+                request["individual"], request["build"], request.get("filename")
+            )
+
+        raise KeyError(path)
+
+    def _read_json(self, *required):
+        length = int(self.headers.get("Content-Length", 0))
+
+        try:
+            request = json.loads(self.rfile.read(length).decode("utf-8"))
+        except ValueError:
+            raise ValueError("invalid JSON")
+
+        if not isinstance(request, dict):
+            raise ValueError("request must be an object")
+
+        missing = [key for key in required if key not in request]
+        if missing:
+            raise ValueError("missing " + ", ".join(missing))
+
+        return request
+
+
+def _to_records(df):
+    if len(df) == 0:
+        return []
+
+    return json.loads(df.reset_index().to_json(orient="records"))
+
+
+def _to_json(obj):
+    if isinstance(obj, np.generic):
+        return obj.item()
+
+    raise TypeError("{} is not JSON serializable".format(type(obj).__name__))
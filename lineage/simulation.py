@@ -0,0 +1,772 @@
+""" Classes for simulating the genotypes of founders and their descendants.
+
+Simulated genotype data can be written as raw data files in the formats of DNA testing
+companies, so that `lineage` can be tested at scale with known ground truth (e.g., the segments
+of DNA shared by relatives).
+
+"""
+
+"""
+Copyright (C) 2019 Andrew Riha
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+import gzip
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+from lineage.cohort import compute_cMs
+
+logger = logging.getLogger(__name__)
+
+CHROMS = [str(chrom) for chrom in range(1, 23)] + ["X", "Y", "MT"]
+
+FORMATS = ["23andme", "ancestry", "ftdna", "ftdna_famfinder"]
+
+# regions of the default panel on chromosomes without a genetic map (Build 37)
+_Y_REGION = (2781480, 28800000)
+_MT_REGION = (1, 16569)
+
+# SNP used to detect the build of raw data files (see `lineage.snps.detect_build`), with its
+# positions in each build
+_BUILD_SNP = ("rs3094315", "1", {36: 742429, 37: 752566, 38: 817186})
+
+_ALLELES = np.array(list("ACGT"), dtype=object)
+_COMPLEMENTS = np.array([3, 2, 1, 0])  # A <-> T, C <-> G
+
+# genotype codes: diploid (0 ref / ref, 1 ref / alt, 2 alt / alt), haploid (3 ref, 4 alt), null
+_NULL_CODE = 5
+
+_HEADERS = {
+    "23andme": "# This data file generated by 23andMe\n"
+    "# simulated by lineage; build {build}\n"
+    "# rsid\tchromosome\tposition\tgenotype\n",
+    "ancestry": "#AncestryDNA raw data download\n"
+    "#simulated by lineage; build {build}\n"
+    "rsid\tchromosome\tposition\tallele1\tallele2\n",
+    "ftdna": "RSID,CHROMOSOME,POSITION,RESULT\n",
+    "ftdna_famfinder": "# famfinder, https://www.familytreedna.com\n"
+    "# simulated by lineage; build {build}\n"
+    "# name,chromosome,position,allele1,allele2\n",
+}
+
+
+class SimulatedIndividual(object):
+    """ Object used to represent a simulated individual.
+
+    Each of the individual's two haplotypes (maternal and paternal) is represented as a mosaic
+    of segments of founder haplotypes, so the ground truth of the DNA shared by relatives is
+    known exactly.
+    """
+
+    def __init__(self, name, sex, haplotypes):
+        """ Initialize a ``SimulatedIndividual``.
+
+        Parameters
+        ----------
+        name : str
+            name of the individual
+        sex : {'Male', 'Female'}
+            sex of the individual
+        haplotypes : list of tuple
+            maternal and paternal haplotypes; the start index (in the simulator's panel) and
+            founder haplotype of each segment of the haplotype (-1 if no chromosome, e.g.,
+            the Y chromosome of the maternal haplotype)
+        """
+        self._name = name
+        self._sex = sex
+        self._haplotypes = haplotypes
+
+    def __repr__(self):
+        return "SimulatedIndividual({!r}, {!r})".format(self._name, self._sex)
+
+    @property
+    def name(self):
+        """ Get this ``SimulatedIndividual``'s name.
+
+        Returns
+        -------
+        str
+        """
+        return self._name
+
+    @property
+    def sex(self):
+        """ Get this ``SimulatedIndividual``'s sex.
+
+        Returns
+        -------
+        str
+            'Male' or 'Female'
+        """
+        return self._sex
+
+
+class Simulator(object):
+    """ Object used to simulate founders, their descendants, and raw data files.
+
+    Founders' haplotypes are drawn independently from the allele frequencies of a panel of
+    biallelic SNPs. Each child inherits a maternal haplotype recombined from the mother's
+    haplotypes and a paternal haplotype recombined from the father's haplotypes; crossovers
+    occur as a Poisson process along the HapMap Phase II genetic map. The X chromosome
+    recombines only in mothers (the pseudoautosomal regions are not simulated separately), the
+    Y chromosome is inherited from the father, and MT is inherited from the mother.
+
+    """
+
+    def __init__(self, resources, snps=None, snp_count=700000, seed=None):
+        """ Initialize a ``Simulator``.
+
+        Parameters
+        ----------
+        resources : Resources
+            resources used to get the genetic map and assembly mapping data
+        snps : pandas.DataFrame
+            SNPs of the panel (e.g., the SNPs of an ``Individual``), with `chrom` and `pos`
+            (Build 37) columns and indexed by rsid; if None, a random panel is created
+        snp_count : int
+            number of SNPs of the random panel
+        seed : int
+            seed of the random number generator
+        """
+        self._resources = resources
+        self._rng = np.random.RandomState(seed)
+
+        genetic_map = resources.get_genetic_map_HapMapII_GRCh37(
+            [chrom for chrom in CHROMS if chrom not in ["Y", "MT"]]
+        )
+        if genetic_map is None:
+            genetic_map = {}
+
+        if snps is None:
+            snps = self._create_panel(genetic_map, snp_count)
+
+        chroms = []
+        for chrom in CHROMS:
+            if chrom not in ["Y", "MT"] and chrom not in genetic_map:
+                logger.warning("Genetic map not available for chromosome %s; skipping", chrom)
+            elif (snps["chrom"] == chrom).any():
+                chroms.append(chrom)
+
+        snps = snps.loc[snps["chrom"].isin(chroms)]
+        snps = snps.iloc[
+            np.lexsort(
+                (snps["pos"].values, snps["chrom"].map({c: i for i, c in enumerate(chroms)}))
+            )
+        ]
+
+        # object arrays of str, so that lines of files can be concatenated elementwise
+        self._rsids = snps.index.values.astype(str).astype(object)
+        self._chrom = snps["chrom"].values.astype(str).astype(object)
+        self._pos = snps["pos"].values.astype(np.int64)
+        self._chroms = chroms
+
+        n = len(snps)
+        starts = np.flatnonzero(np.r_[True, self._chrom[1:] != self._chrom[:-1]])
+        self._ranges = dict(zip(chroms, zip(starts, np.r_[starts[1:], n])))
+
+        self._cMs = np.full(n, np.nan)
+        for chrom in chroms:
+            if chrom in genetic_map:
+                start, end = self._ranges[chrom]
+                self._cMs[start:end] = compute_cMs(self._pos[start:end], genetic_map[chrom])
+
+        # two different alleles of each SNP, and the frequency of the second allele
+        ref = self._rng.randint(0, 4, n)
+        self._pairs = ref * 4 + (ref + self._rng.randint(1, 4, n)) % 4
+        self._freqs = self._rng.uniform(0.05, 0.5, n)
+
+        self._founder_alleles = []
+        self._builds = {}
+        self._rows = {}
+
+    @property
+    def snp_count(self):
+        """ Count of SNPs of the panel.
+
+        Returns
+        -------
+        int
+        """
+        return len(self._rsids)
+
+    @property
+    def chromosomes(self):
+        """ Chromosomes of the panel.
+
+        Returns
+        -------
+        list of str
+        """
+        return list(self._chroms)
+
+    def create_founder(self, name, sex=None):
+        """ Create a founder (i.e., an individual with unrelated parents).
+
+        Parameters
+        ----------
+        name : str
+            name of the founder
+        sex : {'Male', 'Female'}
+            sex of the founder; if None, chosen at random
+
+        Returns
+        -------
+        SimulatedIndividual
+        """
+        sex = self._get_sex(sex)
+        haplotypes = []
+
+        for origin in ["maternal", "paternal"]:
+            ids = []
+            index = len(self._founder_alleles)
+            alleles = self._rng.rand(self.snp_count) < self._freqs
+            self._founder_alleles.append(np.packbits(alleles))
+
+            for chrom in self._chroms:
+                if chrom == "X" and origin == "paternal" and sex == "Male":
+                    ids.append(-1)
+                elif chrom == "Y" and (origin == "maternal" or sex == "Female"):
+                    ids.append(-1)
+                elif chrom == "MT" and origin == "paternal":
+                    ids.append(-1)
+                else:
+                    ids.append(index)
+
+            haplotypes.append(self._merge_segments(self._get_chrom_starts(), np.array(ids)))
+
+        return SimulatedIndividual(name, sex, haplotypes)
+
+    def create_child(self, name, mother, father, sex=None):
+        """ Create a child of two individuals.
+
+        Parameters
+        ----------
+        name : str
+            name of the child
+        mother : SimulatedIndividual
+        father : SimulatedIndividual
+        sex : {'Male', 'Female'}
+            sex of the child; if None, chosen at random
+
+        Returns
+        -------
+        SimulatedIndividual
+        """
+        if mother.sex != "Female" or father.sex != "Male":
+            raise ValueError("mother must be female and father must be male")
+
+        sex = self._get_sex(sex)
+        haplotypes = [
+            self._create_gamete(mother, sex),
+            self._create_gamete(father, sex),
+        ]
+        return SimulatedIndividual(name, sex, haplotypes)
+
+    def create_pedigree(self, pedigree):
+        """ Create the individuals of a pedigree.
+
+        Parameters
+        ----------
+        pedigree : list of tuple
+            (name, mother, father, sex) of each individual, where `mother` and `father` are the
+            names of individuals earlier in the list, or None for founders; `sex` can be None
+            to choose it at random
+
+        Returns
+        -------
+        dict
+            map of name to ``SimulatedIndividual``
+        """
+        individuals = {}
+
+        for name, mother, father, sex in pedigree:
+            if mother is None and father is None:
+                individuals[name] = self.create_founder(name, sex)
+            else:
+                individuals[name] = self.create_child(
+                    name, individuals[mother], individuals[father], sex
+                )
+
+        return individuals
+
+    def get_shared_dna(self, individual1, individual2, cM_threshold=0.0):
+        """ Get the ground truth of the DNA shared by two simulated individuals.
+
+        DNA is shared where the individuals inherited the same founder haplotype, i.e., where
+        the DNA is identical by descent; segments are reported on the autosomes and the X
+        chromosome, with Build 37 positions.
+
+        Parameters
+        ----------
+        individual1 : SimulatedIndividual
+        individual2 : SimulatedIndividual
+        cM_threshold : float
+            minimum centiMorgans for each shared DNA segment
+
+        Returns
+        -------
+        one_chrom_shared_dna : pandas.DataFrame
+            segments of shared DNA on one chromosome
+        two_chrom_shared_dna : pandas.DataFrame
+            segments of shared DNA on two chromosomes
+        """
+        one_chrom_segments = []
+        two_chrom_segments = []
+
+        ids1 = [self._get_founder_ids(haplotype) for haplotype in individual1._haplotypes]
+        ids2 = [self._get_founder_ids(haplotype) for haplotype in individual2._haplotypes]
+
+        def shared(i, j):
+            return ((ids1[i] == ids2[j]) & (ids1[i] >= 0)).astype(np.int8)
+
+        # count of founder haplotypes shared at each SNP
+        ibd = np.maximum(shared(0, 0) + shared(1, 1), shared(0, 1) + shared(1, 0))
+
+        for chrom in self._chroms:
+            if chrom in ["Y", "MT"]:
+                continue
+
+            start, end = self._ranges[chrom]
+            for segments, match in [
+                (one_chrom_segments, ibd[start:end] >= 1),
+                (two_chrom_segments, ibd[start:end] == 2),
+            ]:
+                edges = np.diff(np.r_[0, match.astype(np.int8), 0])
+                for s, e in zip(np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)):
+                    cMs = self._cMs[start + e - 1] - self._cMs[start + s]
+                    if cMs >= cM_threshold:
+                        segments.append(
+                            {
+                                "chrom": chrom,
+                                "start": self._pos[start + s],
+                                "end": self._pos[start + e - 1],
+                                "cMs": cMs,
+                                "snps": e - s,
+                            }
+                        )
+
+        return (
+            self._create_shared_dna_df(one_chrom_segments),
+            self._create_shared_dna_df(two_chrom_segments),
+        )
+
+    def get_snps(
+        self, individual, build=37, no_call_rate=0.0, discordance_rate=0.0, seed=None
+    ):
+        """ Get the SNPs of a simulated individual.
+
+        Parameters
+        ----------
+        individual : SimulatedIndividual
+        build : {36, 37, 38}
+            build of SNP positions
+        no_call_rate : float
+            fraction of SNPs with null genotypes
+        discordance_rate : float
+            fraction of SNPs with genotyping errors (one allele is changed)
+        seed : int
+            seed of the random number generator used for no calls and genotyping errors; if
+            None, the simulator's random number generator is used
+
+        Returns
+        -------
+        pandas.DataFrame
+            SNPs, or None if the SNPs could not be remapped to `build`
+        """
+        rows, pairs = self._get_build(build)
+        if rows is None:
+            return None
+
+        codes = self._get_codes(individual, no_call_rate, discordance_rate, seed)[rows]
+        vocabulary = self._get_vocabulary("", False, np.nan)
+
+        df = pd.DataFrame(
+            {
+                "chrom": self._chrom[rows],
+                "pos": self._builds[build][2],
+                "genotype": vocabulary[pairs, codes],
+            },
+            index=pd.Index(self._rsids[rows], name="rsid"),
+            columns=["chrom", "pos", "genotype"],
+        )
+        return df
+
+    def write_snps(
+        self,
+        individual,
+        path,
+        data_format="23andme",
+        build=37,
+        no_call_rate=0.01,
+        discordance_rate=0.0,
+        seed=None,
+    ):
+        """ Write the SNPs of a simulated individual as a raw data file.
+
+        Parameters
+        ----------
+        individual : SimulatedIndividual
+        path : str
+            path of file; if the path ends with '.gz', the file is gzip-compressed
+        data_format : {'23andme', 'ancestry', 'ftdna', 'ftdna_famfinder'}
+            format of file
+        build : {36, 37, 38}
+            build of SNP positions
+        no_call_rate : float
+            fraction of SNPs with null genotypes
+        discordance_rate : float
+            fraction of SNPs with genotyping errors (one allele is changed)
+        seed : int
+            seed of the random number generator used for no calls and genotyping errors; if
+            None, the simulator's random number generator is used
+
+        Returns
+        -------
+        str
+            path to file, else empty str if the SNPs could not be remapped to `build`
+        """
+        if data_format not in FORMATS:
+            raise ValueError("unsupported data format: " + str(data_format))
+
+        rows, pairs = self._get_build(build)
+        if rows is None:
+            return ""
+
+        codes = self._get_codes(individual, no_call_rate, discordance_rate, seed)[rows]
+
+        # haploid genotypes are written as one allele by 23andMe, and as two alleles otherwise
+        if data_format == "23andme":
+            vocabulary = self._get_vocabulary("", False, "--")
+        elif data_format == "ancestry":
+            vocabulary = self._get_vocabulary("\t", True, "0\t0")
+        elif data_format == "ftdna":
+            vocabulary = self._get_vocabulary("", True, '"--"', quote='"')
+        else:
+            vocabulary = self._get_vocabulary(",", True, "-,-")
+
+        lines = self._get_rows(data_format, build) + vocabulary[pairs, codes]
+
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        if path.endswith(".gz"):
+            # fastest compression level, since compression dominates the time to write a file
+            f = gzip.open(path, "wt", compresslevel=1)
+        else:
+            f = open(path, "w")
+
+        with f:
+            f.write(_HEADERS[data_format].format(build=build))
+            f.write("\n".join(lines))
+            f.write("\n")
+
+        return path
+
+    def _create_panel(self, genetic_map, snp_count):
+        regions = {
+            chrom: (int(genetic_map[chrom]["pos"].min()), int(genetic_map[chrom]["pos"].max()))
+            for chrom in genetic_map
+        }
+        regions["Y"] = _Y_REGION
+        regions["MT"] = _MT_REGION
+
+        length = sum(end - start for chrom, (start, end) in regions.items() if chrom != "Y")
+        dfs = []
+
+        for chrom in CHROMS:
+            if chrom not in regions:
+                continue
+
+            start, end = regions[chrom]
+            if chrom == "Y":
+                count = snp_count // 300
+            elif chrom == "MT":
+                count = snp_count // 600
+            else:
+                count = int(snp_count * (end - start) / length)
+
+            count = min(count, end - start)
+            pos = np.unique(self._rng.randint(start, end, count))
+            dfs.append(pd.DataFrame({"chrom": chrom, "pos": pos}, columns=["chrom", "pos"]))
+
+        df = pd.concat(dfs, ignore_index=True)
+        df.index = pd.Index(
+            ["rs{}".format(900000000 + i) for i in range(len(df))], name="rsid"
+        )
+
+        # include a SNP used to detect the build, so that files of all builds are loaded with
+        # the correct build
+        rsid, chrom, positions = _BUILD_SNP
+        if chrom in regions and not (
+            (df["chrom"] == chrom) & (df["pos"] == positions[37])
+        ).any():
+            df.loc[rsid] = [chrom, positions[37]]
+
+        return df
+
+    def _get_sex(self, sex):
+        if sex is None:
+            return "Male" if self._rng.rand() < 0.5 else "Female"
+        if sex not in ["Male", "Female"]:
+            raise ValueError("sex must be 'Male' or 'Female'")
+        return sex
+
+    def _get_chrom_starts(self):
+        return np.array([self._ranges[chrom][0] for chrom in self._chroms])
+
+    @staticmethod
+    def _merge_segments(starts, ids):
+        keep = np.r_[True, ids[1:] != ids[:-1]]
+        return starts[keep], ids[keep]
+
+    @staticmethod
+    def _slice_haplotype(haplotype, start, end):
+        starts, ids = haplotype
+        i = np.searchsorted(starts, start, side="right") - 1
+        j = np.searchsorted(starts, end, side="left")
+        sliced = starts[i:j].copy()
+        sliced[0] = start
+        return sliced, ids[i:j]
+
+    def _create_gamete(self, parent, child_sex):
+        starts = []
+        ids = []
+
+        for chrom in self._chroms:
+            start, end = self._ranges[chrom]
+            maternal, paternal = parent._haplotypes
+
+            if chrom == "MT" or (chrom == "X" and parent.sex == "Male"):
+                # inherited without recombination from the parent's only copy
+                haplotypes = [maternal]
+                crossovers = []
+            elif chrom == "Y":
+                haplotypes = [paternal]
+                crossovers = []
+            else:
+                haplotypes = [maternal, paternal]
+                crossovers = self._get_crossovers(start, end)
+
+            no_chrom = (
+                (chrom == "X" and parent.sex == "Male" and child_sex == "Male")
+                or (chrom == "Y" and (parent.sex == "Female" or child_sex == "Female"))
+                or (chrom == "MT" and parent.sex == "Male")
+            )
+            if no_chrom:
+                starts.append(np.array([start]))
+                ids.append(np.array([-1]))
+                continue
+
+            h = self._rng.randint(len(haplotypes))
+            bounds = np.r_[start, crossovers, end]
+
+            for s, e in zip(bounds[:-1], bounds[1:]):
+                sliced_starts, sliced_ids = self._slice_haplotype(haplotypes[h], s, e)
+                starts.append(sliced_starts)
+                ids.append(sliced_ids)
+                h = 1 - h
+
+        return self._merge_segments(np.concatenate(starts), np.concatenate(ids))
+
+    def _get_crossovers(self, start, end):
+        cMs = self._cMs[start:end]
+        length = cMs[-1] - cMs[0]
+        count = self._rng.poisson(length / 100)
+        crossovers = np.searchsorted(cMs, self._rng.uniform(cMs[0], cMs[-1], count)) + start
+        return np.unique(crossovers[(crossovers > start) & (crossovers < end)])
+
+    def _get_founder_ids(self, haplotype):
+        starts, ids = haplotype
+        return np.repeat(ids, np.diff(np.r_[starts, self.snp_count]))
+
+    def _get_codes(self, individual, no_call_rate, discordance_rate, seed):
+        rng = self._rng if seed is None else np.random.RandomState(seed)
+        n = self.snp_count
+        alleles = []
+
+        for starts, ids in individual._haplotypes:
+            a = np.full(n, -1, dtype=np.int8)
+
+            for s, e, i in zip(starts, np.r_[starts[1:], n], ids):
+                if i >= 0:
+                    # unpack only the bytes of the segment
+                    bits = np.unpackbits(self._founder_alleles[i][s // 8 : (e + 7) // 8])
+                    a[s:e] = bits[s % 8 : s % 8 + e - s]
+
+            alleles.append(a)
+
+        a0, a1 = alleles
+
+        # genotyping errors change one allele
+        error = rng.rand(n) < discordance_rate
+        error0 = error & (a0 >= 0)
+        error1 = error & ~error0 & (a1 >= 0)
+        a0[error0] = 1 - a0[error0]
+        a1[error1] = 1 - a1[error1]
+
+        codes = np.full(n, _NULL_CODE, dtype=np.int8)
+        diploid = (a0 >= 0) & (a1 >= 0)
+        codes[diploid] = a0[diploid] + a1[diploid]
+        haploid = (a0 >= 0) != (a1 >= 0)
+        codes[haploid] = 3 + np.maximum(a0, a1)[haploid]
+        codes[rng.rand(n) < no_call_rate] = _NULL_CODE
+
+        return codes
+
+    @staticmethod
+    def _get_vocabulary(sep, double_haploid, null, quote=""):
+        """ Get the genotype string of each allele pair (rows) and genotype code (columns). """
+        vocabulary = np.empty((16, 6), dtype=object)
+
+        for pair in range(16):
+            ref, alt = _ALLELES[pair // 4], _ALLELES[pair % 4]
+            first, second = sorted([ref, alt])
+
+            genotypes = [ref + sep + ref, first + sep + second, alt + sep + alt]
+            for allele in [ref, alt]:
+                genotypes.append(allele + sep + allele if double_haploid else allele)
+
+            vocabulary[pair, :5] = [quote + genotype + quote for genotype in genotypes]
+            vocabulary[pair, 5] = null
+
+        return vocabulary
+
+    def _get_build(self, build):
+        if build not in self._builds:
+            self._builds[build] = self._remap(build)
+
+        rows, pairs, _ = self._builds[build]
+        return rows, pairs
+
+    def _remap(self, build):
+        """ Remap the panel's SNPs from Build 37 to `build`.
+
+        Returns
+        -------
+        rows : numpy.ndarray
+            indices of SNPs of the panel that were remapped (SNPs on chromosomes without
+            assembly mapping data are removed, like :meth:`lineage.Lineage.remap_snps`)
+        pairs : numpy.ndarray
+            allele pair of each SNP, complemented for SNPs mapped to the minus strand
+        pos : numpy.ndarray
+            remapped positions
+        """
+        rows = np.arange(self.snp_count)
+
+        if build == 37:
+            return rows, self._pairs, self._pos
+
+        if build not in [36, 38]:
+            raise ValueError("build must be 36, 37, or 38")
+
+        target_assembly = "NCBI36" if build == 36 else "GRCh38"
+        assembly_mapping_data = self._resources.get_assembly_mapping_data(
+            "GRCh37", target_assembly, self._chroms
+        )
+
+        if assembly_mapping_data is None:
+            logger.warning("Could not remap SNPs to build %s", build)
+            return None, None, None
+
+        pos = self._pos.copy()
+        minus = np.zeros(self.snp_count, dtype=bool)
+        keep = np.zeros(self.snp_count, dtype=bool)
+
+        for chrom in self._chroms:
+            if chrom not in assembly_mapping_data:
+                logger.warning(
+                    "Chromosome %s not remapped; removing chromosome from SNPs for "
+                    "consistency",
+                    chrom,
+                )
+                continue
+
+            start, end = self._ranges[chrom]
+            keep[start:end] = True
+            chrom_pos = self._pos[start:end]
+            remapped = np.zeros(end - start, dtype=bool)
+
+            for mapping in assembly_mapping_data[chrom]["mappings"]:
+                original = mapping["original"]
+                mapped = mapping["mapped"]
+
+                if (
+                    original["seq_region_name"] != mapped["seq_region_name"]
+                    or original["end"] - original["start"] != mapped["end"] - mapped["start"]
+                ):
+                    continue
+
+                i = np.searchsorted(chrom_pos, original["start"], side="left")
+                j = np.searchsorted(chrom_pos, original["end"], side="right")
+                indices = np.arange(i, j)[~remapped[i:j]]
+
+                if mapped["strand"] == -1:
+                    pos[start + indices] = mapped["end"] - (
+                        chrom_pos[indices] - original["start"]
+                    )
+                    minus[start + indices] = True
+                else:
+                    pos[start + indices] = chrom_pos[indices] + (
+                        mapped["start"] - original["start"]
+                    )
+
+                remapped[indices] = True
+
+        rsid, chrom, positions = _BUILD_SNP
+        pos[(self._rsids == rsid) & (self._chrom == chrom)] = positions[build]
+
+        pairs = self._pairs.copy()
+        pairs[minus] = (
+            _COMPLEMENTS[self._pairs[minus] // 4] * 4 + _COMPLEMENTS[self._pairs[minus] % 4]
+        )
+
+        rows = np.flatnonzero(keep)
+        return rows, pairs[rows], pos[rows]
+
+    def _get_rows(self, data_format, build):
+        """ Get the start of each line of a raw data file (i.e., up to the genotype). """
+        key = (data_format, build)
+
+        if key not in self._rows:
+            rows, _ = self._get_build(build)
+            pos = self._builds[build][2].astype(str).astype(object)
+            chrom = self._chrom[rows]
+
+            if data_format == "ancestry":
+                chrom = pd.Series(chrom).replace({"X": "23", "Y": "24", "MT": "26"}).values
+
+            if data_format == "ftdna":
+                fields = ['"' + f + '"' for f in [self._rsids[rows], chrom, pos]]
+                start = fields[0] + "," + fields[1] + "," + fields[2] + ","
+            else:
+                sep = "," if data_format == "ftdna_famfinder" else "\t"
+                start = self._rsids[rows] + sep + chrom + sep + pos + sep
+
+            self._rows[key] = start
+
+        return self._rows[key]
+
+    @staticmethod
+    def _create_shared_dna_df(segments):
+        df = pd.DataFrame(segments, columns=["chrom", "start", "end", "cMs", "snps"])
+        df.index.name = "segment"
+        df.index = df.index + 1
+        return df
@@ -20,19 +20,55 @@ along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 from itertools import groupby, count
 import gzip
+import hashlib
+import io
+import logging
 import os
 import re
+import weakref
 import zipfile
 
 import numpy as np
 import pandas as pd
 from pandas.api.types import CategoricalDtype
 
+from lineage import bgzf, instrumentation, memory
 from lineage.ensembl import EnsemblRestClient
 
+logger = logging.getLogger(__name__)
+
+# chromosomes in sort order; the `chrom` column of SNPs is an ordered categorical of these
+CHROMS = [str(chrom) for chrom in range(1, 23)] + ["X", "Y", "PAR", "MT"]
+CHROM_DTYPE = CategoricalDtype(categories=CHROMS, ordered=True)
+
+# rsids of the form "rs<number>" are keyed by their number; other SNP identifiers (e.g., 23andMe
+# "i" IDs) are keyed by negative numbers derived from a hash of the identifier
+_RS_ID_RE = re.compile(r"^rs[1-9][0-9]{0,17}$")
+_OTHER_ID_KEY_MASK = (1 << 62) - 1
+
+# chromosome codes used by AncestryDNA; https://redd.it/5y90un
+_ANCESTRY_CHROMS = {"23": "X", "24": "Y", "25": "PAR", "26": "MT"}
+
+# name of data source and field separator for each supported data format
+_SOURCES = {
+    "23andme": "23andMe",
+    "ancestry": "AncestryDNA",
+    "ftdna": "FTDNA",
+    "ftdna_famfinder": "FTDNA",
+    "generic": "generic",
+}
+_SEPARATORS = {
+    "23andme": "\t",
+    "ancestry": "\t",
+    "ftdna": ",",
+    "ftdna_famfinder": ",",
+    "lineage": ",",
+    "generic": ",",
+}
+
 
 class SNPs(object):
-    def __init__(self, file, assign_par_snps=True):
+    def __init__(self, file, assign_par_snps=True, chroms=None, region=None):
         """ Object used to read and parse genotype / raw data files.
 
         Parameters
@@ -41,8 +77,33 @@ class SNPs(object):
             path to file to load
         assign_par_snps : bool
             assign PAR SNPs to the X and Y chromosomes
+        chroms : list of str
+            only load SNPs on these chromosomes (e.g., ['X', 'Y'])
+        region : str
+            only load SNPs in this region (e.g., '7' or '7:10000000-20000000')
+
+        Notes
+        -----
+        When `chroms` or `region` is specified, rows of the file outside of the requested
+        chromosomes / region are discarded as the file is read, before parsing. Since the SNPs
+        used to detect the build may not be loaded, the build may not be detected.
+
+        The requested chromosomes / region apply to the SNPs after PAR SNPs are assigned (e.g.,
+        'X' includes PAR SNPs assigned to the X chromosome, and 'PAR' only includes PAR SNPs
+        that could not be assigned). If PAR SNPs are assigned and any of 'X', 'Y', or 'PAR' is
+        requested, PAR rows are kept as the file is read and filtered once assigned.
         """
-        self.snps, self.source = self._read_raw_data(file)
+        self._chroms = None if chroms is None else set(str(chrom) for chrom in chroms)
+        self._region = None if region is None else parse_region(region)
+        self._read_par = assign_par_snps and self._par_requested()
+        self._cache = SNPsCache()
+
+        with instrumentation.stage("snps.parse"):
+            self.snps, self.source = self._read_raw_data(file)
+
+            if self.snps is not None:
+                instrumentation.count(len(self.snps), os.path.getsize(file))
+
         self.build = None
         self.build_detected = False
 
@@ -56,6 +117,10 @@ class SNPs(object):
 
             if assign_par_snps:
                 self._assign_par_snps()
+                self._cache.clear()
+
+            if self._read_par:
+                self._filter_snps()
 
     @property
     def assembly(self):
@@ -75,7 +140,7 @@ class SNPs(object):
         -------
         int
         """
-        return get_snp_count(self.snps)
+        return self._cache.get(self.snps, "snp_count", get_snp_count)
 
     @property
     def chromosomes(self):
@@ -86,7 +151,7 @@ class SNPs(object):
         list
             list of str chromosomes (e.g., ['1', '2', '3', 'MT'], empty list if no chromosomes
         """
-        return get_chromosomes(self.snps)
+        return list(self._cache.get(self.snps, "chromosomes", get_chromosomes))
 
     @property
     def chromosomes_summary(self):
@@ -97,7 +162,7 @@ class SNPs(object):
         str
             human-readable listing of chromosomes (e.g., '1-3, MT'), empty str if no chromosomes
         """
-        return get_chromosomes_summary(self.snps)
+        return self._cache.get(self.snps, "chromosomes_summary", get_chromosomes_summary)
 
     @property
     def sex(self):
@@ -108,7 +173,7 @@ class SNPs(object):
         str
             'Male' or 'Female' if detected, else empty str
         """
-        return determine_sex(self.snps)
+        return self._cache.get(self.snps, "sex", determine_sex)
 
     def get_summary(self):
         """ Get summary of ``SNPs``.
@@ -146,54 +211,358 @@ class SNPs(object):
         else:
             return True
 
-    def _read_raw_data(self, file):
+    @classmethod
+    def probe(cls, file, sample_size=1000):
+        """ Probe a raw data file for its metadata without parsing the whole file.
+
+        Only the header and a sample of the first rows of the file are read. The SNP count is
+        exact for files generated by `lineage`, else it is estimated from the uncompressed size
+        of the file and the average length of the sampled rows.
+
+        Parameters
+        ----------
+        file : str
+            path to file to probe
+        sample_size : int
+            maximum number of rows to sample
+
+        Returns
+        -------
+        dict
+            metadata of the file, else None if the file is not a supported raw data file
+        """
         try:
             if not os.path.exists(file):
-                print(file + " does not exist; skipping")
-                return None, ""
+                return None
+
+            first_line, comments = cls._peek(file)
+            data_format = cls._detect_format(first_line)
+
+            if data_format is None:
+                return None
+
+            sep = _SEPARATORS[data_format]
+            header_size = 0
+            header_lines = 0
+            sample = []
+
+            lines = cls._read_lines(file)
+            for line in lines:
+                if len(sample) == 0 and cls._parse_row(line, sep) is None:
+                    header_size += len(line)
+                    header_lines += 1
+                    continue
+
+                sample.append(line)
+                if len(sample) >= sample_size:
+                    break
+            lines.close()
+
+            if data_format == "lineage":
+                source = cls._get_comment_value(comments, "Source(s):")
+            else:
+                source = _SOURCES[data_format]
+
+            snp_count = cls._get_comment_value(comments, "SNPs:")
+            if snp_count.isdigit():
+                snp_count = int(snp_count)
+            elif len(sample) < sample_size:
+                # the whole file was sampled
+                snp_count = len(sample)
+            else:
+                data_size = cls._get_uncompressed_size(file) - header_size
+                snp_count = int(round(data_size / (sum(map(len, sample)) / len(sample))))
+
+            build = detect_declared_build(comments)
 
-            # peek into files to determine the data format
             if ".zip" in file:
-                with zipfile.ZipFile(file) as z:
-                    with z.open(z.namelist()[0], "r") as f:
-                        first_line, comments = self._extract_comments(f, True)
+                compression = "zip"
             elif ".gz" in file:
-                with gzip.open(file, "rt") as f:
-                    first_line, comments = self._extract_comments(f, False)
-            else:
-                with open(file, "r") as f:
-                    first_line, comments = self._extract_comments(f, False)
-
-            if "23andMe" in first_line:
-                return self._read_23andme(file)
-            elif "Ancestry" in first_line:
-                return self._read_ancestry(file)
-            elif first_line.startswith("RSID"):
-                return self._read_ftdna(file)
-            elif "famfinder" in first_line:
-                return self._read_ftdna_famfinder(file)
-            elif "lineage" in first_line:
-                return self._read_lineage_csv(file, comments)
-            elif first_line.startswith("rsid"):
-                return self._read_generic_csv(file)
+                compression = "gzip"
             else:
+                compression = ""
+
+            return {
+                "source": source,
+                "assembly": get_assembly(build),
+                "build": build,
+                "snp_count": snp_count,
+                "compression": compression,
+                "file_size": os.path.getsize(file),
+                "header_lines": header_lines,
+            }
+        except Exception as err:
+            logger.error(err)
+            return None
+
+    def _read_raw_data(self, file):
+        try:
+            if not os.path.exists(file):
+                logger.warning("%s does not exist; skipping", file)
                 return None, ""
+
+            # peek into files to determine the data format
+            first_line, comments = self._peek(file)
+            data_format = self._detect_format(first_line)
+
+            if data_format is None:
+                return None, ""
+
+            data = self._filter_raw_data(
+                file,
+                _SEPARATORS[data_format],
+                _ANCESTRY_CHROMS if data_format == "ancestry" else None,
+            )
+
+            if data_format == "23andme":
+                return self._read_23andme(data)
+            elif data_format == "ancestry":
+                return self._read_ancestry(data)
+            elif data_format == "ftdna":
+                return self._read_ftdna(data)
+            elif data_format == "ftdna_famfinder":
+                return self._read_ftdna_famfinder(data)
+            elif data_format == "lineage":
+                return self._read_lineage_csv(data, comments)
+            else:
+                return self._read_generic_csv(data)
         except Exception as err:
-            print(err)
+            logger.error(err)
             return None, ""
 
-    def _extract_comments(self, f, decode):
-        line = self._read_line(f, decode)
+    @classmethod
+    def _peek(cls, file):
+        """ Read the first line and the leading comments of a file. """
+        if ".zip" in file:
+            with zipfile.ZipFile(file) as z:
+                with z.open(z.namelist()[0], "r") as f:
+                    return cls._extract_comments(f, True)
+        elif ".gz" in file:
+            with gzip.open(file, "rt") as f:
+                return cls._extract_comments(f, False)
+        else:
+            with open(file, "r") as f:
+                return cls._extract_comments(f, False)
+
+    @staticmethod
+    def _detect_format(first_line):
+        """ Detect the data format of a file from its first line.
+
+        Parameters
+        ----------
+        first_line : str
+            first line of file
+
+        Returns
+        -------
+        str
+            data format, else None if the data format is not supported
+        """
+        if "23andMe" in first_line:
+            return "23andme"
+        elif "Ancestry" in first_line:
+            return "ancestry"
+        elif first_line.startswith("RSID"):
+            return "ftdna"
+        elif "famfinder" in first_line:
+            return "ftdna_famfinder"
+        elif "lineage" in first_line:
+            return "lineage"
+        elif first_line.startswith("rsid"):
+            return "generic"
+        else:
+            return None
+
+    @staticmethod
+    def _get_comment_value(comments, key):
+        """ Get the value following `key` in the comments of a file, else empty str. """
+        for comment in comments.split("\n"):
+            if key in comment:
+                return comment.split(key)[1].strip()
+        return ""
+
+    @staticmethod
+    def _get_uncompressed_size(file):
+        """ Get the uncompressed size of a (optionally zip or gzip compressed) file.
+
+        Notes
+        -----
+        The size of a gzip file is read from its trailer, which records the size of the last
+        member of the file (modulo 2^32).
+        """
+        if ".zip" in file:
+            with zipfile.ZipFile(file) as z:
+                return z.getinfo(z.namelist()[0]).file_size
+        elif ".gz" in file:
+            with open(file, "rb") as f:
+                f.seek(-4, os.SEEK_END)
+                return int.from_bytes(f.read(4), "little")
+        else:
+            return os.path.getsize(file)
+
+    @staticmethod
+    def _parse_row(line, sep):
+        """ Parse the chromosome and position of a row of a raw data file.
+
+        Returns
+        -------
+        tuple
+            (chrom, pos) as str, else None if the line is not a data row (e.g., a comment or
+            header)
+        """
+        if line.startswith("#"):
+            return None
+
+        fields = line.split(sep, 3)
+
+        if len(fields) < 3:
+            return None
+
+        pos = fields[2].strip().strip('"')
+
+        if not pos.isdigit():
+            return None
+
+        return fields[1].strip().strip('"'), pos
+
+    def _filter_raw_data(self, file, sep, chrom_map=None):
+        """ Filter the rows of a raw data file to the requested chromosomes / region.
+
+        Rows are filtered on the raw text of the file so that rows outside of the requested
+        chromosomes / region never become pandas objects. Comments, headers, and other lines
+        without a numeric position are passed through for the reader to handle. If the file
+        is indexed (see :mod:`lineage.bgzf`), only the blocks with the requested chromosomes /
+        region are read.
+
+        Parameters
+        ----------
+        file : str
+            path to file
+        sep : str
+            field separator of the file
+        chrom_map : dict
+            map of chromosome codes used in the file to chromosomes (e.g., '23' to 'X')
+
+        Returns
+        -------
+        str or io.StringIO
+            `file` if no filter was specified, else buffer with the filtered rows
+        """
+        if self._chroms is None and self._region is None:
+            return file
+
+        if chrom_map is None:
+            chrom_map = {}
+
+        buffer = io.StringIO()
+
+        if bgzf.has_index(file) and self._read_par:
+            # PAR rows are in blocks of their own, outside of any region
+            lines = bgzf.read_lines(file, self._get_raw_chroms())
+        elif bgzf.has_index(file):
+            lines = bgzf.read_lines(file, self._chroms, self._region)
+        else:
+            lines = self._read_lines(file)
+
+        for line in lines:
+            row = self._parse_row(line, sep)
+
+            if row is None:
+                buffer.write(line)
+                continue
+
+            chrom, pos = row
+            chrom = chrom_map.get(chrom, chrom)
+
+            if self._read_par and chrom == "PAR":
+                buffer.write(line)
+                continue
+
+            if self._chroms is not None and chrom not in self._chroms:
+                continue
+
+            if self._region is not None:
+                region_chrom, start, end = self._region
+                if chrom != region_chrom:
+                    continue
+                if start is not None and not start <= int(pos) <= end:
+                    continue
+
+            buffer.write(line)
+
+        buffer.seek(0)
+        return buffer
+
+    def _par_requested(self):
+        """ Check if the requested chromosomes / region may include assigned PAR SNPs. """
+        par_chroms = {"X", "Y", "PAR"}
+
+        if self._chroms is not None and not self._chroms & par_chroms:
+            return False
+
+        if self._region is not None and self._region[0] not in par_chroms:
+            return False
+
+        return self._chroms is not None or self._region is not None
+
+    def _get_raw_chroms(self):
+        """ Get the chromosomes of the file to read, including PAR. """
+        if self._chroms is not None:
+            return self._chroms | {"PAR"}
+        return {self._region[0], "PAR"}
+
+    def _filter_snps(self):
+        """ Filter SNPs to the requested chromosomes / region, after PAR SNPs are assigned. """
+        if self.snps is None:
+            return
+
+        keep = np.ones(len(self.snps), dtype=bool)
+
+        if self._chroms is not None:
+            keep &= self.snps["chrom"].isin(self._chroms).values
+
+        if self._region is not None:
+            region_chrom, start, end = self._region
+            keep &= (self.snps["chrom"] == region_chrom).values
+            if start is not None:
+                pos = self.snps["pos"].values
+                keep &= (pos >= start) & (pos <= end)
+
+        if not keep.all():
+            self.snps = self.snps.loc[keep]
+            self._cache.clear()
+
+    @staticmethod
+    def _read_lines(file):
+        """ Read the lines of a (optionally zip or gzip compressed) text file. """
+        if ".zip" in file:
+            with zipfile.ZipFile(file) as z:
+                with z.open(z.namelist()[0], "r") as f:
+                    for line in io.TextIOWrapper(f, encoding="utf-8"):
+                        yield line
+        elif ".gz" in file:
+            with gzip.open(file, "rt") as f:
+                for line in f:
+                    yield line
+        else:
+            with open(file, "r") as f:
+                for line in f:
+                    yield line
+
+    @classmethod
+    def _extract_comments(cls, f, decode):
+        line = cls._read_line(f, decode)
         first_line = line
         comments = ""
 
         while line.startswith("#"):
             comments += line
-            line = self._read_line(f, decode)
+            line = cls._read_line(f, decode)
 
         return first_line, comments
 
-    def _read_line(self, f, decode):
+    @staticmethod
+    def _read_line(f, decode):
         if decode:
             # https://stackoverflow.com/a/606199
             return f.readline().decode("utf-8")
@@ -208,8 +577,8 @@ class SNPs(object):
 
         Parameters
         ----------
-        file : str
-            path to file
+        file : str or io.StringIO
+            path to file, or buffer with the file's (filtered) contents
 
         Returns
         -------
@@ -238,8 +607,8 @@ class SNPs(object):
 
         Parameters
         ----------
-        file : str
-            path to file
+        file : str or io.StringIO
+            path to file, or buffer with the file's (filtered) contents
 
         Returns
         -------
@@ -276,8 +645,8 @@ class SNPs(object):
 
         Parameters
         ----------
-        file : str
-            path to file
+        file : str or io.StringIO
+            path to file, or buffer with the file's (filtered) contents
 
         Returns
         -------
@@ -313,8 +682,8 @@ class SNPs(object):
 
         Parameters
         ----------
-        file : str
-            path to file
+        file : str or io.StringIO
+            path to file, or buffer with the file's (filtered) contents
 
         Returns
         -------
@@ -343,10 +712,8 @@ class SNPs(object):
         del df["allele2"]
 
         # https://redd.it/5y90un
-        df.ix[np.where(df["chrom"] == "23")[0], "chrom"] = "X"
-        df.ix[np.where(df["chrom"] == "24")[0], "chrom"] = "Y"
-        df.ix[np.where(df["chrom"] == "25")[0], "chrom"] = "PAR"
-        df.ix[np.where(df["chrom"] == "26")[0], "chrom"] = "MT"
+        for code, chrom in _ANCESTRY_CHROMS.items():
+            df.ix[np.where(df["chrom"] == code)[0], "chrom"] = chrom
 
         return sort_snps(df), "AncestryDNA"
 
@@ -356,8 +723,8 @@ class SNPs(object):
 
         Parameters
         ----------
-        file : str
-            path to file
+        file : str or io.StringIO
+            path to file, or buffer with the file's (filtered) contents
         comments : str
             comments at beginning of file
 
@@ -368,11 +735,7 @@ class SNPs(object):
         str
             name of data source(s)
         """
-        source = ""
-        for comment in comments.split("\n"):
-            if "Source(s):" in comment:
-                source = comment.split("Source(s):")[1].strip()
-                break
+        source = SNPs._get_comment_value(comments, "Source(s):")
 
         df = pd.read_csv(
             file,
@@ -403,8 +766,8 @@ class SNPs(object):
 
         Parameters
         ----------
-        file : str
-            path to file
+        file : str or io.StringIO
+            path to file, or buffer with the file's (filtered) contents
 
         Returns
         -------
@@ -424,6 +787,7 @@ class SNPs(object):
 
         return sort_snps(df), "generic"
 
+    @instrumentation.instrumented("snps.assign_par_snps")
     def _assign_par_snps(self):
         """ Assign PAR SNPs to the X or Y chromosome using SNP position.
 
@@ -469,7 +833,7 @@ class SNPs(object):
                                 continue
 
                 except Exception as err:
-                    print(err)
+                    logger.warning("could not assign PAR SNP %s: %s", rsid, err)
 
     def _assign_snp(self, rsid, alleles, chrom):
         for allele in alleles:
@@ -488,6 +852,7 @@ class SNPs(object):
         return int(assembly_name[-2:])
 
 
+@instrumentation.instrumented("snps.detect_build")
 def detect_build(snps):
     """ Detect build of SNPs.
 
@@ -553,6 +918,64 @@ def detect_build(snps):
     return build
 
 
+def detect_declared_build(comments):
+    """ Detect the build declared in the header comments of a raw data file.
+
+    Parameters
+    ----------
+    comments : str
+        header comments of file (e.g., '# ... reference human assembly build 37 ...')
+
+    Returns
+    -------
+    int
+        declared build, else None
+    """
+    patterns = [
+        (re.compile(r"GRCh(3[78])"), None),
+        (re.compile(r"NCBI ?(36)"), None),
+        (re.compile(r"hg(18|19|38)"), {"18": 36, "19": 37, "38": 38}),
+        (re.compile(r"build (3[678])", re.IGNORECASE), None),
+    ]
+
+    for pattern, builds in patterns:
+        match = pattern.search(comments)
+        if match is not None:
+            if builds is not None:
+                return builds[match.group(1)]
+            return int(match.group(1))
+
+    return None
+
+
+def parse_region(region):
+    """ Parse a genomic region.
+
+    Parameters
+    ----------
+    region : str
+        chromosome (e.g., '7' or 'chr7'), optionally followed by a 1-based, inclusive position
+        range (e.g., '7:10000000-20000000' or '7:10,000,000-20,000,000')
+
+    Returns
+    -------
+    tuple
+        (chrom, start, end); `start` and `end` are None if no range was specified
+    """
+    region = str(region).replace(",", "").strip()
+
+    if region.startswith("chr"):
+        region = region[3:]
+
+    if ":" not in region:
+        return region, None, None
+
+    chrom, positions = region.split(":", 1)
+    start, end = positions.split("-", 1)
+
+    return chrom, int(start), int(end)
+
+
 def get_assembly(build):
     """ Get the assembly of a build.
 
@@ -708,33 +1131,330 @@ def determine_sex(
         return ""
 
 
+def get_fingerprint(snps):
+    """ Get a fingerprint of the content of SNPs.
+
+    The fingerprint is a hash of the rsids, chromosomes, positions, and genotypes of the SNPs,
+    so it changes whenever SNPs are loaded, merged, or remapped, and it's stable across
+    processes (e.g., for keys of results cached on disk).
+
+    Parameters
+    ----------
+    snps : pandas.DataFrame
+
+    Returns
+    -------
+    str
+        hex digest, or None if no SNPs
+    """
+    if not isinstance(snps, pd.DataFrame):
+        return None
+
+    return hashlib.sha1(
+        pd.util.hash_pandas_object(snps, index=True).values.tobytes()
+    ).hexdigest()
+
+
+def get_chromosome_fingerprints(snps):
+    """ Get a fingerprint of the content of the SNPs of each chromosome.
+
+    Fingerprints identify which chromosomes changed when SNPs are added or modified (e.g., when
+    SNPs are merged), so results can be recomputed for only those chromosomes.
+
+    Parameters
+    ----------
+    snps : pandas.DataFrame
+
+    Returns
+    -------
+    dict
+        hex digest of each chromosome (see :func:`get_fingerprint`), empty dict if no SNPs
+    """
+    if not isinstance(snps, pd.DataFrame):
+        return {}
+
+    hashes = pd.util.hash_pandas_object(snps, index=True).values
+    indices = pd.Series(hashes).groupby(np.asarray(snps["chrom"], dtype=object)).indices
+
+    return {
+        chrom: hashlib.sha1(hashes[rows].tobytes()).hexdigest()
+        for chrom, rows in indices.items()
+    }
+
+
+@instrumentation.instrumented("snps.sort")
 def sort_snps(snps):
-    """ Sort SNPs based on ordered chromosome list and position. """
+    """ Sort SNPs based on ordered chromosome list and position.
 
-    sorted_list = sorted(snps["chrom"].unique(), key=_natural_sort_key)
+    The `chrom` column is converted to an ordered categorical (see :func:`get_chrom_dtype`),
+    which is kept for the lifetime of the SNPs.
+    """
+    instrumentation.count(len(snps))
+    snps["chrom"] = snps["chrom"].astype(get_chrom_dtype(snps["chrom"].unique()))
+
+    # sort based on ordered chromosome list and position
+    return snps.sort_values(["chrom", "pos"])
 
-    # move PAR and MT to the end of the dataframe
-    if "PAR" in sorted_list:
-        sorted_list.remove("PAR")
-        sorted_list.append("PAR")
 
-    if "MT" in sorted_list:
-        sorted_list.remove("MT")
-        sorted_list.append("MT")
+def get_chrom_dtype(chroms=None):
+    """ Get the dtype of the `chrom` column of SNPs.
 
-    # convert chrom column to category for sorting
-    # https://stackoverflow.com/a/26707444
-    snps["chrom"] = snps["chrom"].astype(
-        CategoricalDtype(categories=sorted_list, ordered=True)
+    Parameters
+    ----------
+    chroms : iterable of str
+        chromosomes to represent; chromosomes not in `CHROMS` are appended to the categories in
+        natural sort order
+
+    Returns
+    -------
+    pandas.api.types.CategoricalDtype
+        ordered categorical of `CHROMS` (1-22, X, Y, PAR, MT), plus any other chromosomes
+    """
+    if chroms is None:
+        return CHROM_DTYPE
+
+    other_chroms = sorted(
+        set(chrom for chrom in chroms if chrom not in CHROMS), key=_natural_sort_key
     )
 
-    # sort based on ordered chromosome list and position
-    snps = snps.sort_values(["chrom", "pos"])
+    if len(other_chroms) == 0:
+        return CHROM_DTYPE
+
+    return CategoricalDtype(categories=CHROMS + other_chroms, ordered=True)
+
+
+def get_rsid_keys(rsids):
+    """ Get integer keys for SNP identifiers.
+
+    rsids of the form "rs<number>" are keyed by their number; other identifiers (e.g., 23andMe
+    "i" IDs) are keyed by negative numbers derived from a 62-bit hash of the identifier, so keys
+    are the same in every process (e.g., keys saved by a :class:`~lineage.store.CohortStore`)
+    and no table of identifiers is kept. Collisions of the hashes of different identifiers are
+    improbable (about 1 in 10**9 for 10**5 identifiers), but are detected: here, for the
+    identifiers of `rsids`, and by :func:`join_rsid_keys` (given the identifiers of the keys)
+    and :func:`check_other_ids` for identifiers of different sets of SNPs.
+
+    Parameters
+    ----------
+    rsids : array_like of str
+        SNP identifiers (e.g., the index of SNPs)
+
+    Returns
+    -------
+    numpy.ndarray
+        int64 keys
 
-    # convert chromosome back to object
-    snps["chrom"] = snps["chrom"].astype(object)
+    Raises
+    ------
+    ValueError
+        if different identifiers have the same key
+    """
+    rsids = pd.Index(rsids, dtype=object)
+    keys = np.empty(len(rsids), dtype=np.int64)
+
+    if len(rsids) == 0:
+        return keys
+
+    is_rs = rsids.str.match(_RS_ID_RE)
+    if is_rs.any():
+        keys[is_rs] = rsids[is_rs].str[2:].astype(np.int64)
+
+    other = np.flatnonzero(~is_rs)
+
+    for i in other:
+        keys[i] = _get_other_id_key(rsids[i])
+
+    check_other_ids({}, keys[other], rsids[other])
+
+    return keys
+
+
+def _get_other_id_key(rsid):
+    digest = hashlib.sha1(str(rsid).encode("utf-8")).digest()
+    return -(int.from_bytes(digest[:8], "little") & _OTHER_ID_KEY_MASK) - 1
+
+
+def check_other_ids(other_ids, keys, rsids):
+    """ Add identifiers of hashed (i.e., negative) rsid keys, checking for collisions.
+
+    Parameters
+    ----------
+    other_ids : dict
+        identifier of each hashed key; updated with `keys` and `rsids`
+    keys : array_like of int
+        hashed keys (see :func:`get_rsid_keys`)
+    rsids : array_like of str
+        identifiers of `keys`
+
+    Raises
+    ------
+    ValueError
+        if an identifier has the same key as a different identifier
+    """
+    for key, rsid in zip(keys, rsids):
+        other_id = other_ids.setdefault(key, rsid)
+
+        if other_id != rsid:
+            _raise_key_collision(key, other_id, rsid)
+
+
+def _raise_key_collision(key, rsid1, rsid2):
+    raise ValueError(
+        "SNP identifiers {!r} and {!r} have the same rsid key ({})".format(
+            rsid1, rsid2, key
+        )
+    )
+
+
+def get_rsids(keys, other_ids):
+    """ Get SNP identifiers from integer keys; inverse of :func:`get_rsid_keys`.
+
+    Parameters
+    ----------
+    keys : array_like of int
+    other_ids : dict
+        identifier of each negative key (i.e., of identifiers not of the form "rs<number>"),
+        since those keys are hashes
+
+    Returns
+    -------
+    pandas.Index
+        SNP identifiers
+    """
+    return pd.Index(
+        ["rs" + str(key) if key > 0 else other_ids[key] for key in keys], dtype=object
+    )
+
+
+def join_rsid_keys(keys1, keys2, order1=None, order2=None, rsids1=None, rsids2=None):
+    """ Find the SNPs common to two arrays of rsid keys.
 
-    return snps
+    The join is done on the sorted keys, via a binary search of the sorted `keys2` for each of
+    the sorted `keys1`.
+
+    Keys are expected to be unique, but raw data files can have duplicate rsids; `keys2` is
+    deduplicated, i.e., each key of `keys1` (including duplicates) is joined to only the first
+    occurrence of the key in `keys2` (if `order2` is a stable sort, e.g., a mergesort).
+
+    Parameters
+    ----------
+    keys1 : numpy.ndarray
+        keys (see :func:`get_rsid_keys`)
+    keys2 : numpy.ndarray
+        keys
+    order1 : numpy.ndarray
+        indices that sort `keys1`, if already computed
+    order2 : numpy.ndarray
+        indices that sort `keys2`, if already computed
+    rsids1 : array_like of str
+        identifiers of `keys1`, to check that joined hashed keys are of the same identifiers
+    rsids2 : array_like of str
+        identifiers of `keys2`
+
+    Returns
+    -------
+    indices1 : numpy.ndarray
+        indices of the common SNPs in `keys1`, in ascending order (i.e., the order of `keys1`)
+    indices2 : numpy.ndarray
+        indices of the common SNPs in `keys2`, corresponding to `indices1`
+
+    Raises
+    ------
+    ValueError
+        if `rsids1` and `rsids2` are specified and different identifiers have the same key
+    """
+    if order1 is None:
+        order1 = np.argsort(keys1, kind="mergesort")
+    if order2 is None:
+        order2 = np.argsort(keys2, kind="mergesort")
+
+    if len(keys1) == 0 or len(keys2) == 0:
+        return np.array([], dtype=np.int64), np.array([], dtype=np.int64)
+
+    sorted1 = keys1[order1]
+    sorted2 = keys2[order2]
+
+    # the leftmost match is the first occurrence of duplicate keys of `keys2`
+    pos = np.searchsorted(sorted2, sorted1, side="left")
+    pos[pos == len(sorted2)] = 0
+    found = sorted2[pos] == sorted1
+
+    indices1 = order1[found]
+    indices2 = order2[pos[found]]
+
+    # return common SNPs in the order of `keys1`
+    order = np.argsort(indices1, kind="mergesort")
+    indices1 = indices1[order]
+    indices2 = indices2[order]
+
+    if rsids1 is not None and rsids2 is not None:
+        other = np.flatnonzero(keys1[indices1] < 0)
+        other_ids1 = np.asarray(rsids1, dtype=object)[indices1[other]]
+        other_ids2 = np.asarray(rsids2, dtype=object)[indices2[other]]
+
+        for i in np.flatnonzero(other_ids1 != other_ids2):
+            key = keys1[indices1[other[i]]]
+            _raise_key_collision(key, other_ids1[i], other_ids2[i])
+
+    return indices1, indices2
+
+
+class SNPsCache(object):
+    """ Cache of values derived from SNPs (e.g., sex, chromosomes).
+
+    Values are computed once and cached until the SNPs are replaced (i.e., a different dataframe
+    is passed to :meth:`get`) or the cache is cleared. SNPs modified in place must be followed
+    by a call to :meth:`clear`.
+    """
+
+    def __init__(self):
+        self._snps = None
+        self._values = {}
+
+    def get(self, snps, name, compute):
+        """ Get a value derived from SNPs, computing it if it isn't cached.
+
+        Parameters
+        ----------
+        snps : pandas.DataFrame
+            SNPs the value is derived from
+        name : str
+            name of the value
+        compute : callable
+            function that computes the value from `snps`
+
+        Returns
+        -------
+        value derived from `snps`
+        """
+        if not isinstance(snps, pd.DataFrame):
+            return compute(snps)
+
+        if self._snps is None or self._snps() is not snps:
+            # don't keep replaced SNPs alive
+            self._snps = weakref.ref(snps)
+            self._values = {}
+
+        if name not in self._values:
+            self._values[name] = compute(snps)
+
+        return self._values[name]
+
+    def clear(self):
+        """ Clear the cached values. """
+        self._snps = None
+        self._values = {}
+
+    def get_memory_usage(self):
+        """ Get the memory used by the cached values.
+
+        Returns
+        -------
+        int
+            memory usage in bytes
+        """
+        seen = set()
+        return sum(memory.get_size(value, seen) for value in self._values.values())
 
 
 # https://stackoverflow.com/a/16090640
@@ -0,0 +1,423 @@
+""" Chunked on-disk storage of the genotypes of a cohort, for cohorts larger than memory.
+
+A store is a directory with the panel of SNPs of a cohort (see :class:`~lineage.cohort.Cohort`)
+and a block of encoded genotypes (individuals x SNPs, `uint8`) for each chromosome. Blocks are
+memory-mapped, so only the rows and chromosomes being processed are read into memory, and
+individuals are appended to the blocks one at a time. The table of alleles of the codes (see
+:mod:`lineage.genotypes`) is saved with the store, so codes are read (and written) correctly if
+the table changes.
+
+"""
+
+"""
+Copyright (C) 2019 Andrew Riha
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from lineage import progress
+from lineage.cohort import X_NON_PAR, find_segments
+from lineage.genotypes import (
+    ALLELES,
+    NULL,
+    get_code_map,
+    one_chrom_match,
+    two_chrom_match,
+)
+
+
+class CohortStore(object):
+    """ Object used to represent a cohort stored on disk. """
+
+    def __init__(self, path):
+        """ Open a ``CohortStore``.
+
+        Parameters
+        ----------
+        path : str
+            path of store directory (see :meth:`create`)
+        """
+        self._path = path
+
+        with open(os.path.join(path, "chromosomes.txt")) as f:
+            self._chroms = f.read().split()
+
+        with open(os.path.join(path, "alleles.txt")) as f:
+            alleles = f.read().split()
+
+        # map the codes of the store to (and from) the current table of alleles if it's different
+        if alleles == list(ALLELES):
+            self._code_map = self._inverse_code_map = None
+        else:
+            self._code_map = get_code_map(alleles)
+            self._inverse_code_map = get_code_map(ALLELES, alleles)
+
+        self._individuals = pd.read_csv(
+            os.path.join(path, "individuals.csv"),
+            dtype={"name": object, "sex": object},
+            keep_default_na=False,
+        )
+
+        self._truncate_blocks()
+
+    def __repr__(self):
+        return "CohortStore({} individuals, {} SNPs)".format(len(self), self.snp_count)
+
+    def __len__(self):
+        return len(self._individuals)
+
+    @classmethod
+    def create(cls, path, cohort):
+        """ Create a ``CohortStore`` from a ``Cohort``.
+
+        The panel of SNPs of the store is the panel of `cohort`; individuals can be added to the
+        store later with :meth:`add_individual`.
+
+        Parameters
+        ----------
+        path : str
+            path of store directory; created if it doesn't exist
+        cohort : Cohort
+            cohort with the panel and initial individuals of the store
+
+        Returns
+        -------
+        CohortStore
+        """
+        os.makedirs(path, exist_ok=True)
+
+        for chrom in cohort.chromosomes:
+            s = cohort.get_chrom_slice(chrom)
+            chrom_path = _get_chrom_path(path, chrom)
+
+            os.makedirs(chrom_path, exist_ok=True)
+
+            keys = cohort.keys[s]
+            np.save(os.path.join(chrom_path, "keys.npy"), keys)
+            np.save(os.path.join(chrom_path, "order.npy"), np.argsort(keys, kind="mergesort"))
+            np.save(os.path.join(chrom_path, "pos.npy"), cohort.pos[s])
+            np.save(os.path.join(chrom_path, "cMs.npy"), cohort.cMs[s])
+
+            with open(os.path.join(chrom_path, "genotypes.bin"), "wb") as f:
+                for row in range(len(cohort)):
+                    cohort.genotypes[row, s].tofile(f)
+
+        with open(os.path.join(path, "chromosomes.txt"), "w") as f:
+            f.write("\n".join(cohort.chromosomes) + "\n")
+
+        with open(os.path.join(path, "alleles.txt"), "w") as f:
+            f.write("\n".join(ALLELES) + "\n")
+
+        pd.DataFrame(
+            {"name": cohort.names, "sex": cohort.sexes}, columns=["name", "sex"]
+        ).to_csv(os.path.join(path, "individuals.csv"), index=False)
+
+        return cls(path)
+
+    @property
+    def names(self):
+        """ Names of the individuals of this ``CohortStore``, in the order of the rows of blocks.
+
+        Returns
+        -------
+        list of str
+        """
+        return list(self._individuals["name"])
+
+    @property
+    def chromosomes(self):
+        """ Chromosomes of the panel, in sorted order.
+
+        Returns
+        -------
+        list of str
+        """
+        return list(self._chroms)
+
+    @property
+    def snp_count(self):
+        """ Count of SNPs in the panel.
+
+        Returns
+        -------
+        int
+        """
+        return sum(len(self.get_snps(chrom)[0]) for chrom in self._chroms)
+
+    def get_snps(self, chrom):
+        """ Get the SNPs of a chromosome of the panel.
+
+        Parameters
+        ----------
+        chrom : str
+
+        Returns
+        -------
+        keys : numpy.ndarray
+            rsid keys (see :func:`~lineage.snps.get_rsid_keys`)
+        pos : numpy.ndarray
+            positions
+        cMs : numpy.ndarray
+            genetic positions (cM); null if the genetic map for the chromosome isn't available
+        """
+        chrom_path = _get_chrom_path(self._path, chrom)
+
+        return tuple(
+            np.load(os.path.join(chrom_path, name + ".npy"), mmap_mode="r")
+            for name in ["keys", "pos", "cMs"]
+        )
+
+    def get_genotypes(self, chrom):
+        """ Get the block of genotype codes of a chromosome.
+
+        Parameters
+        ----------
+        chrom : str
+
+        Returns
+        -------
+        numpy.memmap
+            read-only individuals x SNPs genotype codes; if the store was written with a different
+            table of alleles, the codes are mapped to the current table in memory
+        """
+        block = self._get_block(chrom)
+
+        if self._code_map is not None:
+            return self._code_map[block]
+
+        return block
+
+    def _get_block(self, chrom):
+        """ Get the block of genotype codes of a chromosome, as written. """
+        n_snps = len(self.get_snps(chrom)[0])
+        filename = os.path.join(_get_chrom_path(self._path, chrom), "genotypes.bin")
+
+        if len(self) == 0:
+            return np.zeros((0, n_snps), dtype=np.uint8)
+
+        return np.memmap(filename, dtype=np.uint8, mode="r", shape=(len(self), n_snps))
+
+    def add_individual(self, individual):
+        """ Add an individual to this ``CohortStore``.
+
+        The genotypes of the individual are aligned to the panel of the store; SNPs not in the
+        panel are ignored. The individual should have SNPs of the same build as the store (e.g.,
+        see :meth:`~lineage.Lineage.remap_snps`).
+
+        Rows are appended to the blocks of genotypes before `individuals.csv` is replaced; if
+        adding fails, the rows appended are discarded (see :meth:`_truncate_blocks`), so the
+        store is unchanged.
+
+        Parameters
+        ----------
+        individual : Individual
+        """
+        if individual._snps is not None:
+            keys = individual._get_rsid_keys()[0]
+            codes = individual._get_genotype_codes()
+        else:
+            keys = np.array([], dtype=np.int64)
+            codes = np.array([], dtype=np.uint8)
+
+        if self._inverse_code_map is not None:
+            codes = self._inverse_code_map[codes]
+
+        rows = []
+
+        for chrom in self._chroms:
+            chrom_path = _get_chrom_path(self._path, chrom)
+            chrom_keys = self.get_snps(chrom)[0]
+            order = np.load(os.path.join(chrom_path, "order.npy"), mmap_mode="r")
+
+            row = np.full(len(chrom_keys), NULL, dtype=np.uint8)
+
+            if len(keys) > 0:
+                sorted_keys = chrom_keys[order]
+                loc = np.searchsorted(sorted_keys, keys)
+                loc[loc == len(sorted_keys)] = 0
+                found = sorted_keys[loc] == keys
+                row[order[loc[found]]] = codes[found]
+
+            rows.append((chrom_path, row))
+
+        # discard the rows of a failed addition before appending
+        self._truncate_blocks()
+
+        for chrom_path, row in rows:
+            with open(os.path.join(chrom_path, "genotypes.bin"), "ab") as f:
+                row.tofile(f)
+
+        individuals = pd.concat(
+            [
+                self._individuals,
+                pd.DataFrame(
+                    {"name": [individual.get_var_name()], "sex": [individual.sex]},
+                    columns=["name", "sex"],
+                ),
+            ],
+            ignore_index=True,
+        )
+
+        # replace `individuals.csv` atomically, so the rows appended are valid only once the
+        # individual has been added
+        filename = os.path.join(self._path, "individuals.csv")
+        individuals.to_csv(filename + ".tmp", index=False)
+        os.replace(filename + ".tmp", filename)
+
+        self._individuals = individuals
+
+    def _read_rows(self, block, rows):
+        """ Read rows of a block into memory, mapping their codes to the current table. """
+        codes = np.array(block[rows])
+
+        if self._code_map is not None:
+            codes = self._code_map[codes]
+
+        return codes
+
+    def _truncate_blocks(self):
+        """ Truncate the blocks of genotypes to the rows of the individuals of the store.
+
+        Blocks can have more rows than the store has individuals if adding an individual failed
+        (e.g., the process was interrupted) after rows were appended.
+        """
+        for chrom in self._chroms:
+            filename = os.path.join(_get_chrom_path(self._path, chrom), "genotypes.bin")
+            size = len(self) * len(self.get_snps(chrom)[0])
+
+            if os.path.exists(filename) and os.path.getsize(filename) > size:
+                with open(filename, "r+b") as f:
+                    f.truncate(size)
+
+    def find_shared_dna(
+        self, name, names=None, cM_threshold=0.75, snp_threshold=1100, chunk_size=256
+    ):
+        """ Find the shared DNA between an individual and other individuals of the store.
+
+        Blocks are processed one chromosome and at most `chunk_size` individuals at a time, so
+        memory is bounded regardless of the size of the store. Segments are found as in
+        :meth:`~lineage.Lineage.find_shared_dna`; SNPs that an individual doesn't have are
+        treated as no-calls (i.e., as matching), so use a store with an intersection panel to
+        only consider SNPs that all individuals have.
+
+        Parameters
+        ----------
+        name : str
+            name of individual
+        names : list of str
+            names of individuals to compare with; if None, compare with all other individuals
+        cM_threshold : float
+            minimum centiMorgans for each shared DNA segment
+        snp_threshold : int
+            minimum SNPs for each shared DNA segment
+        chunk_size : int
+            maximum number of individuals to process at a time
+
+        Returns
+        -------
+        one_chrom_shared_dna : pandas.DataFrame
+            segments of shared DNA on one chromosome, with the name of the other individual
+        two_chrom_shared_dna : pandas.DataFrame
+            segments of shared DNA on two chromosomes, with the name of the other individual
+        """
+        all_names = self.names
+        row = all_names.index(name)
+
+        if names is None:
+            rows = np.array([i for i in range(len(all_names)) if i != row], dtype=np.int64)
+        else:
+            rows = np.array([all_names.index(other) for other in names], dtype=np.int64)
+
+        males = self._individuals["sex"].values == "Male"
+
+        shared_dna = {"one_chrom_match": [], "two_chrom_match": []}
+
+        for n, chrom in enumerate(self._chroms, 1):
+            _, pos, cMs = self.get_snps(chrom)
+
+            if len(cMs) == 0 or np.isnan(cMs[0]):
+                progress.report("store.find_shared_dna", n, len(self._chroms), chrom)
+                continue
+
+            pos = np.asarray(pos)
+            cMs = np.asarray(cMs)
+            block = self._get_block(chrom)
+            codes = self._read_rows(block, row)
+
+            if chrom == "X":
+                non_par = (pos > X_NON_PAR[0]) & (pos < X_NON_PAR[1])
+
+            for i in range(0, len(rows), chunk_size):
+                chunk = rows[i : i + chunk_size]
+                others = self._read_rows(block, chunk)
+
+                matches = {
+                    "one_chrom_match": one_chrom_match(codes, others),
+                    "two_chrom_match": two_chrom_match(codes, others),
+                }
+
+                # males have one copy of the X chromosome outside of the PARs
+                if chrom == "X":
+                    one_x_chrom = males[chunk] | males[row]
+                    matches["two_chrom_match"][np.ix_(one_x_chrom, non_par)] = False
+
+                for col, match in matches.items():
+                    for j, other in enumerate(chunk):
+                        segments, segment_cMs = find_segments(
+                            match[j], cMs, cM_threshold, snp_threshold
+                        )
+
+                        for (start, end), segment_cM in zip(segments, segment_cMs):
+                            shared_dna[col].append(
+                                {
+                                    "name": all_names[other],
+                                    "chrom": chrom,
+                                    "start": pos[start],
+                                    "end": pos[end - 1],
+                                    "cMs": segment_cM,
+                                    "snps": end - start,
+                                }
+                            )
+
+            progress.report("store.find_shared_dna", n, len(self._chroms), chrom)
+
+        return (
+            _convert_shared_dna_list_to_df(shared_dna["one_chrom_match"], rows, all_names),
+            _convert_shared_dna_list_to_df(shared_dna["two_chrom_match"], rows, all_names),
+        )
+
+
+def _get_chrom_path(path, chrom):
+    return os.path.join(path, "chrom_" + chrom)
+
+
+def _convert_shared_dna_list_to_df(shared_dna, rows, names):
+    df = pd.DataFrame(
+        shared_dna, columns=["name", "chrom", "start", "end", "cMs", "snps"]
+    )
+
+    # order segments by individual, then by chromosome (the order segments were found)
+    rank = {names[row]: i for i, row in enumerate(rows)}
+    df = df.iloc[np.argsort(df["name"].map(rank).values, kind="mergesort")]
+
+    df = df.reset_index(drop=True)
+    df.index.name = "segment"
+    df.index = df.index + 1
+    return df
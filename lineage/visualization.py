@@ -54,7 +54,10 @@ You should have received a copy of the GNU General Public License
 along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 """
+import functools
+import logging
 import os
+import threading
 
 import pandas as pd
 import numpy as np
@@ -65,7 +68,25 @@ from matplotlib import pyplot as plt
 from matplotlib.collections import BrokenBarHCollection
 from matplotlib import patches
 
+from lineage import instrumentation
 
+logger = logging.getLogger(__name__)
+
+# pyplot isn't thread-safe, so plots are made one at a time
+_lock = threading.Lock()
+
+
+def _synchronized(func):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with _lock:
+            return func(*args, **kwargs)
+
+    return wrapper
+
+
+@instrumentation.instrumented("visualization.plot_chromosomes")
+@_synchronized
 def plot_chromosomes(one_chrom_match, two_chrom_match, cytobands, path, title, build):
     """ Plots chromosomes with designated markers.
 
@@ -164,9 +185,10 @@ def plot_chromosomes(one_chrom_match, two_chrom_match, cytobands, path, title, b
 
     ax.set_title(title, fontsize=14, fontweight="bold")
     plt.xlabel("Build " + str(build) + " Chromosome Position", fontsize=10)
-    print("Saving " + os.path.relpath(path))
+    logger.info("Saving %s", os.path.relpath(path))
     plt.tight_layout()
     plt.savefig(path)
+    plt.close(fig)
 
 
 def _chromosome_collections(df, y_positions, height, **kwargs):
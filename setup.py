@@ -93,5 +93,6 @@ setup(
     keywords="dna genes genetics genealogy snps chromosomes genotype "
     "bioinformatics ancestry",
     packages=["lineage"],
+    entry_points={"console_scripts": ["lineage=lineage.cli:main"]},
     install_requires=["numpy==1.15.1", "pandas==0.23.4", "matplotlib==2.2.3"],
 )
@@ -16,12 +16,17 @@ along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 """
 
+import gzip
+import io
 import os
 import shutil
+import tarfile
 
 import pytest
 
 from lineage import Lineage
+from lineage.resources import Resources
+from lineage.simulation import Simulator
 
 
 def del_output_dir_helper():
@@ -40,3 +45,41 @@ def del_output_dir():
     del_output_dir_helper()
     yield
     del_output_dir_helper()
+
+
+@pytest.fixture(scope="session")
+def simulated_family(tmpdir_factory):
+    """ Resources directory, and raw data files of a simulated mother, father, and son. """
+    resources_dir = str(tmpdir_factory.mktemp("resources"))
+
+    # recombination rate of 1 cM/Mb
+    path = os.path.join(resources_dir, "genetic_map_HapMapII_GRCh37.tar.gz")
+    with tarfile.open(path, "w:gz") as tar:
+        for chrom, end in (("1", 100000000), ("2", 80000000)):
+            data = "Chromosome\tPosition(bp)\tRate(cM/Mb)\tMap(cM)\n"
+            data += "chr{0}\t0\t1.0\t0.0\nchr{0}\t{1}\t1.0\t0.0\n".format(chrom, end)
+            data = data.encode()
+
+            info = tarfile.TarInfo("genetic_map_GRCh37_chr{}.txt".format(chrom))
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+
+    with gzip.open(os.path.join(resources_dir, "cytoBand_hg19.txt.gz"), "wt") as f:
+        f.write("chr1\t0\t100000000\tp36.33\tgneg\nchr2\t0\t80000000\tp25.3\tgneg\n")
+
+    s = Simulator(Resources(resources_dir=resources_dir), snp_count=20000, seed=0)
+    family = s.create_pedigree(
+        [
+            ("mother", None, None, "Female"),
+            ("father", None, None, "Male"),
+            ("son", "mother", "father", "Male"),
+        ]
+    )
+
+    data_dir = str(tmpdir_factory.mktemp("data"))
+    individuals = {
+        name: s.write_snps(ind, os.path.join(data_dir, name + ".txt"), seed=1)
+        for name, ind in family.items()
+    }
+
+    return resources_dir, individuals
@@ -0,0 +1,151 @@
+"""
+Copyright (C) 2019 Andrew Riha
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+import asyncio
+import io
+import threading
+import time
+import urllib.error
+
+import pandas as pd
+
+from lineage import Lineage
+from lineage.aio import AsyncEnsemblRestClient, AsyncLineage, AsyncResources
+from lineage.ensembl import EnsemblRestClient
+from lineage.resources import Resources
+
+
+def run(coro):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
+class FakeEnsemblRestClient(EnsemblRestClient):
+    """ Client that counts requests, and that is rate limited by the "server" once. """
+
+    def __init__(self):
+        super().__init__()
+        self.endpoints = []
+        self.running = 0
+        self.max_running = 0
+        self._lock = threading.Lock()
+
+    def request(self, endpoint, hdrs=None, params=None):
+        with self._lock:
+            self.endpoints.append(endpoint)
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+            rate_limited = len(self.endpoints) == 1
+
+        try:
+            time.sleep(0.02)
+
+            if rate_limited:
+                raise urllib.error.HTTPError(
+                    endpoint, 429, "Too Many Requests", {"Retry-After": "0"}, io.BytesIO()
+                )
+
+            return {"mappings": [], "endpoint": endpoint}
+        finally:
+            with self._lock:
+                self.running -= 1
+
+
+def test_rest_client():
+    fake = FakeEnsemblRestClient()
+    client = AsyncEnsemblRestClient(fake, reqs_per_sec=100, max_concurrency=3)
+
+    async def main():
+        return await asyncio.gather(
+            *[client.perform_rest_action("/test/" + str(i)) for i in range(9)]
+        )
+
+    responses = run(main())
+
+    assert [r["endpoint"] for r in responses] == ["/test/" + str(i) for i in range(9)]
+    # one request was retried after being rate limited
+    assert len(fake.endpoints) == 10
+    assert fake.max_running == 3
+
+
+def test_assembly_mapping_data(tmpdir):
+    fake = FakeEnsemblRestClient()
+    r = Resources(resources_dir=str(tmpdir), ensembl_rest_client=fake)
+    ar = AsyncResources(r, max_concurrency=8)
+
+    async def main():
+        # concurrent requests for the same data download it once
+        return await asyncio.gather(
+            ar.get_assembly_mapping_data("NCBI36", "GRCh37", ["1"]),
+            ar.get_assembly_mapping_data("NCBI36", "GRCh37", ["X"]),
+        )
+
+    data1, dataX = run(main())
+
+    assert len(fake.endpoints) == 26
+    assert fake.max_running > 1
+    assert data1["1"]["endpoint"] == "/map/human/NCBI36/1/GRCh37?"
+    assert dataX["X"]["endpoint"] == "/map/human/NCBI36/X/GRCh37?"
+
+    # the downloaded data is used by the synchronous API
+    assert r.get_assembly_mapping_data("NCBI36", "GRCh37", ["MT"])["MT"]["mappings"] == []
+    assert len(fake.endpoints) == 26
+
+
+def test_create_individual(tmpdir):
+    l = Lineage(output_dir=str(tmpdir))
+    files = ["tests/input/GRCh37.csv", "tests/input/23andme.txt"]
+
+    async def main():
+        al = AsyncLineage(l)
+        return await asyncio.gather(
+            al.create_individual("ind1", files), al.create_individual("ind2", files[1])
+        )
+
+    ind1, ind2 = run(main())
+    expected = l.create_individual("expected", files)
+
+    pd.testing.assert_frame_equal(ind1.snps, expected.snps)
+    assert ind1.source == expected.source
+    assert ind2.snp_count == l.create_individual("ind2", files[1]).snp_count
+
+
+def test_find_shared_dna(simulated_family):
+    resources_dir, individuals = simulated_family
+    l = Lineage(resources_dir=resources_dir, cache_size=0)
+
+    async def main():
+        al = AsyncLineage(l)
+        mother, son = await asyncio.gather(
+            al.create_individual("mother", individuals["mother"]),
+            al.create_individual("son", individuals["son"]),
+        )
+        return await al.find_shared_dna(mother, son, save_output=False)
+
+    one_chrom_shared_dna = run(main())[0]
+    expected = l.find_shared_dna(
+        l.create_individual("mother", individuals["mother"]),
+        l.create_individual("son", individuals["son"]),
+        save_output=False,
+    )[0]
+
+    pd.testing.assert_frame_equal(one_chrom_shared_dna, expected)
+    assert one_chrom_shared_dna["cMs"].sum() > 170
@@ -0,0 +1,183 @@
+"""
+Copyright (C) 2019 Andrew Riha
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+import io
+import json
+import os
+import shutil
+import tarfile
+
+import pandas as pd
+import pytest
+
+from lineage import batch, cli
+from lineage.resources import _ASSEMBLY_MAPPING_CHROMS
+
+
+def test_validate_manifest():
+    manifest = batch.validate_manifest(
+        {"individuals": {"a": "a.txt", "b": ["b.txt"], "c": "c.txt"}, "shared_dna": "all"}
+    )
+    assert manifest["build"] == 37
+    assert [c["individuals"] for c in manifest["shared_dna"]] == [
+        ["a", "b"],
+        ["a", "c"],
+        ["b", "c"],
+    ]
+
+
+@pytest.mark.parametrize(
+    "manifest",
+    [
+        {},
+        {"individuals": {"a": []}},
+        {"individuals": {"a": "a.txt"}, "threshold": 1},
+        {"individuals": {"a": "a.txt"}, "build": 19},
+        {"individuals": {"a": "a.txt"}, "shared_dna": [{"individuals": ["a", "b"]}]},
+        {"individuals": {"a": "a.txt"}, "discordant_snps": [{"individuals": ["a"]}]},
+        {"individuals": {"a": "a.txt", "b": "b.txt"}, "shared_dna": [["a", "b"]]},
+    ],
+)
+def test_validate_manifest_invalid(manifest):
+    with pytest.raises(ValueError):
+        batch.validate_manifest(manifest)
+
+
+def test_run_manifest(tmpdir, simulated_family):
+    resources_dir, individuals = simulated_family
+    individuals = dict(individuals, missing="missing.txt")
+
+    results = batch.run_manifest(
+        {
+            "output_dir": str(tmpdir),
+            "resources_dir": resources_dir,
+            "individuals": individuals,
+            "save_snps": True,
+            "save_output": False,
+            "shared_dna": [
+                {"individuals": ["mother", "son"]},
+                {"individuals": ["mother", "father"], "cM_threshold": 5},
+                {"individuals": ["mother", "missing"]},
+            ],
+            "discordant_snps": [{"individuals": ["son", "mother", "father"]}],
+        },
+        workers=2,
+    )
+
+    assert results["individuals"]["son"]["sex"] == "Male"
+    assert "error" in results["individuals"]["missing"]
+    assert os.path.exists(str(tmpdir.join("son_lineage_GRCh37.csv")))
+
+    mother_son, mother_father, mother_missing = results["shared_dna"]
+    assert mother_son["individuals"] == ["mother", "son"]
+    assert mother_son["one_chrom_cMs"] > 170
+    assert 0 < mother_son["one_chrom_longest_cMs"] <= mother_son["one_chrom_cMs"]
+    assert mother_father["cM_threshold"] == 5
+    assert mother_father["one_chrom_segments"] == 0
+    assert "error" in mother_missing
+
+    assert 0 <= results["discordant_snps"][0]["discordant_snps"] < 100
+    assert batch.count_errors(results) == 2
+
+
+def test_run_manifest_save_snps_build(tmpdir, simulated_family):
+    resources_dir, individuals = simulated_family
+    resources_dir = shutil.copytree(resources_dir, str(tmpdir.join("resources")))
+
+    # only the first 50 Mbp of chromosome 1 are mapped to Build 38
+    with tarfile.open(os.path.join(resources_dir, "GRCh37_GRCh38.tar.gz"), "w:gz") as tar:
+        for chrom in _ASSEMBLY_MAPPING_CHROMS:
+            mappings = []
+            if chrom == "1":
+                region = {"seq_region_name": "1", "strand": 1}
+                mappings.append(
+                    {
+                        "original": dict(region, start=1, end=50000000),
+                        "mapped": dict(region, start=1001, end=50001000),
+                    }
+                )
+
+            data = json.dumps({"mappings": mappings}).encode()
+            info = tarfile.TarInfo(chrom + ".json")
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+
+    manifest = {
+        "resources_dir": resources_dir,
+        "individuals": {"mother": individuals["mother"], "son": individuals["son"]},
+        "save_output": False,
+        "shared_dna": [{"individuals": ["mother", "son"]}],
+    }
+
+    expected = batch.run_manifest(dict(manifest, output_dir=str(tmpdir.join("37"))))
+    results = batch.run_manifest(
+        dict(manifest, output_dir=str(tmpdir.join("38")), save_snps=True, build=38)
+    )
+
+    assert batch.count_errors(results) == 0
+    for key in ("one_chrom_segments", "one_chrom_cMs", "two_chrom_cMs"):
+        assert results["shared_dna"][0][key] == expected["shared_dna"][0][key]
+
+    saved = pd.read_csv(
+        str(tmpdir.join("38", "son_lineage_GRCh38.csv")), comment="#", index_col=0
+    )
+    original = pd.read_csv(
+        individuals["son"],
+        sep="\t",
+        comment="#",
+        header=None,
+        names=["rsid", "chromosome", "position", "genotype"],
+        index_col=0,
+    ).loc[saved.index]
+
+    mapped = (original["chromosome"].astype(str) == "1") & (
+        original["position"] <= 50000000
+    )
+    assert mapped.any() and (~mapped).any()
+    assert (saved["position"][mapped] == original["position"][mapped] + 1000).all()
+    assert (saved["position"][~mapped] == original["position"][~mapped]).all()
+
+
+def test_cli(tmpdir, simulated_family):
+    resources_dir, individuals = simulated_family
+
+    path = str(tmpdir.join("manifest.json"))
+    with open(path, "w") as f:
+        json.dump(
+            {
+                "resources_dir": resources_dir,
+                "individuals": individuals,
+                "save_output": False,
+                "shared_dna": "all",
+            },
+            f,
+        )
+
+    output_dir = str(tmpdir.join("output"))
+    assert cli.main(["run", path, "--workers", "2", "--output-dir", output_dir]) == 0
+
+    with open(os.path.join(output_dir, "results.json")) as f:
+        results = json.load(f)
+
+    assert len(results["shared_dna"]) == 3
+    assert results["individuals"]["mother"]["snp_count"] > 19000
+
+
+def test_cli_invalid(tmpdir):
+    assert cli.main([]) == 2
+    assert cli.main(["run", str(tmpdir.join("missing.json"))]) == 2
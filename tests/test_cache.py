@@ -0,0 +1,91 @@
+"""
+Copyright (C) 2019 Andrew Riha
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+import os
+
+import lineage.cache
+from lineage.cache import ResultCache
+
+
+def test_get_set():
+    cache = ResultCache()
+    assert cache.get(("a", 1)) is None
+
+    result = [{"chrom": "1", "cMs": 10.0}]
+    cache.set(("a", 1), result)
+
+    # results are copied, so modifying them doesn't modify the cache
+    result[0]["cMs"] = 20.0
+    cached = cache.get(("a", 1))
+    assert cached == [{"chrom": "1", "cMs": 10.0}]
+    cached.append({})
+    assert len(cache.get(("a", 1))) == 1
+
+
+def test_lru_eviction():
+    cache = ResultCache(maxsize=2)
+    cache.set(("a",), 1)
+    cache.set(("b",), 2)
+    cache.get(("a",))
+    cache.set(("c",), 3)
+
+    assert len(cache) == 2
+    assert cache.get(("a",)) == 1
+    assert cache.get(("b",)) is None
+    assert cache.get(("c",)) == 3
+
+
+def test_disk(tmpdir):
+    cache_dir = str(tmpdir.join("cache"))
+    cache = ResultCache(maxsize=0, cache_dir=cache_dir)
+    cache.set(("a", 0.75, 1100), [1, 2])
+
+    assert len(cache) == 0
+    assert len(os.listdir(cache_dir)) == 1
+
+    # results are reused by other caches (e.g., in other processes)
+    assert ResultCache(cache_dir=cache_dir).get(("a", 0.75, 1100)) == [1, 2]
+    assert ResultCache(cache_dir=cache_dir).get(("a", 0.5, 1100)) is None
+
+
+def test_disk_version(tmpdir, monkeypatch):
+    cache_dir = str(tmpdir.join("cache"))
+    ResultCache(cache_dir=cache_dir).set(("a",), 1)
+
+    # results saved by another version aren't reused
+    monkeypatch.setattr(lineage.cache, "CACHE_VERSION", lineage.cache.CACHE_VERSION + 1)
+    assert ResultCache(cache_dir=cache_dir).get(("a",)) is None
+
+
+def test_disk_write_failed(tmpdir):
+    # cache directory can't be created
+    cache_dir = str(tmpdir.join("cache"))
+    with open(cache_dir, "w"):
+        pass
+
+    cache = ResultCache(cache_dir=cache_dir)
+    cache.set(("a",), 1)
+    assert cache.get(("a",)) == 1
+
+    # result can't be written
+    cache_dir = str(tmpdir.join("cache2"))
+    cache = ResultCache(cache_dir=cache_dir)
+    os.makedirs(os.path.join(cache_dir, os.path.basename(cache._get_path(("a",)))))
+    cache.set(("a",), 1)
+    assert cache.get(("a",)) == 1
+    assert os.listdir(cache_dir) == [os.path.basename(cache._get_path(("a",)))]
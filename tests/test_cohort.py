@@ -0,0 +1,180 @@
+"""
+Copyright (C) 2019 Andrew Riha
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from lineage.cohort import Cohort, compute_cMs, find_segments_thresholds
+from lineage.genotypes import NULL, encode_genotypes
+from tests.test_individual import create_snp_df
+
+
+def create_individual(l, name, rsid, chrom, pos, genotype):
+    ind = l.create_individual(name)
+    ind._build = 37
+    ind._snps = create_snp_df(rsid, chrom, pos, genotype)
+    return ind
+
+
+@pytest.fixture(scope="module")
+def individuals(l):
+    ind1 = create_individual(
+        l,
+        "ind1",
+        ["rs1", "rs2", "rs3", "rsIndelTest"],
+        ["1", "1", "2", "MT"],
+        [101, 102, 201, 5],
+        ["AA", "AC", "GG", "ID"],
+    )
+    ind2 = create_individual(
+        l,
+        "ind2",
+        ["rs4", "rs2", "rs3"],
+        ["1", "1", "2"],
+        [100, 102, 201],
+        ["TT", np.nan, "GT"],
+    )
+    return [ind1, ind2]
+
+
+def test_cohort_union(individuals):
+    cohort = Cohort(individuals)
+
+    assert len(cohort) == 2
+    assert cohort.names == ["ind1", "ind2"]
+    assert cohort.snp_count == 5
+    assert cohort.genotypes.dtype == np.uint8
+    assert cohort.genotypes.flags["C_CONTIGUOUS"]
+
+    snps = cohort.get_snps()
+    assert list(snps.index) == ["rs4", "rs1", "rs2", "rs3", "rsIndelTest"]
+    assert list(snps["pos"]) == [100, 101, 102, 201, 5]
+    assert snps["cM"].isnull().all()
+
+    assert cohort.chromosomes == ["1", "2", "MT"]
+    assert list(cohort.offsets) == [0, 3, 4, 5]
+    assert cohort.get_chrom_slice("2") == slice(3, 4)
+    assert cohort.get_chrom_slice("X") == slice(0, 0)
+
+    np.testing.assert_array_equal(
+        cohort.get_genotypes("ind1"),
+        encode_genotypes([np.nan, "AA", "AC", "GG", "ID"]),
+    )
+    np.testing.assert_array_equal(
+        cohort.get_genotypes(individuals[1]),
+        encode_genotypes(["TT", np.nan, np.nan, "GT", np.nan]),
+    )
+
+
+def test_cohort_intersection(individuals):
+    cohort = Cohort(individuals, panel="intersection")
+
+    assert list(cohort.get_snps().index) == ["rs2", "rs3"]
+    np.testing.assert_array_equal(
+        cohort.genotypes,
+        np.stack([encode_genotypes(["AC", "GG"]), encode_genotypes([np.nan, "GT"])]),
+    )
+    assert cohort.genotypes[1, 0] == NULL
+
+
+def test_cohort_invalid_panel(individuals):
+    with pytest.raises(ValueError):
+        Cohort(individuals, panel="invalid")
+
+
+def test_cohort_memmap(individuals, tmpdir):
+    filename = str(tmpdir.join("genotypes.dat"))
+    cohort = Cohort(individuals, filename=filename)
+
+    assert isinstance(cohort.genotypes, np.memmap)
+    assert os.path.getsize(filename) == 2 * 5
+    np.testing.assert_array_equal(cohort.genotypes, Cohort(individuals).genotypes)
+
+
+def test_cohort_no_snps(l):
+    cohort = Cohort([l.create_individual("ind1")])
+
+    assert cohort.snp_count == 0
+    assert cohort.genotypes.shape == (1, 0)
+    assert cohort.chromosomes == []
+    assert list(cohort.offsets) == [0]
+
+
+def test_cohort_rsid_key_collision(l, monkeypatch):
+    import lineage.snps
+
+    monkeypatch.setattr(lineage.snps, "_get_other_id_key", lambda rsid: -1)
+    ind1 = create_individual(
+        l, "ind1", ["rs1", "i1"], ["1", "1"], [101, 102], ["AA", "CC"]
+    )
+    ind2 = create_individual(
+        l, "ind2", ["rs1", "i2"], ["1", "1"], [101, 103], ["AA", "CC"]
+    )
+
+    with pytest.raises(ValueError):
+        Cohort([ind1, ind2])
+
+
+def test_cohort_cMs(individuals):
+    genetic_map = {
+        "1": pd.DataFrame(
+            {"pos": [101, 102], "rate": [1e6, 2e6], "map": [0.0, 1.0]},
+            columns=["pos", "rate", "map"],
+        )
+    }
+    cohort = Cohort(individuals, genetic_map=genetic_map)
+
+    # rate of 0 upstream of the genetic map, and the last rate applies downstream
+    np.testing.assert_allclose(cohort.cMs[:3], [0, 0, 1])
+    assert np.isnan(cohort.cMs[3:]).all()
+
+
+def test_compute_cMs():
+    genetic_map = pd.DataFrame(
+        {"pos": [10, 20, 40], "rate": [1e5, 3e5, 2e5], "map": [0.0, 0.0, 0.0]},
+        columns=["pos", "rate", "map"],
+    )
+    cMs = compute_cMs(np.array([5, 10, 15, 20, 30, 50]), genetic_map)
+    np.testing.assert_allclose(cMs, [0, 0, 0.5, 1, 4, 9])
+
+
+def test_find_segments_thresholds():
+    match = np.array([True, True, True, False, True, True, False, False, True])
+    cMs = np.arange(9, dtype=float)
+
+    results = find_segments_thresholds(
+        match, cMs, [(1.5, 0), (0.5, 2), (0.5, 0), (3, 0)]
+    )
+
+    # runs separated by one SNP are stitched together after the cM threshold is applied
+    np.testing.assert_array_equal(results[0][0], [[0, 6]])
+    np.testing.assert_allclose(results[0][1], [5])
+    np.testing.assert_array_equal(results[1][0], [[0, 6]])
+    np.testing.assert_array_equal(results[2][0], [[0, 6], [8, 9]])
+    np.testing.assert_allclose(results[2][1], [5, 1])
+    assert results[3][0].shape == (0, 2)
+
+
+def test_create_cohort(l, individuals):
+    cohort = l.create_cohort(individuals, panel="intersection")
+
+    assert cohort.snp_count == 2
+    assert cohort.cMs.shape == (2,)
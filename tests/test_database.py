@@ -0,0 +1,102 @@
+"""
+Copyright (C) 2019 Andrew Riha
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+import pandas as pd
+import pytest
+
+from lineage.database import MatchDatabase
+
+
+def create_shared_dna_df(segments, names=None):
+    df = pd.DataFrame(segments, columns=["chrom", "start", "end", "cMs", "snps"])
+    if names is not None:
+        df.insert(0, "name", names)
+    df.index.name = "segment"
+    df.index = df.index + 1
+    return df
+
+
+@pytest.fixture
+def db():
+    db = MatchDatabase()
+    db.add_shared_dna(
+        "ind2",
+        "ind1",
+        create_shared_dna_df([("1", 100, 200, 10.0, 1200), ("7", 5e6, 15e6, 15.0, 1500)]),
+        create_shared_dna_df([("7", 5e6, 12e6, 8.0, 1300)]),
+    )
+    db.add_matches(
+        "ind3",
+        create_shared_dna_df(
+            [("7", 18e6, 30e6, 12.0, 2000), ("2", 1, 1000, 30.0, 3000)],
+            names=["ind1", "ind2"],
+        ),
+        create_shared_dna_df([], names=[]),
+    )
+    yield db
+    db.close()
+
+
+def test_get_matches(db):
+    matches = db.get_matches("ind1")
+    assert list(matches.index) == ["ind2", "ind3"]
+    assert list(matches["cMs"]) == [25.0, 12.0]
+    assert list(matches["segments"]) == [2, 1]
+    assert list(matches["longest"]) == [15.0, 12.0]
+
+    assert list(db.get_matches("ind1", min_cMs=20).index) == ["ind2"]
+    assert list(db.get_matches("ind2", shared="two")["cMs"]) == [8.0]
+    assert len(db.get_matches("ind4")) == 0
+
+
+def test_get_segments(db):
+    segments = db.get_segments(chrom="7", start=10e6, end=20e6)
+    assert list(segments["name1"]) == ["ind1", "ind1", "ind1"]
+    assert list(segments["name2"]) == ["ind2", "ind2", "ind3"]
+    assert list(segments["shared"]) == ["one", "two", "one"]
+
+    segments = db.get_segments("ind3", min_cMs=20)
+    assert list(segments["name1"]) == ["ind2"]
+    assert list(segments["start"]) == [1]
+
+
+def test_add_shared_dna_replace(db):
+    db.add_shared_dna(
+        "ind1",
+        "ind2",
+        create_shared_dna_df([("1", 100, 300, 20.0, 1500)]),
+        create_shared_dna_df([]),
+    )
+    assert list(db.get_matches("ind2")["cMs"]) == [30.0, 20.0]
+    assert len(db.get_segments("ind1", shared="two")) == 0
+
+
+def test_persistence(tmpdir):
+    path = str(tmpdir.join("matches.db"))
+    db = MatchDatabase(path)
+    db.add_shared_dna(
+        "ind1",
+        "ind2",
+        create_shared_dna_df([("1", 100, 300, 20.0, 1500)]),
+        create_shared_dna_df([]),
+    )
+    db.close()
+
+    db = MatchDatabase(path)
+    assert list(db.get_matches("ind2").index) == ["ind1"]
+    db.close()
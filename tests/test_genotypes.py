@@ -0,0 +1,204 @@
+"""
+Copyright (C) 2019 Andrew Riha
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+import numpy as np
+import pandas as pd
+
+from lineage.genotypes import (
+    ALLELES,
+    NULL,
+    PLOIDY,
+    UNKNOWN,
+    discordant_duo,
+    discordant_trio,
+    encode_genotypes,
+    get_code_map,
+    is_homozygous,
+    one_chrom_match,
+    two_chrom_match,
+)
+
+
+def test_encode_genotypes():
+    codes = encode_genotypes(["AG", "GA", "A", np.nan, "ID", "ACG", "AA", "BN", "NB"])
+    assert codes.dtype == np.uint8
+    assert codes[0] == codes[1]
+    assert codes[3] == NULL
+    assert codes[5] == UNKNOWN
+    assert codes[7] == codes[8]
+    assert list(PLOIDY[codes]) == [2, 2, 1, 0, 2, 0, 2, 2, 2]
+    assert list(is_homozygous(codes)) == [
+        False,
+        False,
+        False,
+        False,
+        False,
+        False,
+        True,
+        False,
+        False,
+    ]
+
+
+def test_encode_genotypes_fixed_codes():
+    # codes don't depend on the genotypes encoded before
+    assert list(encode_genotypes(["NB", "A", "XA", "AA", "BN"])) == [73, 1, UNKNOWN, 2, 73]
+    assert list(encode_genotypes(["A", "AA", "BN", "NB"])) == [1, 2, 73, 73]
+
+
+def test_get_code_map():
+    # codes of a table with the alleles in another order, and with an allele not in `ALLELES`
+    codes = encode_genotypes(["AG", "N", "GG", np.nan, "ACG"])
+    code_map = get_code_map(ALLELES, "XNGA")
+    assert list(code_map[codes]) == [13, 3, 9, NULL, UNKNOWN]
+    assert list(get_code_map("XNGA")[code_map[codes]]) == list(codes)
+    assert get_code_map("XA")[1] == UNKNOWN
+
+
+def test_discordant_duo():
+    child = encode_genotypes(["AA", "AC", "A", "A", "AC", np.nan, "AC"])
+    parent = encode_genotypes(["CC", "CG", "C", "A", np.nan, "AA", "A"])
+    assert list(discordant_duo(child, parent)) == [
+        True,
+        False,
+        True,
+        False,
+        False,
+        False,
+        False,
+    ]
+
+
+def test_discordant_trio():
+    child = encode_genotypes(["AC", "AC", "AC", "AA", np.nan])
+    parent1 = encode_genotypes(["AA", "GG", "AA", "AA", "AA"])
+    parent2 = encode_genotypes(["AA", "CC", "CC", np.nan, "AA"])
+    assert list(discordant_trio(child, parent1, parent2)) == [
+        True,
+        True,
+        False,
+        False,
+        False,
+    ]
+
+
+def test_discordant_trio_batch():
+    child = encode_genotypes(["AC", "AA", "GG"])
+    parent1 = encode_genotypes(["AA", "AA", "CC"])
+    parent2 = encode_genotypes(["AA", "CC", "CC"])
+    trios = discordant_trio(
+        np.stack([child, child]), np.stack([parent1, parent2]), np.stack([parent2, parent1])
+    )
+    assert trios.shape == (2, 3)
+    assert (trios[0] == discordant_trio(child, parent1, parent2)).all()
+    assert (trios[1] == discordant_trio(child, parent2, parent1)).all()
+
+
+def test_one_chrom_match():
+    codes1 = encode_genotypes(["AC", "AC", "A", "A", "AC", np.nan, "ACG"])
+    codes2 = encode_genotypes(["CG", "GT", "A", "C", np.nan, "GT", "ACG"])
+    assert list(one_chrom_match(codes1, codes2)) == [
+        True,
+        False,
+        True,
+        False,
+        True,
+        True,
+        False,
+    ]
+
+
+def test_two_chrom_match():
+    codes1 = encode_genotypes(["AC", "AC", "A", "AA", np.nan])
+    codes2 = encode_genotypes(["CA", "AA", "A", "AA", "GT"])
+    assert list(two_chrom_match(codes1, codes2)) == [True, False, False, True, True]
+
+
+def random_genotypes(rng, n):
+    # diploid, haploid, and null genotypes
+    alleles = np.array(list("ACGT"), dtype=object)
+    genotypes = alleles[rng.randint(0, 4, n)] + alleles[rng.randint(0, 4, n)]
+    haploid = rng.rand(n) < 0.2
+    genotypes[haploid] = alleles[rng.randint(0, 4, haploid.sum())]
+    genotypes[rng.rand(n) < 0.1] = np.nan
+    return pd.Series(genotypes)
+
+
+def discordant_duo_str(g1, g2):
+    # string expressions of `find_discordant_snps` that preceded the kernels
+    return g2.notnull() & (
+        (g1.str.len() == 1) & (g2.str.len() == 1) & (g1 != g2)
+    ) | (
+        (g1.str.len() == 2)
+        & (g2.str.len() == 2)
+        & (g1.str[0] != g2.str[0])
+        & (g1.str[0] != g2.str[1])
+        & (g1.str[1] != g2.str[0])
+        & (g1.str[1] != g2.str[1])
+    )
+
+
+def test_kernels_random():
+    rng = np.random.RandomState(0)
+    n = 20000
+    g1, g2, g3 = (random_genotypes(rng, n) for _ in range(3))
+    codes1, codes2, codes3 = (encode_genotypes(g) for g in (g1, g2, g3))
+
+    np.testing.assert_array_equal(
+        discordant_duo(codes1, codes2), discordant_duo_str(g1, g2).values
+    )
+
+    discordant = (
+        discordant_duo_str(g1, g2)
+        | discordant_duo_str(g1, g3)
+        | (
+            g2.notnull()
+            & g3.notnull()
+            & (g2.str.len() == 2)
+            & (g2.str[0] == g2.str[1])
+            & (g2 == g3)
+            & (g1 != g2)
+        )
+    )
+    # `find_discordant_snps` removed the nulls of the child before comparing
+    discordant &= g1.notnull()
+    np.testing.assert_array_equal(
+        discordant_trio(codes1, codes2, codes3), discordant.values
+    )
+
+    # string expressions of `find_shared_dna` that preceded the kernels
+    one_chrom = (
+        g1.isnull()
+        | g2.isnull()
+        | (g1.str[0] == g2.str[0])
+        | (g1.str[0] == g2.str[1])
+        | (g1.str[1] == g2.str[0])
+        | (g1.str[1] == g2.str[1])
+    )
+    np.testing.assert_array_equal(one_chrom_match(codes1, codes2), one_chrom.values)
+
+    two_chrom = (
+        g1.isnull()
+        | g2.isnull()
+        | (
+            (g1.str.len() == 2)
+            & (g2.str.len() == 2)
+            & ((g1 == g2) | ((g1.str[0] == g2.str[1]) & (g1.str[1] == g2.str[0])))
+        )
+    )
+    np.testing.assert_array_equal(two_chrom_match(codes1, codes2), two_chrom.values)
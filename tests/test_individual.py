@@ -25,7 +25,7 @@ import numpy as np
 import pandas as pd
 import pytest
 
-from lineage.snps import sort_snps
+from lineage.snps import CHROM_DTYPE, sort_snps
 from tests.test_lineage import simulate_snps
 
 
@@ -34,12 +34,12 @@ def create_snp_df(rsid, chrom, pos, genotype):
         {"rsid": rsid, "chrom": chrom, "pos": pos, "genotype": genotype},
         columns=["rsid", "chrom", "pos", "genotype"],
     )
+    df["chrom"] = df["chrom"].astype(CHROM_DTYPE)
     df = df.set_index("rsid")
     return df
 
 
-@pytest.fixture(scope="module")
-def generic_snps():
+def generic_snps_df():
     return create_snp_df(
         rsid=["rs1", "rs2", "rs3", "rs4", "rs5"],
         chrom=["1", "1", "1", "1", "1"],
@@ -48,6 +48,11 @@ def generic_snps():
     )
 
 
+@pytest.fixture(scope="module")
+def generic_snps():
+    return generic_snps_df()
+
+
 @pytest.fixture(scope="module")
 def snps_NCBI36():
     return create_snp_df(
@@ -214,6 +219,67 @@ def test_chromosomes_summary_None(l):
     assert ind.chromosomes_summary == ""
 
 
+def test_get_summary(l):
+    ind = l.create_individual("test", "tests/input/GRCh37.csv")
+    assert ind.get_summary() == {
+        "name": "test",
+        "source": "generic",
+        "assembly": "GRCh37",
+        "build": 37,
+        "snp_count": 4,
+        "chromosomes": "1, 3",
+        "sex": "",
+    }
+
+
+def test_get_summary_None(l):
+    ind = l.create_individual("")
+    assert ind.get_summary() is None
+
+
+def test_cached_stats_invalidated(l):
+    ind = l.create_individual("", "tests/input/chromosomes.csv")
+    assert ind.snp_count == 6
+    ind.chromosomes.append("Y")
+    assert ind.chromosomes == ["1", "2", "3", "5", "PAR", "MT"]
+    ind.load_snps("tests/input/GRCh37.csv")
+    assert ind.snp_count == 10
+    ind._set_snps(ind._snps.iloc[:2])
+    assert ind.snp_count == 2
+    assert ind.chromosomes == ["1"]
+
+
+def test_fingerprint(l):
+    ind = l.create_individual("")
+    assert ind.fingerprint is None
+
+    ind.load_snps("tests/input/GRCh37.csv")
+    fingerprint = ind.fingerprint
+    assert fingerprint == l.create_individual("", "tests/input/GRCh37.csv").fingerprint
+
+    ind.load_snps("tests/input/GRCh37.csv")
+    assert ind.fingerprint == fingerprint
+
+    ind.load_snps("tests/input/chromosomes.csv")
+    assert ind.fingerprint != fingerprint
+
+
+def test_chromosome_fingerprints(l):
+    ind = l.create_individual("", "tests/input/chromosomes.csv")
+    fingerprints = ind.chromosome_fingerprints
+    assert sorted(fingerprints.keys()) == ["1", "2", "3", "5", "MT", "PAR"]
+
+    snps = ind.snps
+    snps.loc["rs2", "genotype"] = "CT"
+    ind._set_snps(snps)
+
+    assert [
+        chrom
+        for chrom in fingerprints
+        if ind.chromosome_fingerprints[chrom] != fingerprints[chrom]
+    ] == ["2"]
+
+
 def test_build(l):
     ind = l.create_individual("", "tests/input/NCBI36.csv")
     assert ind.build == 36
@@ -227,6 +293,59 @@ def test_load_snps_list(l, snps_GRCh37):
     assert ind.source == "generic, generic"
 
 
+def test_load_snps_different_chromosomes(l, tmpdir):
+    # only the second file has a non-standard chromosome
+    file1 = str(tmpdir.join("file1.csv"))
+    file2 = str(tmpdir.join("file2.csv"))
+
+    with open(file1, "w") as f:
+        f.write("rsid,chromosome,position,genotype\n")
+        f.write("rs1,1,101,AA\nrs2,1,102,CC\nrs3,3,103,GG\n")
+
+    with open(file2, "w") as f:
+        f.write("rsid,chromosome,position,genotype\n")
+        f.write("rs1,1,101,AA\nrs4,XY,104,TT\nrs3,XY,103,GG\n")
+
+    ind = l.create_individual("", [file1, file2])
+
+    assert list(ind.snps.index) == ["rs1", "rs2", "rs3", "rs4"]
+    assert list(ind.snps["chrom"]) == ["1", "1", "3", "XY"]
+    assert list(ind.discrepant_positions.index) == ["rs3"]
+
+
+def test_get_snps_no_copy(l, snps_GRCh37):
+    ind = l.create_individual("", "tests/input/GRCh37.csv")
+    snps = ind.get_snps(copy=False)
+    assert np.shares_memory(snps["pos"].values, ind._snps["pos"].values)
+    snps["genotype2"] = snps["genotype"]
+    snps.drop("rs3094315", inplace=True)
+    pd.testing.assert_frame_equal(ind.snps, snps_GRCh37)
+    assert not np.shares_memory(ind.snps["pos"].values, ind._snps["pos"].values)
+
+
+def test_get_snps_no_copy_assign(l, snps_GRCh37):
+    ind = l.create_individual("", "tests/input/GRCh37.csv")
+    fingerprint = ind.fingerprint
+    snps = ind.get_snps(copy=False)
+    assert np.shares_memory(snps["pos"].values, ind._snps["pos"].values)
+
+    snps = snps.assign(pos=snps["pos"] + 1, genotype="CC")
+    assert (snps["pos"].values == snps_GRCh37["pos"].values + 1).all()
+    pd.testing.assert_frame_equal(ind.snps, snps_GRCh37)
+    assert ind.fingerprint == fingerprint
+
+
+def test_get_snps_no_snps(l):
+    ind = l.create_individual("")
+    assert ind.get_snps(copy=False) is None
+
+
+def test_load_snps_region(l):
+    ind = l.create_individual("")
+    ind.load_snps("tests/input/23andme.txt", region="1:2-3")
+    pd.testing.assert_frame_equal(ind.snps, sort_snps(generic_snps_df().iloc[1:3]))
+
+
 def test_load_snps_None(l):
     ind = l.create_individual("")
     with pytest.raises(TypeError):
@@ -458,6 +577,89 @@ def test_save_snps(l, snps_GRCh37):
     pd.testing.assert_frame_equal(ind_saved_snps.snps, snps_GRCh37)
 
 
+def test_save_snps_probe(l):
+    from lineage.snps import SNPs
+
+    ind = l.create_individual("test save snps", "tests/input/GRCh37.csv")
+    summary = SNPs.probe(ind.save_snps())
+    assert summary["source"] == "generic"
+    assert summary["build"] == 37
+    assert summary["snp_count"] == 4
+
+
+def test_save_snps_bgzip(l, snps_GRCh37):
+    ind = l.create_individual("test save snps", "tests/input/GRCh37.csv")
+    file = ind.save_snps(bgzip=True)
+    assert os.path.relpath(file) == "output/test_save_snps_lineage_GRCh37.csv.gz"
+    assert os.path.exists(file + ".idx")
+    ind_saved_snps = l.create_individual("", file)
+    pd.testing.assert_frame_equal(ind_saved_snps.snps, snps_GRCh37)
+    ind_saved_snps = l.create_individual("")
+    ind_saved_snps.load_snps(file, chroms=["3"])
+    pd.testing.assert_frame_equal(ind_saved_snps.snps, snps_GRCh37.loc[["rs11928389"]])
+
+
+def test_save_snps_bgzip_filename(l, snps_GRCh37):
+    ind = l.create_individual("", "tests/input/GRCh37.csv")
+    file = ind.save_snps("bgzip_filename.csv", bgzip=True)
+    assert os.path.relpath(file) == "output/bgzip_filename.csv.gz"
+    pd.testing.assert_frame_equal(l.create_individual("", file).snps, snps_GRCh37)
+
+
+def test_save_snps_bgzip_stale_index(l, snps_GRCh37):
+    from lineage import bgzf
+
+    ind = l.create_individual("test save snps", "tests/input/GRCh37.csv")
+    file = ind.save_snps(bgzip=True)
+    assert bgzf.has_index(file)
+
+    # file overwritten without its index (e.g., by another program)
+    with gzip.open(file, "wt") as f:
+        f.write("rsid,chromosome,position,genotype\nrs1,3,1,AA\nrs2,4,1,CC\n")
+    assert os.path.exists(file + ".idx")
+    assert not bgzf.has_index(file)
+
+    ind_saved_snps = l.create_individual("")
+    ind_saved_snps.load_snps(file, chroms=["3"])
+    assert list(ind_saved_snps.snps.index) == ["rs1"]
+
+    # index is replaced when the file is saved again
+    assert bgzf.has_index(ind.save_snps(bgzip=True))
+
+
+def test_save_snps_bgzip_region(l):
+    from lineage import bgzf
+
+    ind = l.create_individual("test save snps")
+    ind._build = 37
+    positions = np.arange(1, 1000000, 100)
+    ind._snps = create_snp_df(
+        rsid=["rs" + str(x + 1) for x in range(len(positions) * 2)],
+        chrom=["1"] * len(positions) + ["2"] * len(positions),
+        pos=np.concatenate([positions, positions]),
+        genotype="AA",
+    )
+    file = ind.save_snps(bgzip=True)
+
+    index = bgzf.read_index(file)
+    assert len(index.loc[index["chrom"] == "1"]) > 1
+    assert len(index.loc[index["chrom"] == "2"]) > 1
+
+    # file is readable as a (multi-member) gzip file
+    with gzip.open(file, "rt") as f:
+        assert len([line for line in f if not line.startswith("#")]) == 20001
+
+    ind_region = l.create_individual("")
+    ind_region.load_snps(file, region="2:500000-600000")
+    expected = ind.snps.loc[
+        (ind.snps["chrom"] == "2")
+        & (ind.snps["pos"] >= 500000)
+        & (ind.snps["pos"] <= 600000)
+    ]
+    pd.testing.assert_frame_equal(ind_region.snps, expected)
+    assert len(list(bgzf.read_lines(file, region=("1", 1, 1)))) < 10000
+
+
 def test_save_snps_specify_file(l, snps_GRCh37):
     ind = l.create_individual("test save snps", "tests/input/GRCh37.csv")
     assert os.path.relpath(ind.save_snps("snps.csv")) == "output/snps.csv"
@@ -0,0 +1,86 @@
+"""
+Copyright (C) 2019 Andrew Riha
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+import os
+
+import pytest
+
+from lineage import instrumentation
+from lineage.snps import SNPs
+
+
+@pytest.fixture
+def enabled():
+    instrumentation.reset_stats()
+    instrumentation.enable()
+    yield
+    instrumentation.disable()
+    instrumentation.reset_stats()
+
+
+def test_disabled():
+    instrumentation.reset_stats()
+
+    with instrumentation.stage("test.stage"):
+        instrumentation.count(10)
+
+    assert not instrumentation.is_enabled()
+    assert len(instrumentation.get_stats()) == 0
+
+
+def test_stage(enabled):
+    records = []
+    instrumentation.add_hook(records.append)
+
+    try:
+        for _ in range(2):
+            with instrumentation.stage("test.outer"):
+                with instrumentation.stage("test.inner"):
+                    instrumentation.count(10, 100)
+                instrumentation.count(1)
+    finally:
+        instrumentation.remove_hook(records.append)
+
+    stats = instrumentation.get_stats()
+    assert list(stats.index) == ["test.outer", "test.inner"]
+    assert list(stats["count"]) == [2, 2]
+    assert list(stats["rows"]) == [2, 20]
+    assert list(stats["bytes"]) == [0, 200]
+
+    assert [record.stage for record in records] == ["test.inner", "test.outer"] * 2
+    assert records[0].rows == 10 and records[0].bytes == 100
+
+
+def test_instrumented(enabled):
+    @instrumentation.instrumented("test.func")
+    def func(rows):
+        instrumentation.count(rows)
+        return rows
+
+    assert func(5) == 5
+    assert instrumentation.get_stats().loc["test.func", "rows"] == 5
+
+
+def test_snps(enabled):
+    path = "tests/input/23andme.txt"
+    s = SNPs(path)
+
+    stats = instrumentation.get_stats()
+    assert stats.loc["snps.parse", "rows"] == s.snp_count
+    assert stats.loc["snps.parse", "bytes"] == os.path.getsize(path)
+    assert stats.loc["snps.detect_build", "count"] == 1
@@ -16,11 +16,15 @@ along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 """
 
+from collections import OrderedDict
 import os
 import warnings
 
 import numpy as np
 import pandas as pd
+import pytest
+
+from lineage import Lineage
 
 
 def get_discordant_snps(ind, df):
@@ -210,6 +214,65 @@ def test_find_discordant_snps(l):
     assert os.path.exists("output/discordant_snps_ind1_ind2_ind3_GRCh37.csv")
 
 
+def test_find_mendelian_errors(l):
+    df = pd.read_csv(
+        "tests/input/discordant_snps.csv",
+        skiprows=1,
+        na_values="--",
+        names=["rsid", "chrom", "pos", "ind1", "ind2", "ind3"],
+        index_col=0,
+        dtype={"chrom": object, "pos": np.int64},
+    )
+
+    ind1 = get_discordant_snps(l.create_individual("ind1"), df)
+    ind2 = get_discordant_snps(l.create_individual("ind2"), df)
+    ind3 = get_discordant_snps(l.create_individual("ind3"), df)
+
+    # `ind1` is a child of `ind2` and `ind3`, and `ind3` is a child of `ind2`
+    snp_errors, edge_errors, individual_errors = l.find_mendelian_errors(
+        OrderedDict([(ind1, (ind2, ind3)), (ind3, (ind2, None))]), save_output=True
+    )
+
+    trio = l.find_discordant_snps(ind1, ind2, ind3)
+    duo = l.find_discordant_snps(ind3, ind2)
+    assert sorted(snp_errors.index) == sorted(trio.index.union(duo.index))
+    assert snp_errors.loc[duo.index.intersection(trio.index), "errors"].eq(2).all()
+
+    assert list(edge_errors["child"]) == ["ind1", "ind1", "ind3"]
+    assert list(edge_errors["parent"]) == ["ind2", "ind3", "ind2"]
+    assert list(edge_errors["errors"]) == [
+        len(l.find_discordant_snps(ind1, ind2)),
+        len(l.find_discordant_snps(ind1, ind3)),
+        len(duo),
+    ]
+
+    assert list(individual_errors.index) == ["ind1", "ind2", "ind3"]
+    assert list(individual_errors["errors"]) == [len(trio), 0, len(duo)]
+    assert individual_errors.loc["ind2", "edge_errors"] == (
+        edge_errors["errors"].iloc[0] + edge_errors["errors"].iloc[2]
+    )
+    assert individual_errors.loc["ind2", "snps"] == 0
+    assert os.path.exists("output/mendelian_errors_snps_GRCh37.csv")
+    assert os.path.exists("output/mendelian_errors_edges.csv")
+    assert os.path.exists("output/mendelian_errors_individuals.csv")
+
+
+def test_find_shared_dna_cached(l):
+    l._result_cache.clear()
+    ind1 = simulate_snps(l.create_individual("ind1"), pos_max=10000000)
+    ind2 = simulate_snps(l.create_individual("ind2"), pos_max=10000000)
+
+    results = l.find_shared_dna(ind1, ind2, save_output=False)
+    assert len(l._result_cache) == 1
+
+    for expected, result in zip(results, l.find_shared_dna(ind1, ind2, save_output=False)):
+        pd.testing.assert_frame_equal(expected, result)
+    assert len(l._result_cache) == 1
+
+    l.find_shared_dna(ind1, ind2, cM_threshold=1, save_output=False)
+    assert len(l._result_cache) == 2
+
+
 def test_find_shared_dna_two_chrom_shared(l):
     ind1 = simulate_snps(l.create_individual("ind1"))
     ind2 = simulate_snps(l.create_individual("ind2"))
@@ -369,3 +432,131 @@ def test_find_shared_dna_no_shared_dna(l):
     assert not os.path.exists("output/shared_genes_one_chrom_ind1_ind2_GRCh37.csv")
     assert not os.path.exists("output/shared_genes_two_chroms_ind1_ind2_GRCh37.csv")
     assert os.path.exists("output/shared_dna_ind1_ind2.png")
+
+
+def test_find_shared_dna_thresholds(simulated_family):
+    resources_dir, individuals = simulated_family
+    l = Lineage(resources_dir=resources_dir)
+    mother = l.create_individual("mother", individuals["mother"])
+    son = l.create_individual("son", individuals["son"])
+    thresholds = [(0.75, 1100), (5, 200), [0.75, 1100.0], (20, 15000)]
+
+    results = l.find_shared_dna_thresholds(mother, son, thresholds)
+
+    assert list(results.keys()) == [(0.75, 1100), (5.0, 200), (20.0, 15000)]
+    assert len(l._result_cache) == 3 * len(mother.chromosomes)
+    assert len(results[(5.0, 200)][0]) > 0
+    assert len(results[(20.0, 15000)][0]) == 0
+
+    # results are cached for find_shared_dna
+    for (cM_threshold, snp_threshold), shared_dna in results.items():
+        expected = l.find_shared_dna(
+            mother,
+            son,
+            cM_threshold=cM_threshold,
+            snp_threshold=snp_threshold,
+            save_output=False,
+        )
+        pd.testing.assert_frame_equal(shared_dna[0], expected[0])
+        pd.testing.assert_frame_equal(shared_dna[1], expected[1])
+    assert len(l._result_cache) == 3 * len(mother.chromosomes)
+
+    # results are the same as when computed separately
+    l._result_cache.clear()
+    expected = l.find_shared_dna(
+        mother, son, cM_threshold=5, snp_threshold=200, save_output=False
+    )
+    pd.testing.assert_frame_equal(results[(5.0, 200)][0], expected[0])
+    pd.testing.assert_frame_equal(results[(5.0, 200)][1], expected[1])
+
+
+def test_find_shared_dna_summary(simulated_family):
+    resources_dir, individuals = simulated_family
+    l = Lineage(resources_dir=resources_dir)
+    mother = l.create_individual("mother", individuals["mother"])
+    son = l.create_individual("son", individuals["son"])
+
+    summary = l.find_shared_dna_summary(mother, son)
+
+    # only the genetic map is loaded
+    assert l._resources._cytoBand_hg19 is None
+    assert len(l._result_cache) == len(mother.chromosomes)
+
+    one_chrom_shared_dna, two_chrom_shared_dna, _, _ = l.find_shared_dna(
+        mother, son, save_output=False
+    )
+    assert summary["one_chrom_segments"] == len(one_chrom_shared_dna)
+    assert summary["one_chrom_cMs"] == pytest.approx(one_chrom_shared_dna["cMs"].sum())
+    assert summary["one_chrom_longest_cMs"] == pytest.approx(
+        one_chrom_shared_dna["cMs"].max()
+    )
+    assert summary["one_chrom_cMs"] > 170
+    assert summary["two_chrom_segments"] == len(two_chrom_shared_dna)
+    assert summary["two_chrom_cMs"] == pytest.approx(two_chrom_shared_dna["cMs"].sum())
+
+    # segments cached by find_shared_dna are summarized
+    l._result_cache.clear()
+    l.find_shared_dna(mother, son, save_output=False)
+    assert l.find_shared_dna_summary(mother, son) == pytest.approx(summary)
+
+    summary = l.find_shared_dna_summary(mother, son, snp_threshold=20000)
+    assert summary["one_chrom_segments"] == 0
+    assert summary["one_chrom_cMs"] == 0
+    assert summary["one_chrom_longest_cMs"] == 0
+
+
+def test_find_shared_dna_rematch(simulated_family, tmpdir):
+    resources_dir, individuals = simulated_family
+    l = Lineage(resources_dir=resources_dir)
+    mother = l.create_individual("mother", individuals["mother"])
+    father = l.create_individual("father", individuals["father"])
+    kwargs = {"snp_threshold": 200, "save_output": False}
+    results = l.find_shared_dna(mother, father, **kwargs)
+    assert len(results[0]) == 0 and len(results[1]) == 0
+
+    # file with discrepant genotypes of SNPs of the father on chromosome 2 only; the SNPs
+    # are nulled when merged, so they match
+    snps = father.snps.loc[father.snps["chrom"] == "2"].iloc[1000:1300].copy()
+    snps["genotype"] = np.where(snps["genotype"] == "TT", "AA", "TT")
+    path = str(tmpdir.join("father_chrom_2.csv"))
+    snps.to_csv(path, header=["chromosome", "position", "genotype"], index_label="rsid")
+
+    fingerprints = father.chromosome_fingerprints
+    father.load_snps(path)
+    changed = [
+        chrom
+        for chrom in fingerprints
+        if fingerprints[chrom] != father.chromosome_fingerprints[chrom]
+    ]
+    assert changed == ["2"]
+
+    # only the shared DNA of the changed chromosome is computed
+    compute_shared_dna_segments = l._compute_shared_dna_segments
+    computed_chroms = []
+
+    def spy(individual1, individual2, thresholds, chroms=None):
+        computed_chroms.append(chroms)
+        return compute_shared_dna_segments(individual1, individual2, thresholds, chroms)
+
+    l._compute_shared_dna_segments = spy
+    rematch_results = l.find_shared_dna(mother, father, **kwargs)
+    assert computed_chroms == [["2"]]
+
+    # the nulled SNPs are a segment of shared DNA on chromosome 2
+    assert list(rematch_results[0]["chrom"]) == ["2"]
+    assert list(rematch_results[1]["chrom"]) == ["2"]
+
+    # results are the same as without a cache
+    l_uncached = Lineage(resources_dir=resources_dir, cache_size=0)
+    expected = l_uncached.find_shared_dna(
+        l_uncached.create_individual("mother", individuals["mother"]),
+        l_uncached.create_individual("father", [individuals["father"], path]),
+        **kwargs
+    )
+    pd.testing.assert_frame_equal(rematch_results[0], expected[0])
+    pd.testing.assert_frame_equal(rematch_results[1], expected[1])
+
+
+def test_find_shared_dna_thresholds_invalid(l):
+    with pytest.raises(ValueError):
+        l.find_shared_dna_thresholds(None, None, [(0.75,)])
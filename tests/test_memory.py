@@ -0,0 +1,79 @@
+"""
+Copyright (C) 2019 Andrew Riha
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+import sys
+
+import numpy as np
+import pandas as pd
+
+from lineage import Lineage
+from lineage.memory import get_size
+from lineage.resources import Resources, _ChromosomeCache
+
+
+def test_get_size():
+    df = pd.DataFrame({"genotype": ["AA", "AC", "CC"]})
+    assert get_size(df) == df.memory_usage(index=True, deep=True).sum()
+
+    arr = np.zeros(1000)
+    # shared objects are counted once
+    assert get_size([arr, arr]) == sys.getsizeof([arr, arr]) + arr.nbytes
+
+    data = {"1": {"mappings": [arr]}}
+    assert get_size(data) > arr.nbytes
+
+
+def test_individual(tmpdir):
+    l = Lineage(output_dir=str(tmpdir))
+    ind = l.create_individual("test")
+    assert list(ind.get_memory_usage().index) == [
+        "discrepant_positions",
+        "discrepant_genotypes",
+        "cache",
+    ]
+
+    ind.load_snps(["tests/input/GRCh37.csv", "tests/input/GRCh37.csv"])
+    ind.fingerprint
+    usage = ind.get_memory_usage()
+    assert usage["snps.genotype"] > 0
+    assert usage["cache"] > 0
+
+    ind.clear_cache()
+    ind.clear_discrepant_snps()
+    assert ind.get_memory_usage()["cache"] == 0
+    assert len(ind.discrepant_snps) == 0
+
+
+def test_resources(tmpdir):
+    r = Resources(resources_dir=str(tmpdir))
+    r._cytoBand_hg19 = pd.DataFrame({"chrom": ["1"] * 10, "start": np.arange(10)})
+    r._assembly_mapping_data["NCBI36_GRCh37"] = _ChromosomeCache()
+    r._assembly_mapping_data["NCBI36_GRCh37"].data["1"] = {"mappings": [{"ori": 1}]}
+
+    usage = r.get_memory_usage()
+    assert usage["cytoBand_hg19"] > 0
+    assert usage["assembly_mapping_data_NCBI36_GRCh37"] > 0
+    assert usage["genetic_map_HapMapII_GRCh37"] == 0
+
+    r.clear_cache(["assembly_mapping_data"])
+    usage = r.get_memory_usage()
+    assert usage["cytoBand_hg19"] > 0
+    assert "assembly_mapping_data_NCBI36_GRCh37" not in usage
+
+    r.clear_cache()
+    assert r.get_memory_usage().sum() == 0
@@ -0,0 +1,68 @@
+"""
+Copyright (C) 2019 Andrew Riha
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+import logging
+
+from lineage import Lineage, progress
+
+
+def test_report_without_callbacks():
+    progress.report("test.task", 1, 2)
+
+
+def test_callback_error():
+    def callback(p):
+        raise ValueError(p.task)
+
+    progress.add_callback(callback)
+
+    try:
+        progress.report("test.task", 1, 1)
+    finally:
+        progress.remove_callback(callback)
+
+
+def test_load_snps(tmpdir):
+    records = []
+    progress.add_callback(records.append)
+
+    try:
+        l = Lineage(output_dir=str(tmpdir))
+        ind = l.create_individual("test")
+        ind.load_snps(["tests/input/23andme.txt", "tests/input/23andme.txt"])
+    finally:
+        progress.remove_callback(records.append)
+
+    assert [(p.task, p.done, p.total) for p in records] == [
+        ("individual.load_snps", 1, 2),
+        ("individual.load_snps", 2, 2),
+    ]
+    assert records[-1].item == "tests/input/23andme.txt"
+
+
+def test_logging(caplog):
+    assert any(
+        isinstance(handler, logging.NullHandler)
+        for handler in logging.getLogger("lineage").handlers
+    )
+
+    with caplog.at_level(logging.INFO, logger="lineage"):
+        l = Lineage()
+        l.create_individual("test", "tests/input/23andme.txt")
+
+    assert "Loading tests/input/23andme.txt" in caplog.text
@@ -16,7 +16,11 @@ along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 """
 
+import gzip
+import io
+import json
 import os
+import tarfile
 import warnings
 
 import pytest
@@ -147,3 +151,121 @@ def test__download_file_invalid_dir(resource):
     resource._resources_dir = None
     result = resource._download_file("", "")
     assert result is None
+
+
+def create_genetic_map_tar(path):
+    with tarfile.open(path, "w:gz") as tar:
+        for chrom in ["1", "2", "X", "X_par1", "X_par2"]:
+            data = (
+                "Chromosome\tPosition(bp)\tRate(cM/Mb)\tMap(cM)\n"
+                "chr{0}\t1\t1.0\t0.0\n"
+                "chr{0}\t1000000\t0.0\t1.0\n".format(chrom)
+            ).encode()
+            info = tarfile.TarInfo("genetic_map_GRCh37_chr{}.txt".format(chrom))
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+
+
+def create_assembly_mapping_tar(path):
+    with tarfile.open(path, "w:gz") as tar:
+        for chrom in ["1", "2", "X"]:
+            data = json.dumps({"mappings": [], "chrom": chrom}).encode()
+            info = tarfile.TarInfo(chrom + ".json")
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+
+
+def test__load_genetic_map_chroms(tmpdir):
+    from lineage.resources import Resources
+
+    path = str(tmpdir.join("genetic_map_HapMapII_GRCh37.tar.gz"))
+    create_genetic_map_tar(path)
+
+    genetic_map = Resources._load_genetic_map(path, ["X"])
+    assert list(genetic_map.keys()) == ["X"]
+    assert len(genetic_map["X"]) == 6
+
+
+def test_get_genetic_map_HapMapII_GRCh37_chroms(tmpdir):
+    from lineage.resources import Resources
+
+    create_genetic_map_tar(str(tmpdir.join("genetic_map_HapMapII_GRCh37.tar.gz")))
+    r = Resources(resources_dir=str(tmpdir))
+
+    genetic_map = r.get_genetic_map_HapMapII_GRCh37(["2", "Y"])
+    assert list(genetic_map.keys()) == ["2"]
+    assert r._genetic_map_HapMapII_GRCh37.missing == {"Y"}
+    assert not r._genetic_map_HapMapII_GRCh37.complete
+
+    genetic_map = r.get_genetic_map_HapMapII_GRCh37()
+    assert sorted(genetic_map.keys()) == ["1", "2", "X"]
+    assert r._genetic_map_HapMapII_GRCh37.complete
+
+
+def test_get_assembly_mapping_data_chroms(tmpdir):
+    from lineage.resources import Resources
+
+    create_assembly_mapping_tar(str(tmpdir.join("NCBI36_GRCh37.tar.gz")))
+    r = Resources(resources_dir=str(tmpdir))
+    # skip verification (and download) of the full set of chromosomes
+    r._verified_assembly_mapping_paths.add(str(tmpdir.join("NCBI36_GRCh37.tar.gz")))
+
+    assembly_mapping_data = r.get_assembly_mapping_data("NCBI36", "GRCh37", ["X"])
+    assert list(assembly_mapping_data.keys()) == ["X"]
+    assert assembly_mapping_data["X"]["chrom"] == "X"
+
+
+def create_knownGene_gz(path, chroms):
+    with gzip.open(path, "wt") as f:
+        for i, chrom in enumerate(chroms):
+            f.write(
+                "uc{0}\t{1}\t+\t1\t2\t1\t2\t1\t1,\t2,\tP{0}\tA{0}\n".format(i, chrom)
+            )
+
+
+def test_get_knownGene_hg19_chroms(tmpdir):
+    from lineage.resources import Resources
+
+    path = str(tmpdir.join("knownGene_hg19.txt.gz"))
+    create_knownGene_gz(path, ["chr1", "chr7", "chr7", "chrX"])
+    r = Resources(resources_dir=str(tmpdir))
+
+    df = r.get_knownGene_hg19(["7"])
+    assert list(df.index) == ["uc1", "uc2"]
+    assert list(df["chrom"]) == ["7", "7"]
+
+    # the file is split into a file per chromosome once
+    assert sorted(os.listdir(path + ".chroms")) == [
+        "1.txt.gz",
+        "7.txt.gz",
+        "X.txt.gz",
+        "source.txt",
+    ]
+    r._get_knownGene_chrom = None
+    assert list(r.get_knownGene_hg19(["X", "Y"]).index) == ["uc3"]
+    df = Resources(resources_dir=str(tmpdir)).get_knownGene_hg19(["1"])
+    assert list(df.index) == ["uc0"]
+
+    # the file is split again if it changes
+    create_knownGene_gz(path, ["chr2", "chr7"])
+    del r._get_knownGene_chrom
+    r.clear_cache(["knownGene_hg19"])
+    assert list(r.get_knownGene_hg19(["7"]).index) == ["uc1"]
+    assert list(r.get_knownGene_hg19(["1"]).index) == []
+
+
+def test_get_kgXref_hg19_chroms(tmpdir):
+    from lineage.resources import Resources
+
+    create_knownGene_gz(
+        str(tmpdir.join("knownGene_hg19.txt.gz")), ["chr1", "chr7", "chr7", "chrX"]
+    )
+    with gzip.open(str(tmpdir.join("kgXref_hg19.txt.gz")), "wt") as f:
+        for i in [3, 2, 1, 0]:
+            f.write("uc{0}\tm\ts\td\tG{0}\tr\tp\tdesc\t\t\n".format(i))
+    r = Resources(resources_dir=str(tmpdir))
+
+    df = r.get_kgXref_hg19(["7"])
+    assert list(df.index) == ["uc2", "uc1"]
+    assert list(df["geneSymbol"]) == ["G2", "G1"]
+    assert list(r.get_kgXref_hg19(["X"])["geneSymbol"]) == ["G3"]
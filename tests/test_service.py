@@ -0,0 +1,216 @@
+"""
+Copyright (C) 2019 Andrew Riha
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+import json
+import os
+import socket
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+from lineage import Lineage
+from lineage.service import MatchService, ServiceBusy, create_server
+
+
+@pytest.fixture(scope="module")
+def service(tmpdir_factory, simulated_family):
+    resources_dir, individuals = simulated_family
+    l = Lineage(
+        output_dir=str(tmpdir_factory.mktemp("output")), resources_dir=resources_dir
+    )
+    s = MatchService(l, workers=2)
+
+    for name, path in individuals.items():
+        s.load(name, path)
+
+    yield s
+    s.shutdown()
+
+
+@pytest.fixture(scope="module")
+def server(service):
+    server = create_server(service, port=0)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+    yield "http://{}:{}".format(*server.server_address)
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+
+def request(url, data=None, method=None):
+    if data is not None:
+        data = json.dumps(data).encode()
+
+    req = urllib.request.Request(url, data=data, method=method)
+
+    try:
+        with urllib.request.urlopen(req) as response:
+            return response.status, json.loads(response.read().decode())
+    except urllib.error.HTTPError as err:
+        return err.code, json.loads(err.read().decode())
+
+
+def test_compare(service):
+    assert sorted(service.get_individuals().keys()) == ["father", "mother", "son"]
+
+    result = service.compare(["mother", "son"])
+    assert len(result["two_chrom_shared_dna"]) == 0
+    assert sum(segment["cMs"] for segment in result["one_chrom_shared_dna"]) > 170
+
+    result = service.compare(["mother", "father"])
+    assert result["one_chrom_shared_dna"] == []
+
+    result = service.compare(["son", "mother", "father"], type="discordant_snps")
+    assert isinstance(result["discordant_snps"], list)
+
+
+def test_invalid(service):
+    with pytest.raises(KeyError):
+        service.compare(["mother", "daughter"])
+
+    with pytest.raises(ValueError):
+        service.compare(["mother", "son"], type="ibd")
+
+    with pytest.raises(ValueError):
+        service.compare(["mother"])
+
+    with pytest.raises(ValueError):
+        service.load("missing", "missing.txt")
+
+
+def test_remap(service):
+    result = service.remap("son", 37, "son.csv")
+    assert os.path.exists(result["path"])
+    assert service.get_individual("son").build == 37
+
+
+def test_remap_invalid_filename(service):
+    for filename in ["../son.csv", "/tmp/son.csv", "dir/son.csv", "..", 1]:
+        with pytest.raises(ValueError):
+            service.remap("son", 37, filename)
+
+
+def test_load_data_dir(simulated_family):
+    path = simulated_family[1]["mother"]
+    s = MatchService(Lineage(), workers=1, data_dir=os.path.dirname(path))
+
+    try:
+        assert s.load("mother", os.path.basename(path))["sex"] == "Female"
+        assert s.load("mother", [path])["sex"] == "Female"
+
+        for raw_data in ["../x.txt", "/etc/passwd", [path, "../x.txt"]]:
+            with pytest.raises(ValueError):
+                s.load("x", raw_data)
+    finally:
+        s.shutdown()
+
+
+def test_busy(simulated_family):
+    s = MatchService(Lineage(), workers=1, max_queue=0)
+    started = threading.Event()
+    release = threading.Event()
+
+    def block():
+        started.set()
+        release.wait()
+
+    thread = threading.Thread(target=s._run, args=(block,))
+    thread.start()
+    started.wait()
+
+    try:
+        with pytest.raises(ServiceBusy):
+            s.load("mother", simulated_family[1]["mother"])
+        assert s.get_status()["rejected"] == 1
+    finally:
+        release.set()
+        thread.join()
+        s.shutdown()
+
+    assert s.get_status()["pending"] == 0
+
+
+def test_http(service, server):
+    status, body = request(server + "/status")
+    assert status == 200
+    assert body["workers"] == 2
+
+    status, body = request(server + "/individuals")
+    assert body["son"]["sex"] == "Male"
+
+    status, body = request(server + "/compare", {"individuals": ["mother", "son"]})
+    assert status == 200
+    assert len(body["one_chrom_shared_dna"]) > 0
+
+    status, body = request(server + "/compare", {"individuals": ["mother", "x"]})
+    assert status == 404
+
+    status, body = request(server + "/compare", {"individuals": ["mother"], "x": 1})
+    assert status == 400
+
+    status, body = request(server + "/individuals", {"name": "x"})
+    assert status == 400
+
+    status, body = request(
+        server + "/remap", {"individual": "son", "build": 37, "filename": "../son.csv"}
+    )
+    assert status == 400
+
+    status, body = request(server + "/unknown")
+    assert status == 404
+
+
+def test_http_load(service, server, simulated_family):
+    path = simulated_family[1]["father"]
+    status, body = request(server + "/individuals", {"name": "f", "raw_data": path})
+    assert status == 200
+    assert body["sex"] == "Male"
+
+    status, body = request(server + "/individuals/f", method="DELETE")
+    assert status == 200
+    assert "f" not in service.get_individuals()
+
+
+@pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="no Unix sockets")
+def test_unix_socket(tmpdir, service):
+    path = str(tmpdir.join("lineage.sock"))
+    server = create_server(service, socket_path=path)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(path)
+            sock.sendall(b"GET /status HTTP/1.0\r\n\r\n")
+            response = b""
+            while True:
+                data = sock.recv(4096)
+                if not data:
+                    break
+                response += data
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join()
+
+    headers, body = response.decode().split("\r\n\r\n", 1)
+    assert headers.startswith("HTTP/1.0 200")
+    assert json.loads(body)["individuals"] >= 3
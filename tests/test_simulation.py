@@ -0,0 +1,140 @@
+"""
+Copyright (C) 2019 Andrew Riha
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+import io
+import os
+import tarfile
+
+import numpy as np
+import pytest
+
+from lineage.resources import Resources
+from lineage.simulation import Simulator
+from lineage.snps import SNPs
+
+
+@pytest.fixture(scope="module")
+def resources(tmpdir_factory):
+    resources_dir = str(tmpdir_factory.mktemp("resources"))
+
+    # recombination rate of 1 cM/Mb
+    regions = {
+        "1": (0, 100000000),
+        "2": (0, 80000000),
+        "X_par1": (0, 2699520),
+        "X": (2699521, 154931043),
+        "X_par2": (154931044, 155270560),
+    }
+
+    path = os.path.join(resources_dir, "genetic_map_HapMapII_GRCh37.tar.gz")
+    with tarfile.open(path, "w:gz") as tar:
+        for chrom, (start, end) in regions.items():
+            data = "Chromosome\tPosition(bp)\tRate(cM/Mb)\tMap(cM)\n"
+            data += "chr{0}\t{1}\t1.0\t0.0\nchr{0}\t{2}\t1.0\t0.0\n".format(chrom, start, end)
+            data = data.encode()
+
+            info = tarfile.TarInfo("genetic_map_GRCh37_chr{}.txt".format(chrom))
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+
+    return Resources(resources_dir=resources_dir)
+
+
+@pytest.fixture(scope="module")
+def simulator(resources):
+    return Simulator(resources, snp_count=20000, seed=0)
+
+
+@pytest.fixture(scope="module")
+def family(simulator):
+    return simulator.create_pedigree(
+        [
+            ("mother", None, None, "Female"),
+            ("father", None, None, "Male"),
+            ("daughter", "mother", "father", "Female"),
+            ("son", "mother", "father", "Male"),
+            ("unrelated", None, None, None),
+        ]
+    )
+
+
+def test_panel(simulator):
+    assert simulator.chromosomes == ["1", "2", "X", "Y", "MT"]
+    assert simulator.snp_count > 19000
+
+
+def test_get_shared_dna(simulator, family):
+    # a parent and child share one chromosome everywhere
+    one, two = simulator.get_shared_dna(family["mother"], family["son"])
+    assert list(one["chrom"]) == ["1", "2", "X"]
+    assert len(two) == 0
+    assert one.loc[1, "cMs"] > 99
+
+    # fathers don't pass an X chromosome to sons
+    one, two = simulator.get_shared_dna(family["father"], family["son"])
+    assert list(one["chrom"]) == ["1", "2"]
+
+    # siblings share one and two chromosomes in places
+    one, two = simulator.get_shared_dna(family["daughter"], family["son"])
+    assert 0 < one["cMs"].sum() < 330
+    assert 0 < two["cMs"].sum() < one["cMs"].sum()
+    assert np.all(one["snps"] > 0)
+
+    one, two = simulator.get_shared_dna(family["daughter"], family["unrelated"])
+    assert len(one) == 0 and len(two) == 0
+
+
+def test_get_snps(simulator, family):
+    snps = simulator.get_snps(family["son"], no_call_rate=0.1, seed=1)
+    assert len(snps) == simulator.snp_count
+
+    # males have one X and Y chromosome
+    assert snps.loc[snps["chrom"] == "X", "genotype"].str.len().max() == 1
+    assert snps.loc[snps["chrom"] == "Y", "genotype"].notnull().any()
+    assert 0.05 < snps["genotype"].isnull().mean() < 0.15
+
+    snps = simulator.get_snps(family["daughter"], seed=1)
+    assert snps.loc[snps["chrom"] == "X", "genotype"].str.len().min() == 2
+    assert snps.loc[snps["chrom"] == "Y", "genotype"].isnull().all()
+
+
+def test_discordance_rate(simulator, family):
+    snps1 = simulator.get_snps(family["daughter"], seed=1)
+    snps2 = simulator.get_snps(family["daughter"], discordance_rate=0.05, seed=2)
+    assert 0.03 < (snps1["genotype"] != snps2["genotype"]).mean() < 0.07
+
+
+@pytest.mark.parametrize("data_format", ["23andme", "ancestry", "ftdna", "ftdna_famfinder"])
+def test_write_snps(tmpdir, simulator, family, data_format):
+    path = simulator.write_snps(
+        family["daughter"], str(tmpdir.join("daughter.txt.gz")), data_format, seed=1
+    )
+    s = SNPs(path)
+    snps = simulator.get_snps(family["daughter"], no_call_rate=0.01, seed=1)
+
+    assert s.build == 37
+    assert s.build_detected
+    assert s.sex == "Female"
+    assert list(s.snps.index) == list(snps.index)
+    assert (s.snps["pos"] == snps["pos"]).all()
+
+    autosomes = snps["chrom"].isin(["1", "2"])
+    assert (
+        s.snps.loc[autosomes, "genotype"].fillna("--")
+        == snps.loc[autosomes, "genotype"].fillna("--")
+    ).all()
@@ -16,9 +16,14 @@ along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 """
 
+import gzip
+import os
+
+import numpy as np
 import pandas as pd
 import pytest
 
+from lineage.snps import CHROM_DTYPE
 from tests.test_lineage import simulate_snps
 
 
@@ -27,6 +32,7 @@ def create_snp_df(rsid, chrom, pos, genotype):
         {"rsid": rsid, "chrom": chrom, "pos": pos, "genotype": genotype},
         columns=["rsid", "chrom", "pos", "genotype"],
     )
+    df["chrom"] = df["chrom"].astype(CHROM_DTYPE)
     df = df.set_index("rsid")
     return df
 
@@ -163,3 +169,225 @@ def test_get_assembly_None():
     from lineage.snps import get_assembly
 
     assert get_assembly(None) is ""
+
+
+def test_snps_chrom_dtype():
+    from lineage.snps import SNPs
+
+    snps = SNPs("tests/input/chromosomes.csv")
+    assert snps.snps["chrom"].dtype == CHROM_DTYPE
+    assert list(snps.snps["chrom"].cat.categories[-4:]) == ["X", "Y", "PAR", "MT"]
+
+
+def test_sort_snps_other_chroms():
+    from lineage.snps import sort_snps
+
+    snps = sort_snps(
+        pd.DataFrame(
+            {"chrom": ["MT", "XY", "1", "10"], "pos": [1, 1, 1, 1]},
+            index=["rs1", "rs2", "rs3", "rs4"],
+        )
+    )
+    assert list(snps.index) == ["rs3", "rs4", "rs1", "rs2"]
+    assert list(snps["chrom"].cat.categories[-2:]) == ["MT", "XY"]
+    assert snps["chrom"].cat.ordered
+
+
+def test_get_rsid_keys():
+    from lineage.snps import get_rsid_keys, get_rsids
+
+    rsids = ["rs3094315", "i7001348", "rs1", "rs01", "rsIndelTest", "i7001348"]
+    keys = get_rsid_keys(rsids)
+    assert keys.dtype == np.int64
+    assert list(keys[[0, 2]]) == [3094315, 1]
+    assert (keys[[1, 3, 4]] < 0).all()
+    assert keys[1] == keys[5]
+    assert len(set(keys)) == 5
+    other_ids = {keys[i]: rsids[i] for i in [1, 3, 4]}
+    assert list(get_rsids(keys, other_ids)) == rsids
+    assert len(get_rsid_keys([])) == 0
+
+
+def test_get_rsid_keys_stable():
+    from lineage.snps import get_rsid_keys
+
+    # keys of identifiers other than rsids are hashes, so are the same in every process
+    keys = get_rsid_keys(["i7001348", "rs5", "i7001348"])
+    assert list(keys) == [-179212732000340107, 5, -179212732000340107]
+
+
+def test_join_rsid_keys():
+    from lineage.snps import get_rsid_keys, join_rsid_keys
+
+    keys1 = get_rsid_keys(["rs5", "i1", "rs3", "rs4"])
+    keys2 = get_rsid_keys(["rs3", "rs9", "i1", "rs5"])
+    indices1, indices2 = join_rsid_keys(keys1, keys2)
+    assert list(indices1) == [0, 1, 2]
+    assert list(indices2) == [3, 2, 0]
+    indices1, indices2 = join_rsid_keys(keys1, keys2[:0])
+    assert len(indices1) == 0 and len(indices2) == 0
+
+
+def test_join_rsid_keys_duplicates():
+    from lineage.snps import get_rsid_keys, join_rsid_keys
+
+    # each key of `keys1` is joined to the first occurrence of the key in `keys2`
+    keys1 = get_rsid_keys(["rs5", "rs3", "rs5"])
+    keys2 = get_rsid_keys(["rs5", "rs3", "rs5", "rs3"])
+    indices1, indices2 = join_rsid_keys(keys1, keys2)
+    assert list(indices1) == [0, 1, 2]
+    assert list(indices2) == [0, 1, 0]
+
+
+def test_rsid_key_collision(monkeypatch):
+    import lineage.snps
+    from lineage.snps import get_rsid_keys, join_rsid_keys
+
+    # all identifiers not of the form "rs<number>" have the same key
+    monkeypatch.setattr(lineage.snps, "_get_other_id_key", lambda rsid: -1)
+
+    assert list(get_rsid_keys(["i1", "rs2", "i1"])) == [-1, 2, -1]
+    with pytest.raises(ValueError):
+        get_rsid_keys(["i1", "rs2", "i2"])
+
+    keys1 = get_rsid_keys(["rs1", "i1"])
+    keys2 = get_rsid_keys(["i2"])
+    assert [list(indices) for indices in join_rsid_keys(keys1, keys2)] == [[1], [0]]
+    with pytest.raises(ValueError):
+        join_rsid_keys(keys1, keys2, rsids1=["rs1", "i1"], rsids2=["i2"])
+
+    indices = join_rsid_keys(keys1, keys1, rsids1=["rs1", "i1"], rsids2=["rs1", "i1"])
+    assert [list(i) for i in indices] == [[0, 1], [0, 1]]
+
+
+def test_snps_chroms():
+    from lineage.snps import SNPs
+
+    snps = SNPs("tests/input/chromosomes.csv", assign_par_snps=False, chroms=["2", "MT"])
+    assert snps.chromosomes == ["2", "MT"]
+    assert snps.snp_count == 2
+
+
+def _par_assigned_snps(file, **kwargs):
+    from lineage.snps import SNPs
+
+    class ParAssignedSNPs(SNPs):
+        def _assign_par_snps(self):
+            # assign without a lookup: rs28736870 to X, rs113313554 to Y
+            for rsid, chrom in (("rs28736870", "X"), ("rs113313554", "Y")):
+                if rsid in self.snps.index:
+                    self.snps.loc[rsid, "chrom"] = chrom
+
+    return ParAssignedSNPs(file, **kwargs)
+
+
+def test_snps_chroms_par_assigned():
+    snps = _par_assigned_snps("tests/input/GRCh37_PAR.csv", chroms=["X"])
+    assert list(snps.snps.index) == ["rs28736870"]
+
+    snps = _par_assigned_snps("tests/input/GRCh37_PAR.csv", chroms=["X", "Y"])
+    assert list(snps.snps.index) == ["rs28736870", "rs113313554"]
+
+    snps = _par_assigned_snps("tests/input/GRCh37_PAR.csv", chroms=["PAR"])
+    assert list(snps.snps.index) == ["rs758419898"]
+
+    snps = _par_assigned_snps("tests/input/GRCh37_PAR.csv", region="Y:500000-600000")
+    assert list(snps.snps.index) == ["rs113313554"]
+
+
+def test_snps_chroms_par_not_assigned():
+    from lineage.snps import SNPs
+
+    snps = SNPs("tests/input/GRCh37_PAR.csv", assign_par_snps=False, chroms=["PAR"])
+    assert snps.snp_count == 3
+
+    snps = SNPs("tests/input/GRCh37_PAR.csv", assign_par_snps=False, chroms=["X"])
+    assert snps.snp_count == 0
+
+
+def test_snps_chroms_ancestry():
+    from lineage.snps import SNPs
+
+    snps = SNPs("tests/input/ancestry.txt", chroms=["1"])
+    assert snps.source == "AncestryDNA"
+    assert snps.snp_count == 5
+
+    snps = SNPs("tests/input/ancestry.txt", chroms=["X"])
+    assert snps.snp_count == 0
+
+
+def test_snps_region():
+    from lineage.snps import SNPs
+
+    snps = SNPs("tests/input/ftdna.csv", region="chr1:2-4")
+    assert snps.source == "FTDNA"
+    assert list(snps.snps.index) == ["rs2", "rs3", "rs4"]
+
+
+def test_snps_region_chrom():
+    from lineage.snps import SNPs
+
+    snps = SNPs("tests/input/GRCh38.csv", region="3")
+    assert list(snps.snps.index) == ["rs11928389"]
+    assert snps.build == 38
+    assert snps.build_detected
+
+
+def test_parse_region():
+    from lineage.snps import parse_region
+
+    assert parse_region("7") == ("7", None, None)
+    assert parse_region("chrX:1,000-2,000") == ("X", 1000, 2000)
+
+
+def test_probe():
+    from lineage.snps import SNPs
+
+    assert SNPs.probe("tests/input/23andme.txt") == {
+        "source": "23andMe",
+        "assembly": "",
+        "build": None,
+        "snp_count": 5,
+        "compression": "",
+        "file_size": os.path.getsize("tests/input/23andme.txt"),
+        "header_lines": 15,
+    }
+
+
+def test_probe_estimate_snp_count():
+    from lineage.snps import SNPs
+
+    summary = SNPs.probe("tests/input/discordant_snps.csv", sample_size=10)
+    assert summary["source"] == "generic"
+    assert 120 < summary["snp_count"] < 180
+
+
+def test_probe_gzip():
+    from lineage.snps import SNPs
+
+    with gzip.open("tests/input/23andme_build.txt.gz", "wt") as f:
+        f.write("# 23andMe\n# reference human assembly build 37\n")
+        for i in range(100):
+            f.write("rs{0:03d}\t1\t{0:03d}\tAA\n".format(i + 1))
+
+    summary = SNPs.probe("tests/input/23andme_build.txt.gz", sample_size=10)
+    assert summary["assembly"] == "GRCh37"
+    assert summary["build"] == 37
+    assert summary["compression"] == "gzip"
+    assert 95 < summary["snp_count"] < 105
+
+
+def test_probe_invalid_file():
+    from lineage.snps import SNPs
+
+    assert SNPs.probe("tests/input/non_existent_file.csv") is None
+    assert SNPs.probe("LICENSE.txt") is None
+
+
+def test_detect_declared_build():
+    from lineage.snps import detect_declared_build
+
+    assert detect_declared_build("# Assembly: GRCh38\n") == 38
+    assert detect_declared_build("# reference build 36\n") == 36
+    assert detect_declared_build("# hg19\n") == 37
+    assert detect_declared_build("") is None
@@ -0,0 +1,157 @@
+"""
+Copyright (C) 2019 Andrew Riha
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from lineage.cohort import Cohort
+from lineage.genotypes import ALLELES, get_code_map
+from lineage.store import CohortStore
+from tests.test_lineage import simulate_snps
+
+
+@pytest.fixture(scope="module")
+def genetic_map():
+    # recombination rate of 1 cM/Mb
+    return {
+        "1": pd.DataFrame(
+            {"pos": [0], "rate": [1.0], "map": [0.0]}, columns=["pos", "rate", "map"]
+        )
+    }
+
+
+@pytest.fixture(scope="module")
+def individuals(l):
+    kwargs = {"pos_max": 3000001, "pos_step": 1000, "insert_nulls": False}
+
+    ind1 = simulate_snps(l.create_individual("ind1"), genotype="AC", **kwargs)
+
+    # `ind2` doesn't share an allele with `ind1` at 200 SNPs in the middle of chrom 1
+    ind2 = simulate_snps(l.create_individual("ind2"), genotype="AC", **kwargs)
+    ind2._snps.iloc[1400:1600, 2] = "GG"
+
+    ind3 = simulate_snps(l.create_individual("ind3"), genotype="GT", **kwargs)
+    return [ind1, ind2, ind3]
+
+
+@pytest.fixture
+def store(tmpdir, individuals, genetic_map):
+    return CohortStore.create(
+        str(tmpdir.join("store")), Cohort(individuals[:2], genetic_map=genetic_map)
+    )
+
+
+def test_create(store, individuals, genetic_map):
+    cohort = Cohort(individuals[:2], genetic_map=genetic_map)
+
+    assert len(store) == 2
+    assert store.names == ["ind1", "ind2"]
+    assert store.chromosomes == ["1"]
+    assert store.snp_count == 3000
+
+    keys, pos, cMs = store.get_snps("1")
+    np.testing.assert_array_equal(keys, cohort.keys)
+    np.testing.assert_array_equal(pos, cohort.pos)
+    np.testing.assert_allclose(cMs, cohort.cMs)
+    np.testing.assert_array_equal(store.get_genotypes("1"), cohort.genotypes)
+
+
+def test_add_individual(store, individuals, genetic_map):
+    store.add_individual(individuals[2])
+
+    # reopen the store from disk
+    store = CohortStore(store._path)
+
+    assert store.names == ["ind1", "ind2", "ind3"]
+    np.testing.assert_array_equal(
+        store.get_genotypes("1"), Cohort(individuals, genetic_map=genetic_map).genotypes
+    )
+
+
+def test_add_individual_failed(store, individuals, genetic_map):
+    # rows of an individual that failed to be added (i.e., not in `individuals.csv`)
+    with open(os.path.join(store._path, "chrom_1", "genotypes.bin"), "ab") as f:
+        np.full(1000, 255, dtype=np.uint8).tofile(f)
+
+    store = CohortStore(store._path)
+    assert len(store) == 2
+    np.testing.assert_array_equal(
+        store.get_genotypes("1"),
+        Cohort(individuals[:2], genetic_map=genetic_map).genotypes,
+    )
+
+    store.add_individual(individuals[2])
+    np.testing.assert_array_equal(
+        CohortStore(store._path).get_genotypes("1"),
+        Cohort(individuals, genetic_map=genetic_map).genotypes,
+    )
+
+
+def test_alleles_changed(store, individuals, genetic_map):
+    # store written with another table of alleles (e.g., by another version of lineage)
+    alleles = ["X", "T", "G", "C", "A"]
+    code_map = get_code_map(ALLELES, alleles)
+    filename = os.path.join(store._path, "chrom_1", "genotypes.bin")
+    codes = np.fromfile(filename, dtype=np.uint8)
+    code_map[codes].tofile(filename)
+    with open(os.path.join(store._path, "alleles.txt"), "w") as f:
+        f.write("\n".join(alleles) + "\n")
+
+    store = CohortStore(store._path)
+    expected = Cohort(individuals, genetic_map=genetic_map).genotypes
+    np.testing.assert_array_equal(store.get_genotypes("1"), expected[:2])
+
+    # rows are added with the table of the store
+    store.add_individual(individuals[2])
+    np.testing.assert_array_equal(
+        np.fromfile(filename, dtype=np.uint8)[-3000:], code_map[expected[2]]
+    )
+    np.testing.assert_array_equal(CohortStore(store._path).get_genotypes("1"), expected)
+
+    one_chrom_shared_dna, two_chrom_shared_dna = store.find_shared_dna("ind1")
+    assert list(one_chrom_shared_dna["snps"]) == [1400, 1400]
+    assert list(two_chrom_shared_dna["snps"]) == [1400, 1400]
+
+
+def test_find_shared_dna(store, individuals):
+    store.add_individual(individuals[2])
+
+    one_chrom_shared_dna, two_chrom_shared_dna = store.find_shared_dna("ind1")
+
+    assert list(one_chrom_shared_dna["name"]) == ["ind2", "ind2"]
+    assert list(one_chrom_shared_dna["start"]) == [1, 1600001]
+    assert list(one_chrom_shared_dna["end"]) == [1399001, 2999001]
+    assert list(one_chrom_shared_dna["snps"]) == [1400, 1400]
+    np.testing.assert_allclose(one_chrom_shared_dna["cMs"], [1.399, 1.4])
+
+    assert list(two_chrom_shared_dna["name"]) == ["ind2", "ind2"]
+    assert list(two_chrom_shared_dna["snps"]) == [1400, 1400]
+
+
+def test_find_shared_dna_chunks(store, individuals):
+    store.add_individual(individuals[2])
+
+    for expected, result in zip(
+        store.find_shared_dna("ind2", ["ind3", "ind1"]),
+        store.find_shared_dna("ind2", ["ind3", "ind1"], chunk_size=1),
+    ):
+        pd.testing.assert_frame_equal(expected, result)
+        assert list(result["name"]) == ["ind1", "ind1"]